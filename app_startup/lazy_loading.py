@@ -0,0 +1,59 @@
+import importlib
+import threading
+import time
+
+# Modules behind the analysis and review features, in the order they are prewarmed
+HEAVY_MODULES = (
+    "numpy",
+    "pandas",
+    "matplotlib.pyplot",
+    "data_preproccesing.data_preprocessor",
+    "sales_analysis.sales_trends",
+    "sales_analysis.repeat_customers",
+    "sales_analysis.profit_per_category",
+    "sales_analysis.location_sales_analysis",
+    "sales_analysis.location_profit",
+    "prediction.sales_analysis",
+    "prediction.grouped_regression",
+    "prediction.forecasting",
+    "wordcloud",
+)
+
+# Seconds spent importing each prewarmed module (filled by the background thread)
+IMPORT_TIMINGS = {}
+
+_prewarm_lock = threading.Lock()
+_prewarm_thread = None
+
+def _prewarm(modules):
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:  # A missing optional module must never break the app
+            continue
+        IMPORT_TIMINGS[name] = time.perf_counter() - start
+
+def prewarm_in_background(modules=HEAVY_MODULES):
+    """
+    Imports the heavy modules in a daemon thread, once per process.
+
+    Call it after the page has been rendered: the first paint is not delayed, and by
+    the time an analysis is requested its modules are usually already in sys.modules.
+
+    Returns:
+    - threading.Thread: The prewarm thread (the existing one on later calls).
+    """
+    global _prewarm_thread
+    with _prewarm_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=_prewarm, args=(tuple(modules),), name="prewarm", daemon=True)
+            _prewarm_thread.start()
+    return _prewarm_thread
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    prewarm_in_background().join()
+    for name, seconds in IMPORT_TIMINGS.items():
+        print(f"{name:<40} {seconds * 1000:7.1f} ms")
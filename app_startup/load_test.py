@@ -0,0 +1,308 @@
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import resource  # Peak memory of the worker process (not available on Windows)
+except ImportError:
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRYPOINT = os.path.join(ROOT, "index.py")
+ANALYSIS_PAGE = "pages/Data_Analysis_Module.py"
+REVIEW_PAGE = "pages/View_Review.py"
+
+# Simulated concurrent sessions of each load level
+SESSION_COUNTS = (1, 2, 4, 8)
+
+# Sales rows of each generated dataset
+SALES_ROWS = 20_000
+
+# Read-only files the pages open relative to the working directory (copied into each
+# level's scratch folder, so the load test never writes to the real data or reviews)
+WORKSPACE_FILES = ("assets", "reviews/filter_words.txt")
+
+# Seconds a single page run may take before the session records it as failed
+RUN_TIMEOUT = 600
+
+LOCATIONS = ("Mumbai", "Delhi", "Bangalore", "Chennai", "Kolkata", "Pune", "Ahmedabad", "Jaipur")
+CATEGORIES = ("Electronics", "Clothing", "Groceries", "Furniture", "Books")
+REVIEW_WORDS = ("great", "insights", "slow", "charts", "forecast", "upload", "clear", "helpful", "profit", "store")
+
+def generate_dataset(directory, sales_rows=SALES_ROWS, seed=0, products=50, customers=2_000):
+    """
+    Writes a product, sales and customer CSV in the layout the analysis page expects.
+
+    Parameters:
+    - directory (str): Folder receiving products.csv, sales.csv and customers.csv.
+    - sales_rows (int): Number of sales.
+    - seed (int): Random seed (different seeds give different uploads, so sessions do
+      not share cached results).
+
+    Returns:
+    - dict: Upload kind ('product', 'sales', 'customer') -> file path.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    cost = rng.integers(100, 50_000, products)
+    products_df = pd.DataFrame({
+        "PID": [f"P{i:04d}" for i in range(products)],
+        "Product_Name": [f"Product {i}" for i in range(products)],
+        "P_Description": "Generated product",
+        "Manufacturing Cost": cost,
+        "Category": rng.choice(CATEGORIES, products),
+    })
+    customers_df = pd.DataFrame({
+        "CID": [f"C{i:05d}" for i in range(customers)],
+        "Age": rng.integers(18, 70, customers),
+        "Gender": rng.choice(["Male", "Female"], customers),
+    })
+
+    product = rng.integers(0, products, sales_rows)
+    quantity = rng.integers(1, 6, sales_rows)
+    sales_df = pd.DataFrame({
+        "SID": [f"S{i:07d}" for i in range(sales_rows)],
+        "Date": (pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 365, sales_rows)), unit="D")).strftime("%Y-%m-%d"),
+        "Time": [f"{hour:02d}:{minute:02d}" for hour, minute in zip(rng.integers(9, 21, sales_rows), rng.integers(0, 60, sales_rows))],
+        "PID": products_df["PID"].to_numpy()[product],
+        "CID": customers_df["CID"].to_numpy()[rng.integers(0, customers, sales_rows)],
+        "Quantity_Sold": quantity,
+        "Sales_Price": np.round(cost[product] * quantity * rng.uniform(1.05, 1.4, sales_rows)),
+        "Location": rng.choice(LOCATIONS, sales_rows),
+    })
+
+    files = {"product": products_df, "sales": sales_df, "customer": customers_df}
+    paths = {kind: os.path.join(directory, f"{name}.csv") for kind, name in (("product", "products"), ("sales", "sales"), ("customer", "customers"))}
+    for kind, df in files.items():
+        df.to_csv(paths[kind], index=False)
+    return paths
+
+# === Sessions (run inside the worker process) ===
+
+def _upload(path):
+    """In-memory copy of a generated file, shaped like a Streamlit UploadedFile."""
+    with open(path, "rb") as file:
+        upload = io.BytesIO(file.read())
+    upload.name = os.path.basename(path)
+    return upload
+
+def _session_file_uploader(label, *args, **kwargs):
+    """Stands in for st.file_uploader: returns the file of this session's dataset named in the label."""
+    import streamlit as st
+    uploads = st.session_state.get("load_test_uploads", {})
+    for kind, path in uploads.items():
+        if kind in label.lower():
+            return _upload(path)
+    return None
+
+def _timed(records, action, run):
+    start = time.perf_counter()
+    try:
+        app = run()
+        ok = not app.exception
+    except Exception:  # A timeout or crash counts as a failed interaction
+        app, ok = None, False
+    records.append({"action": action, "seconds": time.perf_counter() - start, "ok": ok})
+    return app
+
+def run_session(uploads, seed=0, iterations=1):
+    """
+    Plays one analyst: uploads a dataset, clicks every analysis button, then submits a review.
+
+    Parameters:
+    - uploads (dict): From generate_dataset().
+    - seed (int): Varies the review text.
+    - iterations (int): Times the scenario is repeated.
+
+    Returns:
+    - list: One dict per interaction with 'action', 'seconds' and 'ok'.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(iterations):
+        app = AppTest.from_file(ENTRYPOINT, default_timeout=RUN_TIMEOUT)
+        app.session_state["load_test_uploads"] = uploads
+        app.switch_page(ANALYSIS_PAGE)
+        if _timed(records, "upload", app.run) is None:
+            continue
+        for label in [button.label for button in app.button]:
+            _timed(records, label, lambda label=label: next(b for b in app.button if b.label == label).click().run())
+
+        app.switch_page(REVIEW_PAGE)
+        if _timed(records, "open reviews", app.run) is None:
+            continue
+        app.text_area[0].input(" ".join(rng.choice(REVIEW_WORDS, 8)))
+        _timed(records, "submit review", lambda: next(b for b in app.button if b.label == "Submit Review").click().run())
+    return records
+
+def run_worker(uploads, seed=0, iterations=1):
+    """
+    Runs one session in this process, once the parent starts the level.
+
+    Prints 'ready' after the imports (which are not part of the load), waits for a
+    line on stdin, then plays the session.
+
+    Returns:
+    - dict: 'records' (see run_session), and 'baseline_rss' / 'peak_rss' (bytes, None
+      where unavailable).
+    """
+    import streamlit as st
+    from app_startup.lazy_loading import HEAVY_MODULES, prewarm_in_background
+
+    st.file_uploader = _session_file_uploader  # The session reads its upload from session state
+    prewarm_in_background(HEAVY_MODULES).join()
+    baseline = _peak_rss()
+
+    print("ready", flush=True)
+    sys.stdin.readline()
+    records = run_session(uploads, seed, iterations)
+    return {"records": records, "baseline_rss": baseline, "peak_rss": _peak_rss()}
+
+def _peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes
+
+# === Load levels ===
+
+def _prepare_workspace():
+    workspace = tempfile.mkdtemp(prefix="load-test-")
+    for relative in WORKSPACE_FILES:
+        source = os.path.join(ROOT, relative)
+        target = os.path.join(workspace, relative)
+        if os.path.isdir(source):
+            shutil.copytree(source, target)
+        elif os.path.exists(source):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy(source, target)
+    return workspace
+
+def measure_level(datasets, sessions, iterations=1):
+    """
+    Runs `sessions` concurrent sessions, each in its own worker process.
+
+    AppTest drives one script runtime per process, so sessions cannot share one
+    interpreter; they share a scratch copy of the working directory instead (its SQL
+    stores, shared Arrow datasets and review log), which starts empty at every level.
+
+    Returns:
+    - dict: 'sessions', 'seconds' (wall time from the common start to the last session's
+      end), 'records' (all interactions), and 'baseline_rss' / 'peak_rss' (per session).
+    """
+    workspace = _prepare_workspace()
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))}
+    workers = []
+    try:
+        for index in range(sessions):
+            command = [sys.executable, "-m", "app_startup.load_test", "--worker", json.dumps(datasets[index % len(datasets)]),
+                       "--seed", str(index), "--iterations", str(iterations)]
+            workers.append(subprocess.Popen(command, cwd=workspace, env=env, text=True,
+                                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL))
+        for worker in workers:  # Every session is ready before any starts
+            if worker.stdout.readline().strip() != "ready":
+                raise RuntimeError("A load-test worker failed to start")
+
+        start = time.perf_counter()
+        for worker in workers:
+            worker.stdin.write("go\n")
+            worker.stdin.flush()
+        results = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+        seconds = time.perf_counter() - start
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.kill()
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    return {
+        "sessions": sessions,
+        "seconds": seconds,
+        "records": [record for result in results for record in result["records"]],
+        "baseline_rss": [result["baseline_rss"] for result in results],
+        "peak_rss": [result["peak_rss"] for result in results],
+    }
+
+def summarize_level(level):
+    """
+    Latency percentiles, throughput and memory of one load level.
+
+    Returns:
+    - dict: 'sessions', 'interactions', 'errors', 'p50_ms', 'p95_ms', 'p99_ms',
+      'throughput' (interactions per second), 'peak_rss_mb' (sum of the sessions' peak
+      memory), 'rss_per_session_mb' (mean peak above an idle process with the modules
+      imported), and 'slowest' (action -> p95 ms).
+    """
+    records = pd.DataFrame(level["records"], columns=["action", "seconds", "ok"])
+    ms = records["seconds"].to_numpy() * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (np.nan,) * 3
+    measured = [(peak, baseline) for peak, baseline in zip(level["peak_rss"], level["baseline_rss"]) if peak]
+    return {
+        "sessions": level["sessions"],
+        "interactions": len(records),
+        "errors": int((~records["ok"].astype(bool)).sum()),
+        "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+        "throughput": len(records) / level["seconds"] if level["seconds"] else np.nan,
+        "peak_rss_mb": sum(peak for peak, _ in measured) / 2**20 if measured else None,
+        "rss_per_session_mb": np.mean([peak - baseline for peak, baseline in measured]) / 2**20 if measured else None,
+        "slowest": (records.groupby("action")["seconds"].quantile(0.95) * 1000).nlargest(3).round().to_dict(),
+    }
+
+def run_load_test(session_counts=SESSION_COUNTS, sales_rows=SALES_ROWS, iterations=1, shared_data=False):
+    """
+    Measures the app under increasing numbers of concurrent sessions.
+
+    Parameters:
+    - session_counts (tuple): Concurrent sessions of each level.
+    - sales_rows (int): Sales rows of each generated dataset.
+    - iterations (int): Scenarios each session plays.
+    - shared_data (bool): Whether all sessions upload the same dataset (sharing its
+      cached results) instead of one dataset each.
+
+    Returns:
+    - list: One summary per level (see summarize_level).
+    """
+    data_dir = tempfile.mkdtemp(prefix="load-test-data-")
+    try:
+        dataset_count = 1 if shared_data else max(session_counts)
+        datasets = [generate_dataset(os.path.join(data_dir, f"dataset-{seed}"), sales_rows, seed) for seed in range(dataset_count)]
+        return [summarize_level(measure_level(datasets, sessions, iterations)) for sessions in session_counts]
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the app with concurrent headless sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=list(SESSION_COUNTS), help="Concurrent sessions per level")
+    parser.add_argument("--rows", type=int, default=SALES_ROWS, help="Sales rows of each generated dataset")
+    parser.add_argument("--iterations", type=int, default=1, help="Scenarios played by each session")
+    parser.add_argument("--shared-data", action="store_true", help="All sessions upload the same dataset")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)  # Uploads of one session, run by measure_level()
+    parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(args.worker), args.seed, args.iterations)))
+        sys.exit(0)
+
+    report = run_load_test(args.sessions, args.rows, args.iterations, args.shared_data)
+    print(f"{'Sessions':>8} {'Calls':>6} {'Errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Calls/s':>8} {'Peak MB':>8} {'MB/session':>10}")
+    for row in report:
+        memory = (f"{row['peak_rss_mb']:8.0f} {row['rss_per_session_mb']:10.1f}" if row["peak_rss_mb"] is not None
+                  else f"{'-':>8} {'-':>10}")
+        print(f"{row['sessions']:>8} {row['interactions']:>6} {row['errors']:>6} {row['p50_ms']:8.0f} {row['p95_ms']:8.0f} "
+              f"{row['p99_ms']:8.0f} {row['throughput']:8.2f} {memory}")
+        print(f"{'':>8} slowest (p95 ms): " + ", ".join(f"{action} {ms:.0f}" for action, ms in row["slowest"].items()))
+    sys.exit(0 if all(row["errors"] == 0 for row in report) else 1)
@@ -0,0 +1,80 @@
+import argparse
+import json
+import subprocess
+import sys
+
+ENTRYPOINT = "index.py"
+
+# Cold-start budget (milliseconds) for the first run of each page in a fresh process,
+# excluding the import of Streamlit itself which every page shares
+PAGE_BUDGETS_MS = {
+    "pages/Dashboard_Home.py": 250,
+    "pages/Development_Credits.py": 150,
+    "pages/Technological_Framework.py": 150,
+    "pages/Data_Analysis_Module.py": 200,
+    "pages/View_Review.py": 300,
+}
+
+# Runs one page headlessly (through the entrypoint, as a user would open it) in a new
+# interpreter and prints its first-run time
+MEASURE_SNIPPET = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+entrypoint, page = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+app = AppTest.from_file(entrypoint, default_timeout=120)
+app.switch_page(page)
+app.run()
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in ("numpy", "pandas", "matplotlib", "wordcloud", "pyarrow") if m in sys.modules]
+print(json.dumps({"ms": elapsed, "errors": len(app.exception), "heavy_modules": heavy}))
+"""
+
+def measure_page(page):
+    """
+    Measures the cold first run of a page in a fresh interpreter.
+
+    Parameters:
+    - page (str): Path of the page script, relative to the project root.
+
+    Returns:
+    - dict: 'ms' (first-run time), 'errors' (exceptions raised by the page) and
+      'heavy_modules' (scientific-stack modules the page loaded).
+    """
+    result = subprocess.run([sys.executable, "-c", MEASURE_SNIPPET, ENTRYPOINT, page],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def check_budgets(budgets=PAGE_BUDGETS_MS, runs=3):
+    """
+    Measures every page (best of `runs`) against its budget.
+
+    Returns:
+    - list: One dict per page with 'page', 'ms', 'budget_ms', 'within_budget' and 'heavy_modules'.
+    """
+    report = []
+    for page, budget in budgets.items():
+        samples = [measure_page(page) for _ in range(runs)]
+        best = min(samples, key=lambda sample: sample["ms"])
+        report.append({
+            "page": page,
+            "ms": best["ms"],
+            "budget_ms": budget,
+            "within_budget": best["ms"] <= budget and best["errors"] == 0,
+            "heavy_modules": best["heavy_modules"],
+        })
+    return report
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check per-page cold-start times against their budgets.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh-process runs per page (best is kept)")
+    args = parser.parse_args()
+
+    report = check_budgets(runs=args.runs)
+    for row in report:
+        status = "OK  " if row["within_budget"] else "OVER"
+        print(f"{status} {row['page']:<36} {row['ms']:7.0f} ms / {row['budget_ms']} ms  "
+              f"loaded: {', '.join(row['heavy_modules']) or '-'}")
+    sys.exit(0 if all(row["within_budget"] for row in report) else 1)
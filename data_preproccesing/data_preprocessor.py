@@ -1,8 +1,41 @@
+import numpy as np
 import pandas as pd
 
 # Define allowed file extensions
 VALID_EXTENSIONS = ('.csv', '.xls', '.xlsx', '.xlsm', '.xlsb')
 
+# Documented formats of the sales 'Date' and 'Time' columns (tried first, before inference)
+DATE_FORMATS = ("%Y-%m-%d",)
+TIME_FORMATS = ("%H:%M", "%H:%M:%S")
+
+# Customer ID given to sales without one (walk-in customers, not orphans)
+ANONYMOUS_CID = "0"
+
+# What happens to sales rows whose 'PID' or 'CID' is missing from the product or
+# customer file: 'reject' the upload, 'quarantine' the rows (set them aside), or 'keep' them
+INTEGRITY_POLICIES = ("reject", "quarantine", "keep")
+INTEGRITY_POLICY = "quarantine"
+
+# Orphan keys listed per column in the integrity report, and quarantined rows kept for download
+ORPHAN_SAMPLE_SIZE = 5
+MAX_QUARANTINE_ROWS = 100_000
+
+# Dtype of the text columns produced at ingestion: pandas' default Python 'object' strings, or
+# 'arrow' (Arrow-backed strings, and categoricals for LABEL_COLUMNS), which take a fraction of
+# the memory and group much faster
+STRING_DTYPES = ("object", "arrow")
+STRING_DTYPE = "object"
+
+# Text columns with few distinct values (stored as categoricals in 'arrow' mode)
+LABEL_COLUMNS = ("Location", "Gender", "Category")
+
+# Arrow-backed strings whose missing values are NaN, like object columns
+ARROW_STRING = pd.StringDtype("pyarrow_numpy")
+
+# Bit flags of classify_foreign_keys
+ORPHAN_PRODUCT = 1
+ORPHAN_CUSTOMER = 2
+
 # Custom exceptions
 class InvalidFileExtensionError(Exception):
     """Raised when the file provided is not of a supported format."""
@@ -16,6 +49,10 @@ class DuplicateKeyError(Exception):
     """Raised when a duplicate key is found in a unique column."""
     pass
 
+class ReferentialIntegrityError(Exception):
+    """Raised when sales reference products or customers missing from their files (policy 'reject')."""
+    pass
+
 def check_extension(file):
     """
     Checks if the uploaded file has a valid extension.
@@ -32,12 +69,14 @@ def check_extension(file):
     if not file.name.endswith(VALID_EXTENSIONS):  # Validate file extension from .name attribute
         raise InvalidFileExtensionError(f"Invalid file format: {file.name}. Allowed formats: {VALID_EXTENSIONS}")
 
-def convert_to_df(file):
+def convert_to_df(file, string_dtype=STRING_DTYPE):
     """
     Reads an uploaded file into a Pandas DataFrame.
 
     Parameters:
         file (UploadedFile): The uploaded file object.
+        string_dtype (str): One of STRING_DTYPES; in 'arrow' mode the label columns of a CSV
+            are read straight into categoricals (see use_string_dtype for the other columns).
 
     Returns:
         pd.DataFrame: The loaded DataFrame.
@@ -47,12 +86,85 @@ def convert_to_df(file):
     """
     try:
         if file.name.endswith(".csv"):
-            return pd.read_csv(file)  # Read CSV file from file object
+            return pd.read_csv(file, dtype=_csv_dtypes(string_dtype))  # Read CSV file from file object
         else:
             return pd.read_excel(file)  # Read Excel file from file object
     except Exception as e:
         raise CorruptedFileError(f"Failed to load file: {file.name}") from e
 
+def _csv_dtypes(string_dtype):
+    if string_dtype not in STRING_DTYPES:
+        raise ValueError(f"Unknown string dtype: {string_dtype}. Expected one of {STRING_DTYPES}")
+    # Labels never exist as one Python string per row (absent columns are ignored)
+    return dict.fromkeys(LABEL_COLUMNS, "category") if string_dtype == "arrow" else None
+
+def arrow_categorical(values):
+    """
+    Converts text labels to a categorical whose categories are Arrow-backed strings
+    (unused categories, e.g. of filtered-out rows, are dropped).
+
+    Parameters:
+        values (pd.Series): Object, string or categorical labels.
+
+    Returns:
+        pd.Series: Categorical labels.
+    """
+    labels = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+    labels = labels.cat.remove_unused_categories()
+    categories = labels.cat.categories
+    if categories.dtype == object or isinstance(categories.dtype, pd.StringDtype):
+        categories = categories.astype(ARROW_STRING)
+    return pd.Series(pd.Categorical.from_codes(labels.cat.codes, dtype=pd.CategoricalDtype(categories)),
+                     index=values.index, name=values.name)
+
+def use_string_dtype(df, string_dtype=STRING_DTYPE):
+    """
+    Converts the text columns of a cleaned DataFrame to the chosen dtype: in 'arrow' mode,
+    LABEL_COLUMNS become arrow_categorical()s and other text columns Arrow-backed strings
+    (numbers and dates are unchanged); 'object' leaves the DataFrame as read.
+
+    Parameters:
+        df (pd.DataFrame): DataFrame to convert (in place).
+        string_dtype (str): One of STRING_DTYPES.
+
+    Returns:
+        pd.DataFrame: The same DataFrame.
+    """
+    if string_dtype not in STRING_DTYPES:
+        raise ValueError(f"Unknown string dtype: {string_dtype}. Expected one of {STRING_DTYPES}")
+    if string_dtype == "object":
+        return df
+
+    for column in df.columns:
+        dtype = df[column].dtype
+        is_text = dtype == object or isinstance(dtype, pd.StringDtype)
+        if column in LABEL_COLUMNS and (is_text or isinstance(dtype, pd.CategoricalDtype)):
+            df[column] = arrow_categorical(df[column])
+        elif is_text and dtype != ARROW_STRING:
+            df[column] = df[column].astype(ARROW_STRING)
+    return df
+
+def arrow_table_to_df(table, **options):
+    """
+    Converts an Arrow table written from a processed DataFrame (e.g. its shared-memory or
+    partitioned copy) back to pandas with the same text dtypes: Arrow-backed strings stay
+    Arrow-backed rather than becoming Python strings, categoricals get their Arrow-backed
+    categories back, and object columns are read as object.
+
+    Parameters:
+        table (pyarrow.Table): Table with the pandas metadata of the DataFrame.
+        **options: Options of pyarrow.Table.to_pandas (e.g. split_blocks).
+
+    Returns:
+        pd.DataFrame: The DataFrame.
+    """
+    with pd.option_context("mode.string_storage", "pyarrow_numpy"):  # Restores 'string' columns as ARROW_STRING
+        df = table.to_pandas(**options)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = arrow_categorical(df[column])
+    return df
+
 def check_unique_column(df, column_name):
     """
     Checks for duplicate values in a specific column.
@@ -79,7 +191,74 @@ def remove_empty(df):
     """
     return df.dropna(axis=0)  # Drop rows where any value is NaN
 
-def process_product_file(file):
+def parse_datetimes(values, formats=DATE_FORMATS):
+    """
+    Parses date (or time) strings, each distinct string only once.
+
+    The distinct values are parsed with the given formats first; only strings that match
+    none of them fall back to per-element format inference. Unparseable values become NaT.
+    Values that are already datetimes are returned unchanged, so calling this on a frame
+    from process_sales_file costs nothing.
+
+    Parameters:
+        values (pd.Series): Raw column values.
+        formats (tuple): strftime formats tried in order.
+
+    Returns:
+        pd.Series: datetime64 values aligned with the input.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, uniques = pd.factorize(values)  # Missing values get code -1
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+
+    for date_format in formats:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=date_format, errors="coerce")
+
+    missing = parsed.isna()
+    if missing.any():  # Slow path: infer the format of the few remaining strings
+        parsed[missing] = pd.to_datetime(text[missing], format="mixed", errors="coerce")
+
+    result = parsed.to_numpy()[codes]
+    result[codes == -1] = np.datetime64("NaT")
+    return pd.Series(result, index=values.index, name=values.name)
+
+def parse_time_of_day(values, formats=TIME_FORMATS):
+    """
+    Parses 'HH:MM' (or 'HH:MM:SS') strings into offsets from midnight.
+
+    Returns:
+        pd.Series: timedelta64 values aligned with the input (NaT where unparseable).
+    """
+    times = parse_datetimes(values, formats)
+    return times - times.dt.normalize()
+
+def add_parsed_dates(df):
+    """
+    Converts 'Date' to datetime64 and adds 'Timestamp' (date plus 'Time', when present).
+
+    Rows with unparseable dates keep NaT, so analyses can drop them; a missing or
+    unparseable time gives a NaT timestamp for that row.
+
+    Parameters:
+        df (pd.DataFrame): Sales DataFrame.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with typed date columns.
+    """
+    if "Date" in df.columns:
+        df["Date"] = parse_datetimes(df["Date"])
+        if "Time" in df.columns:
+            df["Timestamp"] = df["Date"] + parse_time_of_day(df["Time"])
+    return df
+
+def process_product_file(file, string_dtype=STRING_DTYPE):
     """
     Processes the product file:
     1. Checks file extension.
@@ -89,19 +268,20 @@ def process_product_file(file):
 
     Parameters:
         file (UploadedFile): The uploaded product file.
+        string_dtype (str): Dtype of the text columns (one of STRING_DTYPES).
 
     Returns:
         pd.DataFrame: Cleaned Product DataFrame.
     """
     check_extension(file)  # Validate file type
-    df = convert_to_df(file)  # Convert to DataFrame
+    df = convert_to_df(file, string_dtype)  # Convert to DataFrame
 
     df = remove_empty(df)  # Remove empty columns
     check_unique_column(df, "PID")  # Ensure 'PID' is unique
 
-    return df  # Return cleaned DataFrame
+    return use_string_dtype(df, string_dtype)  # Return cleaned DataFrame
 
-def process_sales_file(file):
+def process_sales_file(file, string_dtype=STRING_DTYPE):
     """
     Processes the sales file:
     1. Checks file extension.
@@ -109,26 +289,60 @@ def process_sales_file(file):
     3. Replaces NaN in 'CID' with '0'.
     4. Ensures unique 'SID' values.
     5. Removes columns with NaN values.
+    6. Parses 'Date' once and adds the combined 'Timestamp' column.
 
     Parameters:
         file (UploadedFile): The uploaded sales file.
+        string_dtype (str): Dtype of the text columns (one of STRING_DTYPES).
 
     Returns:
         pd.DataFrame: Cleaned Sales DataFrame.
     """
     check_extension(file)
-    df = convert_to_df(file)
+    df = convert_to_df(file, string_dtype)
 
     # Replace NaN values in 'CID' with "0"
     if "CID" in df.columns:
-        df["CID"] = df["CID"].fillna("0")
+        df["CID"] = df["CID"].fillna(ANONYMOUS_CID)
 
     df = remove_empty(df)  # Remove empty columns
     check_unique_column(df, "SID")  # Ensure 'SID' is unique
 
-    return df
+    return use_string_dtype(add_parsed_dates(df), string_dtype)  # Downstream modules reuse the typed columns
+
+def process_sales_chunks(file, chunk_rows, string_dtype=STRING_DTYPE):
+    """
+    Processes a sales CSV in chunks, for uploads too large to hold in memory:
+    each chunk is cleaned like process_sales_file (except for the 'SID' uniqueness
+    check, which needs every row and is left to the consumer).
 
-def process_customer_file(file):
+    Parameters:
+        file (UploadedFile): The uploaded sales file (CSV).
+        chunk_rows (int): Rows per chunk.
+        string_dtype (str): Dtype of the text columns (one of STRING_DTYPES; each chunk's
+            categoricals only hold the labels of that chunk).
+
+    Yields:
+        pd.DataFrame: Cleaned chunks of the sales data.
+
+    Raises:
+        InvalidFileExtensionError: If the file is not a CSV (Excel sheets cannot be streamed).
+    """
+    check_extension(file)
+    if not file.name.endswith(".csv"):
+        raise InvalidFileExtensionError(f"Only CSV files can be processed in chunks: {file.name}")
+
+    try:
+        reader = pd.read_csv(file, chunksize=chunk_rows, dtype=_csv_dtypes(string_dtype))
+    except Exception as e:
+        raise CorruptedFileError(f"Failed to load file: {file.name}") from e
+
+    for df in reader:
+        if "CID" in df.columns:
+            df["CID"] = df["CID"].fillna(ANONYMOUS_CID)
+        yield use_string_dtype(add_parsed_dates(remove_empty(df)), string_dtype)
+
+def process_customer_file(file, string_dtype=STRING_DTYPE):
     """
     Processes the customer file:
     1. Checks file extension.
@@ -139,12 +353,13 @@ def process_customer_file(file):
 
     Parameters:
         file (UploadedFile): The uploaded customer file.
+        string_dtype (str): Dtype of the text columns (one of STRING_DTYPES).
 
     Returns:
         pd.DataFrame: Cleaned Customer DataFrame.
     """
     check_extension(file)
-    df = convert_to_df(file)
+    df = convert_to_df(file, string_dtype)
 
     # Validate Age column
     if "Age" in df.columns:
@@ -158,7 +373,155 @@ def process_customer_file(file):
     df = remove_empty(df)  # Remove empty columns
     check_unique_column(df, "CID")  # Ensure 'CID' is unique
 
-    return df
+    return use_string_dtype(df, string_dtype)  # Also drops the categories of invalid genders
+
+def build_key_index(keys):
+    """
+    Builds a hash index of a dimension's keys, once per file; probing it with a whole
+    column (or chunk) of foreign keys is a single vectorized lookup.
+
+    Parameters:
+        keys (pd.Series): Key column of the product or customer file.
+
+    Returns:
+        pd.Index: Distinct keys.
+    """
+    return pd.Index(pd.Series(keys).dropna().unique())
+
+def build_key_indexes(products_df, customers_df):
+    """
+    Returns:
+        dict: Foreign key column ('PID', 'CID') -> build_key_index() of its file.
+    """
+    return {"PID": build_key_index(products_df["PID"]), "CID": build_key_index(customers_df["CID"])}
+
+def _known_keys(index, values, exempt=()):
+    """
+    Flags the values present in index (or in exempt). Each distinct value is probed once:
+    the column is factorized and only its uniques are looked up, comparing numbers
+    numerically and IDs as text.
+
+    Returns:
+        np.ndarray: Boolean per value (missing values are unknown).
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    uniques = pd.Series(uniques)
+    if pd.api.types.is_numeric_dtype(index.dtype) and not pd.api.types.is_numeric_dtype(uniques):
+        probe = pd.to_numeric(uniques, errors="coerce")
+    elif not pd.api.types.is_numeric_dtype(index.dtype) and pd.api.types.is_numeric_dtype(uniques):
+        probe = uniques.astype(str)
+    else:
+        probe = uniques
+    known = index.get_indexer(probe) >= 0
+    if exempt:
+        known |= uniques.astype(str).isin(exempt).to_numpy()
+    return np.append(known, False)[codes]  # Code -1 (missing) picks the trailing False
+
+def classify_foreign_keys(sales_df, indexes):
+    """
+    Classifies every sales row's foreign keys in one vectorized pass.
+
+    Parameters:
+        sales_df (pd.DataFrame): Sales rows (or a chunk of them).
+        indexes (dict): From build_key_indexes().
+
+    Returns:
+        np.ndarray: Per-row flags, ORPHAN_PRODUCT | ORPHAN_CUSTOMER (0 for valid rows).
+    """
+    flags = np.zeros(len(sales_df), dtype=np.uint8)
+    if "PID" in sales_df.columns:
+        flags[~_known_keys(indexes["PID"], sales_df["PID"])] |= ORPHAN_PRODUCT
+    if "CID" in sales_df.columns:
+        flags[~_known_keys(indexes["CID"], sales_df["CID"], exempt=(ANONYMOUS_CID,))] |= ORPHAN_CUSTOMER
+    return flags
+
+def empty_integrity_report(policy=INTEGRITY_POLICY):
+    """
+    Returns:
+        dict: Report of a check over no rows (see check_referential_integrity).
+    """
+    return {
+        "policy": policy,
+        "rows": 0,
+        "orphan_rows": 0,
+        "orphan_counts": {"PID": 0, "CID": 0},
+        "orphan_samples": {"PID": {}, "CID": {}},
+        "quarantined": 0,
+        "quarantine": None,
+    }
+
+def merge_integrity_reports(report, other):
+    """
+    Adds the report of another chunk to report (counts are summed, samples merged).
+
+    Returns:
+        dict: The combined report.
+    """
+    merged = empty_integrity_report(report["policy"])
+    merged["rows"] = report["rows"] + other["rows"]
+    merged["orphan_rows"] = report["orphan_rows"] + other["orphan_rows"]
+    merged["quarantined"] = report["quarantined"] + other["quarantined"]
+    for column in ("PID", "CID"):
+        merged["orphan_counts"][column] = report["orphan_counts"][column] + other["orphan_counts"][column]
+        samples = dict(report["orphan_samples"][column])
+        for key, count in other["orphan_samples"][column].items():
+            samples[key] = samples.get(key, 0) + count
+        merged["orphan_samples"][column] = dict(sorted(samples.items(), key=lambda item: -item[1])[:ORPHAN_SAMPLE_SIZE])
+    quarantines = [frame for frame in (report["quarantine"], other["quarantine"]) if frame is not None]
+    if quarantines:
+        merged["quarantine"] = pd.concat(quarantines, ignore_index=True).head(MAX_QUARANTINE_ROWS)
+    return merged
+
+def check_referential_integrity(sales_df, indexes, policy=INTEGRITY_POLICY):
+    """
+    Checks that the sales' 'PID' and 'CID' values exist in the product and customer files
+    (anonymous sales, with CID "0", are valid) and applies the orphan policy.
+
+    Without it, orphan rows become NaN in the analyses' left merges and silently skew
+    the profit totals. Works on a whole file or chunk by chunk (see merge_integrity_reports).
+
+    Parameters:
+        sales_df (pd.DataFrame): Sales rows (or a chunk of them).
+        indexes (dict): From build_key_indexes(), built once for all chunks.
+        policy (str): One of INTEGRITY_POLICIES.
+
+    Returns:
+        pd.DataFrame: Sales rows to analyze (without the orphans when quarantined).
+        dict: Report with 'rows', 'orphan_rows', 'orphan_counts' and 'orphan_samples'
+            (most frequent orphan keys) per column, and the 'quarantine'd rows.
+
+    Raises:
+        ReferentialIntegrityError: If the policy is 'reject' and orphans are found.
+    """
+    if policy not in INTEGRITY_POLICIES:
+        raise ValueError(f"Unknown integrity policy: {policy}. Expected one of {INTEGRITY_POLICIES}")
+
+    flags = classify_foreign_keys(sales_df, indexes)
+    orphans = flags != 0
+    report = empty_integrity_report(policy)
+    report["rows"] = len(sales_df)
+    report["orphan_rows"] = int(orphans.sum())
+
+    for column, flag in (("PID", ORPHAN_PRODUCT), ("CID", ORPHAN_CUSTOMER)):
+        mask = (flags & flag) != 0
+        report["orphan_counts"][column] = int(mask.sum())
+        if mask.any():
+            counts = sales_df.loc[mask, column].value_counts().head(ORPHAN_SAMPLE_SIZE)
+            report["orphan_samples"][column] = {str(key): int(count) for key, count in counts.items()}
+
+    if not report["orphan_rows"] or policy == "keep":
+        return sales_df, report
+
+    if policy == "reject":
+        raise ReferentialIntegrityError(
+            f"{report['orphan_rows']:,} sales rows reference unknown products ({report['orphan_counts']['PID']:,}) "
+            f"or customers ({report['orphan_counts']['CID']:,}), e.g. PID {list(report['orphan_samples']['PID'])} "
+            f"and CID {list(report['orphan_samples']['CID'])}"
+        )
+
+    report["quarantined"] = report["orphan_rows"]
+    report["quarantine"] = sales_df[orphans].head(MAX_QUARANTINE_ROWS).reset_index(drop=True)
+    return sales_df[~orphans].reset_index(drop=True), report
 
 if __name__ == "__main__":
     # Example usage of the functions with file objects
@@ -170,8 +533,18 @@ if __name__ == "__main__":
         sales_df = process_sales_file(sales_file)
         customer_df = process_customer_file(customer_file)
 
+    # The same sales with Arrow-backed text columns
+    with open("tests/s3.csv", "rb") as sales_file:
+        arrow_sales_df = process_sales_file(sales_file, string_dtype="arrow")
+    print(f"Sales: {sales_df.memory_usage(deep=True).sum():,} bytes with object columns, "
+          f"{arrow_sales_df.memory_usage(deep=True).sum():,} with Arrow dtypes")
+
     # Display loaded DataFrames
     print("Product Data:\n", product_df)
     print("\nSales Data:\n", sales_df)
     print("\nCustomer Data:\n", customer_df)
 
+    # Sales of products and customers missing from their files are set aside
+    checked_df, report = check_referential_integrity(sales_df, build_key_indexes(product_df.head(3), customer_df))
+    print(f"\n{report['orphan_rows']} orphan rows quarantined, samples: {report['orphan_samples']}")
+
@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; fall back to msvcrt byte-range locks
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def file_lock(lock_path, exclusive=True):
+    """
+    Holds an advisory lock on lock_path for the duration of the block.
+
+    Parameters:
+    - lock_path (str): File used as the lock (created if missing).
+    - exclusive (bool): Exclusive (writer) lock if True, shared (reader) lock otherwise.
+
+    Yields:
+    - file: The open lock file (e.g. to check it was not unlinked while waiting).
+    """
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield lock_file
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield lock_file
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def atomic_write_json(path, data):
+    """
+    Writes JSON to a temporary file and swaps it into place so readers never see a partial file.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "settings.json")
+    with file_lock(path + ".lock"):
+        atomic_write_json(path, {"theme": "dark"})
+    with file_lock(path + ".lock", exclusive=False), open(path, encoding="utf-8") as file:
+        print(json.load(file))
@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from data_preproccesing.data_preprocessor import arrow_table_to_df, parse_datetimes
+
+# Default folder of the partitioned sales history
+WAREHOUSE_DIR = "data_store/warehouse"
+
+# Summary of the stored history, written next to the partitions
+METADATA_FILE = "_metadata.json"
+
+# Partition folder for rows whose date could not be parsed
+UNDATED_PARTITION = "undated"
+
+def month_partition(year, month):
+    """Relative folder of one month's partition (hive style, e.g. 'year=2024/month=02')."""
+    return os.path.join(f"year={year}", f"month={month:02d}")
+
+def months_between(start, end):
+    """
+    Lists the (year, month) pairs overlapping [start, end].
+
+    Returns:
+    - list: (year, month) tuples in chronological order.
+    """
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+class SalesWarehouse:
+    """
+    Sales history stored as Parquet files partitioned by year and month.
+
+    Range reads only open the partitions overlapping the requested dates, and only
+    the requested columns within them, so a 90-day window costs about three months
+    of data whatever the length of the history.
+    """
+
+    def __init__(self, directory=WAREHOUSE_DIR):
+        self.directory = directory
+
+    # === Writing ===
+
+    def write_sales(self, sales_df, date_column="Date"):
+        """
+        Replaces the stored history with sales_df, one Parquet file per month.
+
+        The new partitions are written to a temporary folder and swapped in, so readers
+        never see a half-written history.
+
+        Parameters:
+        - sales_df (pd.DataFrame): Processed sales data with a date column.
+        - date_column (str): Column the partitions are derived from.
+
+        Returns:
+        - dict: The stored metadata ('rows', 'min_date', 'max_date', 'partitions').
+        """
+        dates = parse_datetimes(sales_df[date_column])
+        data = sales_df.assign(**{date_column: dates})
+
+        parent = os.path.dirname(os.path.abspath(self.directory))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=parent, prefix=".warehouse-")
+
+        partitions = []
+        keys = [dates.dt.year.rename("year"), dates.dt.month.rename("month")]
+        for (year, month), part in data.groupby(keys, sort=True):
+            relative = month_partition(int(year), int(month))
+            self._write_partition(part, os.path.join(staging, relative))
+            partitions.append(relative)
+
+        undated = data[dates.isna()]
+        if len(undated):
+            self._write_partition(undated, os.path.join(staging, UNDATED_PARTITION))
+            partitions.append(UNDATED_PARTITION)
+
+        metadata = {
+            "rows": int(len(data)),
+            "date_column": date_column,
+            "min_date": dates.min().strftime("%Y-%m-%d") if dates.notna().any() else None,
+            "max_date": dates.max().strftime("%Y-%m-%d") if dates.notna().any() else None,
+            "partitions": partitions,
+        }
+        with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as file:
+            json.dump(metadata, file)
+
+        # Swap the new history in (the old folder is removed after the rename)
+        previous = None
+        if os.path.exists(self.directory):
+            previous = staging + "-old"
+            os.replace(self.directory, previous)
+        os.replace(staging, self.directory)
+        if previous:
+            shutil.rmtree(previous, ignore_errors=True)
+        return metadata
+
+    @staticmethod
+    def _write_partition(part, folder):
+        os.makedirs(folder, exist_ok=True)
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        pq.write_table(table, os.path.join(folder, "part-0.parquet"))
+
+    # === Reading ===
+
+    def metadata(self):
+        """
+        Returns:
+        - dict: Stored metadata, or None if nothing has been written.
+        """
+        path = os.path.join(self.directory, METADATA_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def latest_date(self):
+        """Latest sale date in the history (pd.Timestamp), or None."""
+        metadata = self.metadata()
+        return pd.Timestamp(metadata["max_date"]) if metadata and metadata["max_date"] else None
+
+    def partitions_for(self, start=None, end=None):
+        """
+        Selects the partition folders overlapping [start, end] (open ends include everything;
+        undated rows are only included when no range is given).
+
+        Returns:
+        - list: Absolute partition folders that exist.
+        """
+        metadata = self.metadata()
+        if metadata is None:
+            return []
+        stored = set(metadata["partitions"])
+        if start is None and end is None:
+            selected = metadata["partitions"]
+        else:
+            if metadata["min_date"] is None:
+                return []
+            start = pd.Timestamp(start if start is not None else metadata["min_date"])
+            end = pd.Timestamp(end if end is not None else metadata["max_date"])
+            selected = [relative for relative in (month_partition(y, m) for y, m in months_between(start, end)) if relative in stored]
+        return [os.path.join(self.directory, relative) for relative in selected]
+
+    def read_sales(self, start=None, end=None, columns=None):
+        """
+        Reads the sales in [start, end] (inclusive), opening only the overlapping partitions.
+
+        Parameters:
+        - start, end (str | date | pd.Timestamp, optional): Date range; open ends are unbounded.
+        - columns (list, optional): Columns to load (the date column is always available for filtering).
+
+        Returns:
+        - pd.DataFrame: Matching sales rows with the requested columns.
+        """
+        folders = self.partitions_for(start, end)
+        metadata = self.metadata()
+        if not folders:
+            return pd.DataFrame(columns=columns or [])
+
+        date_column = metadata["date_column"]
+        files = [os.path.join(folder, name) for folder in folders for name in sorted(os.listdir(folder)) if name.endswith(".parquet")]
+        dataset = ds.dataset(files, format="parquet")
+
+        condition = None
+        if start is not None:
+            condition = ds.field(date_column) >= pa.scalar(pd.Timestamp(start), type=dataset.schema.field(date_column).type)
+        if end is not None:
+            upper = ds.field(date_column) <= pa.scalar(pd.Timestamp(end), type=dataset.schema.field(date_column).type)
+            condition = upper if condition is None else condition & upper
+
+        table = dataset.to_table(columns=list(columns) if columns else None, filter=condition)
+        return arrow_table_to_df(table)  # Same text dtypes as the written sales
+
+    def read_last_days(self, days, columns=None):
+        """
+        Reads the sales of the last `days` days before (and including) the latest sale.
+
+        Returns:
+        - end_date (pd.Timestamp): Latest sale date (None if the warehouse is empty).
+        - pd.DataFrame: Sales rows in the window.
+        """
+        end_date = self.latest_date()
+        if end_date is None:
+            return None, pd.DataFrame(columns=columns or [])
+        return end_date, self.read_sales(end_date - pd.Timedelta(days=days), end_date, columns)
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    warehouse = SalesWarehouse(os.path.join(tempfile.mkdtemp(), "warehouse"))
+    print(warehouse.write_sales(pd.read_csv("tests/s3.csv")))
+
+    end_date, recent = warehouse.read_last_days(90, columns=["CID", "Date"])
+    print(f"Partitions read for the last 90 days: {len(warehouse.partitions_for(end_date - pd.Timedelta(days=90), end_date))}")
+    print(recent)
+    print(warehouse.read_sales(date(2024, 2, 1), date(2024, 2, 29), columns=["SID", "Date", "Sales_Price"]).head())
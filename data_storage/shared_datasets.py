@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import weakref
+from contextlib import contextmanager
+import pyarrow as pa
+from data_preproccesing.data_preprocessor import arrow_table_to_df
+from .file_io import atomic_write_json, file_lock
+
+# Shared-memory folder (RAM-backed on Linux), falling back to the temp folder elsewhere
+SHM_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+SHARED_DIR = os.path.join(SHM_ROOT, "profit_oracle_datasets")
+
+MANIFEST_FILE = "manifest.json"
+REFS_FILE = "refs.json"
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class SharedDatasets:
+    """
+    Processed datasets published once as Arrow IPC files in shared memory.
+
+    Sessions attach to a dataset by memory-mapping its files, so every viewer reads the
+    same pages instead of holding its own copy. Holders are reference counted in a
+    file-locked refs file (entries of dead processes are dropped); the dataset and its
+    lock file are deleted when the last holder releases it.
+    """
+
+    def __init__(self, directory=SHARED_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _folder(self, key):
+        return os.path.join(self.directory, key)
+
+    def _lock_path(self, key):
+        return os.path.join(self.directory, f"{key}.lock")  # Outside the folder, so it outlives it
+
+    @contextmanager
+    def _locked(self, key, exclusive=True):
+        """
+        Holds the dataset's lock. The last release() unlinks the lock file, so a lock taken
+        on a file that was unlinked while waiting is dropped and taken again on the new one.
+        """
+        path = self._lock_path(key)
+        while True:
+            with file_lock(path, exclusive) as lock_file:
+                try:
+                    current = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if os.path.samestat(current, os.fstat(lock_file.fileno())):
+                    yield
+                    return
+
+    def _discard_lock(self, key):
+        """Unlinks the lock file of an unpublished dataset (while holding its exclusive lock)."""
+        try:
+            os.remove(self._lock_path(key))
+        except OSError:  # Already gone, or still open elsewhere (Windows)
+            pass
+
+    # === Publishing ===
+
+    def is_published(self, key):
+        return os.path.exists(os.path.join(self._folder(key), MANIFEST_FILE))
+
+    def _write(self, key, frames):
+        folder = self._folder(key)
+        os.makedirs(folder, exist_ok=True)
+        for name, df in frames.items():
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            with os.fdopen(fd, "wb") as file, pa.ipc.new_file(file, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, os.path.join(folder, f"{name}.arrow"))
+        # The manifest is written last: its presence marks the dataset as complete
+        atomic_write_json(os.path.join(folder, MANIFEST_FILE), {"frames": list(frames)})
+
+    def publish(self, key, frames):
+        """
+        Writes the DataFrames of a dataset into shared memory (once per key).
+
+        Parameters:
+        - key (str): Dataset identifier (e.g. a fingerprint of the uploaded files).
+        - frames (dict): Name -> pd.DataFrame.
+
+        Returns:
+        - bool: Whether this call published the dataset (False if it already existed).
+        """
+        with self._locked(key):
+            if self.is_published(key):
+                return False
+            self._write(key, frames)
+            return True
+
+    # === Reference counting ===
+
+    def _read_refs(self, key):
+        path = os.path.join(self._folder(key), REFS_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as file:
+            refs = json.load(file)
+        return {holder: pid for holder, pid in refs.items() if _pid_alive(pid)}
+
+    def acquire(self, key, holder, load=None):
+        """
+        Registers holder as a user of the dataset, publishing it first if needed.
+
+        Publishing and registering happen under one lock, so another holder's final
+        release() cannot delete the dataset in between.
+
+        Parameters:
+        - load (callable, optional): Returns the frames to publish when the dataset is not
+          published (called at most once, under the lock).
+
+        Returns:
+        - int: Number of holders afterwards.
+
+        Raises:
+        - KeyError: If the dataset is not published and no load is given.
+        """
+        with self._locked(key):
+            if not self.is_published(key):
+                if load is None:
+                    self._discard_lock(key)
+                    raise KeyError(f"Dataset not published: {key}")
+                try:
+                    frames = load()
+                except BaseException:
+                    self._discard_lock(key)
+                    raise
+                self._write(key, frames)
+            refs = self._read_refs(key)
+            refs[holder] = os.getpid()
+            atomic_write_json(os.path.join(self._folder(key), REFS_FILE), refs)
+            return len(refs)
+
+    def release(self, key, holder):
+        """
+        Unregisters holder; the dataset is deleted when no live holder remains.
+
+        Returns:
+        - int: Number of holders afterwards.
+        """
+        with self._locked(key):
+            if not self.is_published(key):
+                self._discard_lock(key)
+                return 0
+            refs = self._read_refs(key)
+            refs.pop(holder, None)
+            if refs:
+                atomic_write_json(os.path.join(self._folder(key), REFS_FILE), refs)
+            else:
+                # Existing memory maps stay valid after the files are unlinked
+                shutil.rmtree(self._folder(key), ignore_errors=True)
+                self._discard_lock(key)
+            return len(refs)
+
+    def holders(self, key):
+        with self._locked(key, exclusive=False):
+            return len(self._read_refs(key))
+
+    # === Attaching ===
+
+    def attach(self, key, name):
+        """
+        Memory-maps one published frame.
+
+        Returns:
+        - pyarrow.Table: Read-only table backed by the shared file.
+        """
+        source = pa.memory_map(os.path.join(self._folder(key), f"{name}.arrow"), "r")
+        return pa.ipc.open_file(source).read_all()
+
+    def attach_frames(self, key):
+        """
+        Attaches every frame of a dataset as pandas DataFrames.
+
+        Numeric and datetime columns without missing values are zero-copy, read-only views
+        of the shared pages; other columns are materialized per session (Arrow-backed
+        strings and categoricals keep their dtypes, as compact Arrow buffers and codes).
+
+        Returns:
+        - dict: Name -> pd.DataFrame.
+        """
+        with open(os.path.join(self._folder(key), MANIFEST_FILE), "r", encoding="utf-8") as file:
+            names = json.load(file)["frames"]
+        return {name: arrow_table_to_df(self.attach(key, name), split_blocks=True) for name in names}
+
+class SharedDatasetHandle:
+    """
+    One session's reference to a shared dataset; released on close() or when garbage collected.
+
+    Parameters:
+    - load (callable, optional): Returns the frames to publish if no one has yet (see acquire).
+    """
+
+    def __init__(self, registry, key, load=None):
+        self.key = key
+        holder = f"{os.getpid()}:{uuid.uuid4().hex}"
+        registry.acquire(key, holder, load)
+        self._release = weakref.finalize(self, registry.release, key, holder)
+        self.frames = registry.attach_frames(key)
+
+    def close(self):
+        self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    import pandas as pd
+
+    shared = SharedDatasets(tempfile.mkdtemp())
+    load = lambda: {"sales": pd.read_csv("tests/s3.csv"), "products": pd.read_csv("tests/p3.csv")}
+
+    # The first handle publishes the dataset, the second attaches to it
+    with SharedDatasetHandle(shared, "example", load) as first, SharedDatasetHandle(shared, "example", load) as second:
+        print("Holders:", shared.holders("example"))
+        print(second.frames["sales"].head())
+    print("Published after the last release:", shared.is_published("example"))
+    print("Files left:", os.listdir(shared.directory))
@@ -0,0 +1,311 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+from data_preproccesing.data_preprocessor import DuplicateKeyError, parse_datetimes
+
+# Folder holding one database per uploaded dataset, and the default database
+STORE_DIR = "data_store"
+STORE_PATH = os.path.join(STORE_DIR, "datasets.sqlite3")
+
+# Databases and warehouses in STORE_DIR untouched for this long are removed when a new one is created
+STORE_MAX_AGE_SECONDS = 24 * 3600
+
+# Files SQLite keeps next to a database in WAL mode
+SIDECAR_SUFFIXES = ("-wal", "-shm")
+
+# Table names of the three datasets produced by data_preprocessor.process_*_file
+TABLES = ("products", "sales", "customers")
+
+# Columns indexed per table (only those present in the uploaded data are indexed)
+INDEXED_COLUMNS = {
+    "products": ("PID",),
+    "sales": ("SID", "PID", "CID", "Date", "Location"),
+    "customers": ("CID",),
+}
+
+# Rows converted and inserted at a time
+WRITE_BATCH_ROWS = 50_000
+
+# Key columns that must be unique (checked by the store when a table is written in chunks)
+UNIQUE_COLUMNS = {
+    "products": "PID",
+    "sales": "SID",
+    "customers": "CID",
+}
+
+META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def frame_fingerprint(df):
+    """
+    Fingerprints the columns and values of a DataFrame.
+
+    Returns:
+    - str: Hex digest identifying the DataFrame contents.
+    """
+    digest = hashlib.sha256("|".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def uploads_key(*files):
+    """
+    Identifies a set of uploaded files by their contents.
+
+    Parameters:
+    - files: Uploaded file objects (anything with getvalue() or read()).
+
+    Returns:
+    - str: 32-character hex key, the same whenever the same files are uploaded.
+    """
+    digest = hashlib.sha256()
+    for file in files:
+        data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+        if hasattr(file, "seek"):
+            file.seek(0)
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()[:32]
+
+def normalize_dates(df, column="Date"):
+    """
+    Stores dates as ISO 'YYYY-MM-DD' text (and other datetime columns, such as 'Timestamp',
+    as 'YYYY-MM-DD HH:MM:SS') so SQLite's date functions and the Date index sort and group
+    them correctly (unparseable dates become NULL).
+
+    Returns:
+    - pd.DataFrame: Copy of df with the date columns normalized.
+    """
+    df = df.copy()
+    if column in df.columns:
+        df[column] = parse_datetimes(df[column]).dt.strftime("%Y-%m-%d")
+    for name in df.columns:
+        if name != column and pd.api.types.is_datetime64_any_dtype(df[name]):
+            df[name] = df[name].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return df
+
+class SalesStore:
+    """
+    SQLite copy of the processed product, sales and customer datasets.
+
+    Each dataset is replaced as a whole when its contents change (tracked by fingerprint),
+    with indexes on the join and grouping keys. The analysis modules query it with SQL
+    aggregates, so only the grouped results are loaded back into pandas.
+
+    Datasets can live in databases of their own (say, one per uploaded product file)
+    attached to the store: the queries name their tables the same either way.
+    """
+
+    def __init__(self, path=STORE_PATH, attach=()):
+        """
+        Parameters:
+        - path (str): Database file (created if missing).
+        - attach (iterable): (schema name, database path) pairs attached to every connection;
+          tables missing from this database are looked up in them.
+        """
+        self.path = path
+        self.attach = tuple(attach)
+        self._local = threading.local()
+        self._connection().executescript(META_SCHEMA)
+
+    # === Connection handling ===
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for schema, path in self.attach:
+                conn.execute(f'ATTACH DATABASE ? AS "{schema}"', (path,))
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Runs the block in one write transaction (rolled back on error)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get_meta(self, key, default=None):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    # === Writing ===
+
+    def write_table(self, name, df):
+        """
+        Replaces a dataset table and its indexes, unless the stored copy is identical.
+
+        Parameters:
+        - name (str): One of TABLES.
+        - df (pd.DataFrame): Processed dataset.
+
+        Returns:
+        - bool: Whether the table was rewritten.
+        """
+        # Written in batches, so only one batch at a time is converted to Python rows
+        batches = (df.iloc[start:start + WRITE_BATCH_ROWS] for start in range(0, max(len(df), 1), WRITE_BATCH_ROWS))
+        return self.write_table_chunks(name, batches, frame_fingerprint(df))
+
+    def write_table_chunks(self, name, chunks, fingerprint):
+        """
+        Replaces a dataset table from an iterable of DataFrame chunks (e.g. a CSV read in
+        chunks), so the dataset never has to fit in memory. The key column's uniqueness is
+        enforced by a unique index.
+
+        Parameters:
+        - name (str): One of TABLES.
+        - chunks (iterable): pd.DataFrame chunks with the same columns.
+        - fingerprint (str): Identifies the source (e.g. uploads_key of the file); the table
+          is not rewritten if it is unchanged.
+
+        Returns:
+        - bool: Whether the table was rewritten.
+
+        Raises:
+        - DuplicateKeyError: If the key column has duplicate values.
+        """
+        if name not in TABLES:
+            raise ValueError(f"Unknown table: {name}. Expected one of {TABLES}")
+        if self.get_meta(f"fingerprint:{name}") == fingerprint:
+            return False
+
+        key = UNIQUE_COLUMNS[name]
+        with self.transaction() as conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            columns = None
+            for chunk in chunks:
+                rows = normalize_dates(chunk)
+                if columns is None:
+                    columns = list(rows.columns)
+                    conn.execute(pd.io.sql.get_schema(rows, name))
+                placeholders = ",".join("?" * len(columns))
+                values = rows[columns].astype(object).where(rows[columns].notna(), None)
+                conn.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', values.itertuples(index=False, name=None))
+            if columns is None:
+                raise ValueError(f"No rows to write to table: {name}")
+
+            if key in columns:
+                try:
+                    conn.execute(f'CREATE UNIQUE INDEX "idx_{name}_{key}" ON "{name}" ("{key}")')
+                except sqlite3.IntegrityError as e:
+                    raise DuplicateKeyError(f"Duplicate values found in column: {key}") from e
+            for column in INDEXED_COLUMNS[name]:
+                if column in columns and column != key:
+                    conn.execute(f'CREATE INDEX "idx_{name}_{column}" ON "{name}" ("{column}")')
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (f"fingerprint:{name}", fingerprint))
+        self._connection().execute(f'ANALYZE "{name}"')  # Statistics for the query planner
+        return True
+
+    def write_datasets(self, product_df, sales_df, customer_df):
+        """
+        Stores the outputs of process_product_file, process_sales_file and process_customer_file.
+
+        Returns:
+        - dict: Table name -> whether it was rewritten.
+        """
+        return {
+            "products": self.write_table("products", product_df),
+            "sales": self.write_table("sales", sales_df),
+            "customers": self.write_table("customers", customer_df),
+        }
+
+    # === Reading ===
+
+    def query(self, sql, params=(), index_col=None):
+        """
+        Runs a (read-only) SQL query against the datasets.
+
+        Returns:
+        - pd.DataFrame: Query result.
+        """
+        return pd.read_sql_query(sql, self._connection(), params=params, index_col=index_col)
+
+    def query_chunks(self, sql, params=(), chunk_rows=WRITE_BATCH_ROWS):
+        """
+        Runs a (read-only) SQL query, yielding its result in chunks (for results too large
+        to load at once, such as a join over the whole sales table).
+
+        Yields:
+        - pd.DataFrame: Up to chunk_rows rows of the result.
+        """
+        yield from pd.read_sql_query(sql, self._connection(), params=params, chunksize=chunk_rows)
+
+    def columns(self, name):
+        """Column names of a dataset table, in order."""
+        return [row[1] for row in self._connection().execute(f'PRAGMA table_info("{name}")')]
+
+    def has_table(self, name):
+        """Whether a dataset table exists here or in an attached database."""
+        return bool(self.columns(name))
+
+    def row_count(self, name):
+        return self._connection().execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+
+def prune_stores(keep=(), max_age=STORE_MAX_AGE_SECONDS, store_dir=STORE_DIR):
+    """
+    Removes the databases and warehouse folders of datasets nobody used in max_age seconds
+    (sessions touch the ones they use on every rerun).
+
+    Parameters:
+    - keep (iterable): Databases or folders (paths) kept whatever their age.
+
+    Returns:
+    - list: Removed paths.
+    """
+    if not os.path.isdir(store_dir):
+        return []
+    keep = {os.path.abspath(path) for path in keep}
+    cutoff = time.time() - max_age
+    removed = []
+    for entry in os.scandir(store_dir):
+        if entry.name.startswith(".") or os.path.abspath(entry.path) in keep:  # Warehouses being written
+            continue
+        try:
+            if entry.is_dir() and entry.name.endswith("-warehouse"):
+                newest = max([entry.stat().st_mtime] + [file.stat().st_mtime for file in os.scandir(entry.path)])
+            elif entry.is_file() and entry.name.endswith(".sqlite3"):
+                sidecars = [entry.path + suffix for suffix in SIDECAR_SUFFIXES if os.path.exists(entry.path + suffix)]
+                newest = max([entry.stat().st_mtime] + [os.stat(path).st_mtime for path in sidecars])
+            else:
+                continue
+        except FileNotFoundError:  # Pruned by another session
+            continue
+        if newest >= cutoff:
+            continue
+        if entry.is_dir():
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            for path in [entry.path] + [entry.path + suffix for suffix in SIDECAR_SUFFIXES]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        removed.append(entry.path)
+    return removed
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    import tempfile
+
+    store = SalesStore(os.path.join(tempfile.mkdtemp(), "datasets.sqlite3"))
+    print(store.write_datasets(pd.read_csv("tests/p3.csv"), pd.read_csv("tests/s3.csv"), pd.read_csv("tests/c3.csv")))
+    print(store.write_datasets(pd.read_csv("tests/p3.csv"), pd.read_csv("tests/s3.csv"), pd.read_csv("tests/c3.csv")))  # Unchanged: skipped
+
+    print(store.query('SELECT Location, SUM(Sales_Price) AS Total_Sales FROM sales GROUP BY Location ORDER BY Total_Sales DESC'))
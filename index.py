@@ -1,4 +1,5 @@
 import streamlit as st
+from app_startup.lazy_loading import prewarm_in_background
 
 # =========================================
 # 🏛️ Streamlit Multi-Page Application Setup
@@ -26,3 +27,9 @@ navigation_controller = st.navigation(
 
 if __name__ == "__main__":
     navigation_controller.run()
+
+    # Shared logo, added after the page so decoding the image never delays its first paint
+    st.logo("assets/logo.png", size='large')
+
+    # Load the scientific stack in the background while the user reads the page
+    prewarm_in_background()
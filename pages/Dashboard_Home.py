@@ -2,10 +2,6 @@ import streamlit as st
 
 # Sales Analysis & Prediction System
 
-# Load and display the company logo
-logo_path = "assets/logo.png"  # Ensure the correct path to your logo
-st.logo(logo_path, size='large')
-
 # Project Overview
 
 st.title("The Profit Oracle")
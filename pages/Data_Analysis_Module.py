@@ -1,15 +1,318 @@
+import os
 import streamlit as st
-import data_preproccesing.data_preprocessor as dp
-import sales_analysis.sales_trends as sts
-import sales_analysis.repeat_customers as rc
-import sales_analysis.profit_per_category as ppc
-import sales_analysis.location_sales_analysis as lsa
-import sales_analysis.location_profit as lp
-import prediction.sales_analysis as sa
-
-# Logo
-image = "assets/logo.png"
-st.logo(image, size='large')
+
+# Analysis modules (pandas, NumPy, Matplotlib) are imported only once they are needed,
+# so the upload form renders without loading the scientific stack.
+
+@st.cache_resource(validate=lambda store: os.path.exists(store.path))
+def get_sales_store(path, attach=()):
+    """
+    One SQL store per uploaded dataset, shared by the sessions analyzing it. Creating one
+    removes the stores nobody used for a day.
+    """
+    from data_storage.sql_store import SalesStore, prune_stores
+    prune_stores(keep=[path, *(attached for _, attached in attach)])
+    return SalesStore(path, attach)
+
+@st.cache_resource(validate=lambda store: os.path.exists(store.path))
+def get_dataset_store(path, name, _df, attach=()):
+    """Store of one processed dataset, written once per upload (not fingerprinted again on every rerun)."""
+    store = get_sales_store(path, attach)
+    store.write_table(name, _df)
+    return store
+
+@st.cache_resource
+def get_shared_datasets():
+    """Registry of processed datasets in shared memory, one per server process."""
+    from data_storage.shared_datasets import SharedDatasets
+    return SharedDatasets()
+
+@st.cache_resource
+def get_graph_memo():
+    """Outputs of the analysis graph, shared by all sessions and keyed by input fingerprints."""
+    from pipeline.analysis_graph import GraphMemo
+    return GraphMemo()
+
+def load_processed_datasets(graph, keys):
+    """
+    Returns this session's read-only views of the processed datasets.
+
+    Each dataset is cleaned (by the graph's clean nodes, so only changed uploads are
+    reprocessed) and published to shared memory under its own key only by the first
+    session that uploads it; later sessions (and reruns) attach to the published copy.
+    Publishing and attaching happen under the dataset's lock, so a concurrent release
+    cannot delete it.
+
+    Parameters:
+    - keys (dict): Dataset name ('products', 'sales', 'customers') -> key of its contents.
+    """
+    from data_storage.shared_datasets import SharedDatasetHandle
+
+    handles = st.session_state.setdefault("shared_datasets", {})
+    frames = {}
+    for name, key in keys.items():
+        handle = handles.get(name)
+        if handle is None or handle.key != key:
+            if handle is not None:
+                handle.close()  # The session switched to another upload of this dataset
+            handle = SharedDatasetHandle(get_shared_datasets(), key, lambda name=name: {name: graph.compute(name)})
+            handles[name] = handle
+        frames[name] = handle.frames[name]
+
+    # The memo's heap copies of the cleaned datasets would double the shared ones: the views
+    # replace them (the integrity report is kept, so the files need not be cleaned again)
+    graph.compute("integrity")
+    for name in ("sales_rows", "checked_sales"):
+        graph.evict(name)
+    for name, df in frames.items():
+        graph.seed(name, df)
+    return frames
+
+@st.cache_resource(validate=lambda warehouse: warehouse.metadata() is not None)
+def get_sales_warehouse(directory, _sales_df):
+    """Date-partitioned copy of the uploaded sales history, written once per upload."""
+    from data_storage.sales_warehouse import SalesWarehouse
+    warehouse = SalesWarehouse(directory)
+    if warehouse.metadata() is None:
+        warehouse.write_sales(_sales_df)
+    return warehouse
+
+@st.cache_resource
+def get_sales_sample(sales_key, dimension_keys, sample_rows, policy, string_dtype, _store, _sales_file, _plan, _product_df, _customer_df):
+    """
+    Streams an upload too large for memory into the store once, keeping a sample of its sales
+    (and the integrity report and correlations, which also depend on the dimensions).
+    """
+    from data_preproccesing.data_preprocessor import build_key_indexes
+    from pipeline.execution_planner import ingest_sales_in_chunks
+    indexes = build_key_indexes(_product_df, _customer_df)
+    return ingest_sales_in_chunks(_store, _sales_file, sales_key, sample_rows,
+                                  _plan["sales_rows"], indexes, policy, string_dtype=string_dtype,
+                                  products_df=_product_df, customers_df=_customer_df, chunk_rows=_plan["chunk_rows"])
+
+def load_analysis(product_file, sales_file, customer_file, policy, string_dtype, plan):
+    """
+    Cleans, stores and shares the uploaded datasets as the execution plan says, and builds
+    the analysis graph over them.
+
+    Returns:
+    - dict: 'graph', the 'products', 'sales' (a sample when streamed) and 'customers'
+      frames, the SQL 'store' and the 'integrity_report'.
+    """
+    from data_storage.sql_store import STORE_DIR
+    from pipeline.analysis_pipeline import build_analysis_graph
+    from pipeline import execution_planner as ep
+
+    graph = build_analysis_graph(product_file, sales_file, customer_file, get_graph_memo(),
+                                 integrity_policy=policy, string_dtype=string_dtype)
+
+    # Each dataset is stored and shared under a key of its own contents, so replacing one
+    # file only rewrites that dataset
+    keys = {name: f"{name}-{graph.fingerprint(name)[:32]}" for name in ("products", "customers")}
+    if plan["ingest"] == "in_memory":  # The cleaned rows: the same if the dimensions remove no others
+        keys["sales"] = f"sales-{graph.fingerprint('sales')[:32]}"
+    else:  # The streamed rows: the sales file's, less those quarantined against the dimensions
+        keys["sales"] = f"sales-{graph.fingerprint('checked_sales' if policy == 'quarantine' else 'sales_rows')[:32]}-{policy}"
+    store_paths = {name: os.path.join(STORE_DIR, f"{key}.sqlite3") for name, key in keys.items()}
+    warehouse_dir = os.path.splitext(store_paths["sales"])[0] + "-warehouse"
+    for path in (*store_paths.values(), warehouse_dir):  # In use: kept by prune_stores
+        if os.path.exists(path):
+            os.utime(path)
+
+    attach = (("products_db", store_paths["products"]), ("customers_db", store_paths["customers"]))
+
+    if plan["ingest"] == "in_memory":
+        # Cleaned datasets are shared between the sessions analyzing the same uploads
+        frames = load_processed_datasets(graph, keys)
+        product_df, sales_df, customer_df = frames["products"], frames["sales"], frames["customers"]
+
+        # Persist the cleaned datasets; aggregates the plan does not keep in memory run in SQL
+        get_dataset_store(store_paths["products"], "products", product_df)
+        get_dataset_store(store_paths["customers"], "customers", customer_df)
+        store = get_dataset_store(store_paths["sales"], "sales", sales_df, attach)
+        warehouse = get_sales_warehouse(warehouse_dir, sales_df)
+        total_rows = len(sales_df)
+        integrity_report = graph.compute("integrity")
+    else:
+        # Too large to load: the sales are streamed into the store, keeping only a sample
+        product_df, customer_df = graph.compute("products"), graph.compute("customers")
+        get_dataset_store(store_paths["products"], "products", product_df)
+        get_dataset_store(store_paths["customers"], "customers", customer_df)
+        store = get_sales_store(store_paths["sales"], attach)
+        sales_df, total_rows, integrity_report, accumulator = get_sales_sample(
+            keys["sales"], (keys["products"], keys["customers"]), plan["sample_rows"], policy, string_dtype,
+            _store=store, _sales_file=sales_file, _plan=plan, _product_df=product_df, _customer_df=customer_df
+        )
+        frames = {"products": product_df, "sales": sales_df, "customers": customer_df}
+        warehouse = None
+
+    # Every analysis is a graph node memoized by the uploads it reads, so replacing one
+    # file only recomputes the charts that depend on it
+    graph = build_analysis_graph(product_file, sales_file, customer_file, get_graph_memo(), store, warehouse,
+                                 in_memory=ep.in_memory_aggregates(plan), integrity_policy=policy, string_dtype=string_dtype)
+    ep.apply_plan(graph, plan, total_rows)
+    for name, df in frames.items():
+        graph.seed(name, df)
+    if plan["ingest"] == "chunked":  # Correlations of every stored row, not just the sample's
+        graph.seed("correlation_accumulator", accumulator)
+    return {"graph": graph, "products": product_df, "sales": sales_df, "customers": customer_df,
+            "store": store, "integrity_report": integrity_report}
+
+@st.cache_resource
+def start_cleaning(dataset_key, policy, string_dtype, _graph, _sales_file):
+    """
+    Cleans the uploads in a background thread, once per upload, after taking a first look
+    at the sales file: charts are previewed from it while the cleaning runs.
+
+    Returns:
+    - dict: The cleaning's 'future', and the 'first_look' (from progressive.first_look(),
+      dropped by the page once the cleaning is done).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from pipeline.progressive import first_look
+
+    # Read before the cleaning starts reading the same upload
+    look = first_look(_sales_file, _graph.compute("products"), _graph.compute("customers"), policy, string_dtype)
+    job = {"graph": _graph}
+
+    def clean():
+        graph = job.pop("graph")  # Not kept (with the uploads) once done
+        for name in ("sales", "integrity"):
+            graph.compute(name)
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleaning")
+    future = executor.submit(clean)
+    executor.shutdown(wait=False)
+    return {"future": future, "first_look": look}
+
+def wait_for_cleaning(future):
+    """
+    Waits for the uploads cleaned in the background. The page is updated while it waits, so a
+    click reruns it at once (previewing from the first look) rather than after the cleaning.
+    """
+    import time
+
+    status = st.empty()
+    start = time.perf_counter()
+    while not future.done():
+        status.caption(f"⏳ Cleaning the uploads... {time.perf_counter() - start:.0f}s")
+        time.sleep(0.2)
+    status.empty()
+    future.result()  # Raises the cleaning's error
+
+def show_integrity_report(report):
+    """Warns about sales of unknown products or customers and offers the quarantined rows."""
+    if not report["orphan_rows"]:
+        return
+    action = {"quarantine": "were set aside and are excluded from the analyses",
+              "keep": "are kept: their profit and customer figures are incomplete"}[report["policy"]]
+    st.warning(
+        f"🔗 {report['orphan_rows']:,} of {report['rows']:,} sales rows reference products or customers missing "
+        f"from their files ({report['orphan_counts']['PID']:,} unknown PIDs, {report['orphan_counts']['CID']:,} "
+        f"unknown CIDs) and {action}."
+    )
+    with st.expander("Orphan sales details"):
+        for column, label in (("PID", "Unknown products"), ("CID", "Unknown customers")):
+            if report["orphan_samples"][column]:
+                st.markdown(f"**{label}** (most frequent)")
+                st.dataframe(
+                    {column: list(report["orphan_samples"][column]), "Sales rows": list(report["orphan_samples"][column].values())},
+                    use_container_width=True, hide_index=True
+                )
+        if report["quarantine"] is not None:
+            st.download_button(
+                "Download quarantined rows (CSV)", report["quarantine"].to_csv(index=False).encode("utf-8"),
+                file_name="quarantined_sales.csv", mime="text/csv"
+            )
+
+def show_plan(plan):
+    """Reports the execution plan and its estimated cost before any analysis runs."""
+    from pipeline.execution_planner import format_bytes, plan_table
+
+    estimated = sum(estimate["memory_bytes"] for estimate in plan["estimates"].values())
+    if plan["ingest"] == "in_memory":
+        loading = "loaded in memory"
+    else:
+        loading = (f"streamed into the SQL store in chunks of {plan['chunk_rows']:,} rows, "
+                   f"keeping a {plan['sample_rows']:,}-row sample in memory")
+    constrained = any(analysis["strategy"] != "in_memory" for analysis in plan["analyses"].values())
+    with st.expander("🧭 Execution plan", expanded=constrained):
+        st.caption(
+            f"Estimated in-memory size of the uploads: {format_bytes(estimated)} "
+            f"(~{plan['sales_rows']:,} sales rows) against a {format_bytes(plan['budget'])} budget. "
+            f"Sales are {loading}."
+        )
+        st.dataframe(plan_table(plan), use_container_width=True, hide_index=True)
+
+def show_chart(graph, name, render, progressive, first_look=None):
+    """
+    Renders a chart node in place: from the first look and growing stratified samples first
+    (when progressive), each preview replaced by the next and finally by the exact result.
+
+    Parameters:
+    - graph (AnalysisGraph or callable): See progressive.progressive_charts().
+    - render (callable): Called with the node's (table, chart) output.
+    - first_look (dict, optional): Sample of the upload, previewed while it is cleaned.
+    """
+    from pipeline.progressive import PREVIEW_ROWS, progressive_charts
+
+    placeholder = st.empty()
+    previewed = False
+    stages = progressive_charts(graph, name, PREVIEW_ROWS if progressive else (), first_look if progressive else None)
+    for stage, (table, chart) in stages:
+        with placeholder.container():
+            render(table, chart)
+            if stage["first_look"]:
+                previewed = True
+                st.caption(
+                    f"⏳ First look from {stage['rows']:,} sales read across the upload (of ~{stage['total_rows']:,}) "
+                    f"while it is processed: totals scaled ×{stage['scale']:,.1f}, ±{stage['margin']:.1%} at 95% "
+                    f"confidence. Refining…"
+                )
+            elif not stage["exact"]:
+                previewed = True
+                st.caption(
+                    f"⏳ Preview from a stratified sample of {stage['rows']:,} of {stage['total_rows']:,} sales "
+                    f"(by Location/Category): totals scaled ×{stage['scale']:,.1f}, "
+                    f"±{stage['margin']:.1%} at 95% confidence. Refining…"
+                )
+            elif previewed:  # Same layout as the previews, so none of their elements linger
+                st.caption(f"✅ Exact result from all {stage['total_rows']:,} sales.")
+
+def show_image(table, chart):
+    st.image(chart, use_container_width=True)
+
+def show_image_and_table(table, chart):
+    st.image(chart, use_container_width=True)
+    st.dataframe(table, use_container_width=True)
+
+def show_download(path, label):
+    """
+    Offers a finished export for download. The file is read from disk only when its download
+    is requested (and dropped on the next rerun), in parts when too large for one download.
+    """
+    from pipeline.data_export import download_parts, read_part
+    from pipeline.execution_planner import format_bytes
+
+    parts = download_parts(path)
+    name = os.path.basename(path)
+    for number, (offset, size) in enumerate(parts, start=1):
+        part_name = name if len(parts) == 1 else f"{name}.part{number:03d}"
+        if st.button(f"Download {label} ({format_bytes(size)})" if len(parts) == 1 else
+                     f"Download {label}, part {number} of {len(parts)} ({format_bytes(size)})", key=f"download-{path}-{number}"):
+            st.download_button(f"💾 Save {part_name}", read_part(path, offset, size), file_name=part_name, key=f"save-{path}-{number}")
+    if len(parts) > 1:
+        st.caption(f"Join the parts in order to get {name} back (`cat {name}.part* > {name}`).")
+
+def show_anomalies(anomalies, chart):
+    if anomalies.empty:
+        st.success("No sudden drops or spikes in the daily sales of any location.")
+        return
+    drops = int((anomalies["Anomaly"] == "drop").sum())
+    st.warning(f"{drops:,} sudden drops and {len(anomalies) - drops:,} spikes in the daily sales of "
+               f"{anomalies['Location'].nunique():,} locations (latest first).")
+    st.image(chart, use_container_width=True)
+    st.dataframe(anomalies, use_container_width=True, hide_index=True)
 
 # Title & File Upload Section
 
@@ -68,6 +371,7 @@ if not( product_file and sales_file and customer_file):
     ### 🚧 **Restrictions & Compliance**  
     - Ensure **no missing values** in mandatory fields.  
     - Unique identifiers (`PID`, `CID`, `SID`) should not have duplicates.  
+    - Every `PID` and `CID` in the sales data must exist in the product and customer files (sales without a customer use `CID` 0).  
 
     ---
 
@@ -91,41 +395,173 @@ try:
     # Analysis Options with Witty Labels
     if product_file and sales_file and customer_file:
         
-        product_df = dp.process_product_file(product_file)
-        sales_df = dp.process_sales_file(sales_file)
-        customer_df = dp.process_customer_file(customer_file)
-        
+        from data_storage.sql_store import uploads_key
+        from data_preproccesing.data_preprocessor import INTEGRITY_POLICIES, INTEGRITY_POLICY, STRING_DTYPE
+        from pipeline.analysis_pipeline import build_analysis_graph
+        from pipeline import execution_planner as ep
+
+        policy = st.radio(
+            "Sales rows with unknown products or customers", INTEGRITY_POLICIES, index=INTEGRITY_POLICIES.index(INTEGRITY_POLICY),
+            format_func={"reject": "Reject the upload", "quarantine": "Quarantine the rows", "keep": "Keep the rows"}.get,
+            horizontal=True
+        )
+        string_dtype = "arrow" if st.toggle(
+            "Arrow dtypes 🏹", value=STRING_DTYPE == "arrow",
+            help="Load text columns as Arrow-backed strings, and locations, genders and categories as categoricals: "
+                 "a fraction of the memory, and faster grouping."
+        ) else "object"
+
+        # Plan how each analysis runs within the memory budget before loading anything
+        plan = ep.plan_execution(ep.estimate_uploads(product_file, sales_file, customer_file, string_dtype))
+        show_plan(plan)
+
+        dataset_key = f"{uploads_key(product_file, sales_file, customer_file)}-{policy}-{string_dtype}"
+
+        # The integrity report is shown here once the uploads are cleaned
+        report_container = st.container()
+
         st.subheader("Analysis Menu")
 
+        from pipeline.progressive import PROGRESSIVE_MIN_ROWS
+        progressive = st.toggle(
+            "Progressive previews ⏳", value=plan["ingest"] == "in_memory" and plan["sales_rows"] >= PROGRESSIVE_MIN_ROWS,
+            disabled=plan["ingest"] != "in_memory",  # Only a sample of the sales is in memory
+            help="Show each chart from a sample read across the upload first, refined until the exact result replaces it."
+        )
+
+        # With previews, the uploads are cleaned in the background and the charts start from a
+        # first look at the sales file; the analyses wait for the cleaning when they need it
+        cleaning, first_look = None, None
+        if progressive:
+            cleaning = start_cleaning(dataset_key, policy, string_dtype,
+                                      _graph=build_analysis_graph(product_file, sales_file, customer_file, get_graph_memo(),
+                                                                  integrity_policy=policy, string_dtype=string_dtype),
+                                      _sales_file=sales_file)
+            if cleaning["future"].done():
+                cleaning.pop("first_look", None)
+            first_look = cleaning.get("first_look")
+
+        loaded = {}
+
+        def get_analysis():
+            """This run's datasets and analysis graph, loaded when first needed."""
+            if not loaded:
+                if cleaning is not None:
+                    wait_for_cleaning(cleaning["future"])
+                loaded.update(load_analysis(product_file, sales_file, customer_file, policy, string_dtype, plan))
+                with report_container:
+                    show_integrity_report(loaded["integrity_report"])
+            return loaded
+
+        def get_graph():
+            return get_analysis()["graph"]
+
         if st.button("Sales Trends 📊"):
-            fig = sts.plot_sales_trends(sales_df)
-            st.pyplot(fig)
+            show_chart(get_graph, "sales_trends_chart", show_image, progressive, first_look)
+
+        if st.button("Sales Anomalies🚨"):
+            show_chart(get_graph, "sales_anomalies_chart", show_anomalies, progressive, first_look)
 
 
         if st.button("Reapeat Customers🔁"):
-            repeat_customer_df, fig = rc.analyze_repeat_customers(sales_df)
+            repeat_customer_df, chart = get_graph().compute("repeat_customers_chart")
             st.dataframe(repeat_customer_df, use_container_width=True, hide_index=True)
-            st.pyplot(fig)
+            st.image(chart, use_container_width=True)
 
 
         if st.button("Categorywise profit💵"):
-            fig = ppc.analyze_profit_per_category(sales_df, product_df)
-            st.pyplot(fig)
+            show_chart(get_graph, "category_profit_chart", show_image, progressive, first_look)
 
 
         if st.button("Sales Location analysis🗺"):
-            fig = lsa.analyze_sales_by_location(sales_df, customer_df)
-            st.pyplot(fig)
+            show_chart(get_graph, "location_sales_chart", show_image, progressive, first_look)
                 
                 
         if st.button("Locationwise Profit📊"):
-            fig = lp.analyze_category_and_profit(sales_df, product_df)
-            st.pyplot(fig)
+            show_chart(get_graph, "location_profit_chart", show_image, progressive, first_look)
                 
                 
         if st.button("Sales Analysis📶"):
-            fig = sa.generate_combined_figure(sales_df, product_df, customer_df)
-            st.pyplot(fig)
+            show_chart(get_graph, "sales_analysis_chart", show_image, progressive, first_look)
+
+
+        if st.button("Price Elasticity🏷️"):
+            def show_elasticity(coefficients, chart):
+                st.image(chart, use_container_width=True)
+                st.dataframe(coefficients, use_container_width=True, hide_index=True)
+            show_chart(get_graph, "elasticity_chart", show_elasticity, progressive, first_look)
+
+
+        if st.button("Sales Forecast🔮"):
+            show_chart(get_graph, "location_forecast_chart", show_image_and_table, progressive, first_look)
+            show_chart(get_graph, "category_forecast_chart", show_image_and_table, progressive, first_look)
+
+
+        # The remaining analyses read the datasets themselves
+        analysis = get_analysis()
+        graph, product_df, sales_df, customer_df = analysis["graph"], analysis["products"], analysis["sales"], analysis["customers"]
+        store = analysis["store"]
+
+        with st.expander("Cohort Retention🧬"):
+            from sales_analysis.cohort_retention import ALL_LOCATIONS
+            cohort_location = st.selectbox(
+                "Cohorts of", [ALL_LOCATIONS, *sorted(sales_df["Location"].dropna().unique())],
+                index=None, placeholder="Choose a location (or all locations)"
+            )
+            if cohort_location == ALL_LOCATIONS:
+                _, chart = graph.compute("cohort_retention_chart")
+                st.image(chart, use_container_width=True)
+            elif cohort_location is not None:
+                from sales_analysis.cohort_retention import plot_cohort_retention
+                from pipeline.analysis_pipeline import figure_png
+                cohort_counts = graph.compute("cohort_retention")
+                if cohort_location in cohort_counts.index.get_level_values("Location"):
+                    st.image(figure_png(plot_cohort_retention(cohort_counts, cohort_location)), use_container_width=True)
+                else:
+                    st.info("No identified customers bought at this location.")
+
+
+        with st.expander("What-if Pricing🔮"):
+            candidate_prices = st.text_input("Candidate sales prices (comma separated)", "")
+            if candidate_prices:
+                import prediction.sales_analysis as sa
+                import prediction.model_registry as mr
+                try:
+                    prices = [float(price) for price in candidate_prices.split(",") if price.strip()]
+                except ValueError as e:  # A typo in the prices, not in the uploads
+                    st.warning(f"Candidate prices must be numbers separated by commas (e.g. 499, 999.5): {e}.")
+                else:
+                    model = mr.fit_or_load_model(sales_df, sa.fit_quantity_model)
+                    if model is None:
+                        st.warning("Data issue: Zero variance in Sales_Price or Quantity_Sold.")
+                    else:
+                        st.dataframe(
+                            {"Sales_Price": prices, "Predicted_Quantity_Sold": mr.predict(model, prices)},
+                            use_container_width=True, hide_index=True
+                        )
+
+
+        with st.expander("Export Data📦"):
+            from pipeline import data_export as de
+            export_format = st.radio("Format", de.EXPORT_FORMATS, format_func={"parquet": "Parquet", "csv": "CSV"}.get, horizontal=True)
+            export_dir = os.path.join(de.EXPORT_DIR, f"{dataset_key}-{plan['ingest']}")
+            enriched_path = os.path.join(export_dir, f"sales_enriched.{export_format}")
+            aggregates_path = os.path.join(export_dir, f"analysis_tables-{export_format}.zip")
+
+            if st.button("Prepare export"):
+                de.prune_exports(keep=[export_dir])
+                with st.spinner("Writing the enriched sales and the table behind every analysis..."):
+                    if plan["ingest"] == "in_memory":
+                        chunks, schema = de.enriched_sales_chunks(sales_df, product_df, customer_df), None
+                    else:  # Only a sample is in memory: the full sales are streamed back from the store
+                        chunks = de.stored_enriched_sales_chunks(store, chunk_rows=plan["chunk_rows"])
+                        schema = de.stored_enriched_sales_schema(store)
+                    de.export_enriched_sales(enriched_path, chunks, export_format, schema)
+                    de.export_aggregates(aggregates_path, graph, export_format)
+
+            for path, label in ((enriched_path, "enriched sales"), (aggregates_path, "analysis tables")):
+                if os.path.exists(path):
+                    show_download(path, label)
 
             
 except Exception as e:
@@ -1,9 +1,5 @@
 import streamlit as st
 
-# Logo
-image = "assets/logo.png"
-st.logo(image, size='large')
-
 # Page Title
 st.title("📌 Project Contributors")
 
@@ -1,9 +1,5 @@
 import streamlit as st
 
-# Logo
-image = "assets/logo.png"
-st.logo(image, size='large')
-
 # Page Title
 st.title("🔹 Technical Overview")
 
@@ -24,6 +20,7 @@ st.markdown(
     """
     - **NumPy & Pandas** – Fundamental for efficient data handling and manipulation.
     - **Matplotlib** – Used for generating clear and informative visualizations.
+    - **SQLite & PyArrow** – Persist processed datasets for SQL aggregates and date-partitioned Parquet reads.
     """
 )
 
@@ -1,79 +1,33 @@
 import streamlit as st
-from wordcloud import WordCloud, STOPWORDS
-import matplotlib.pyplot as plt
-import json
-import os
-from collections import Counter, deque
-import re
-import numpy as np
-
-# Logo
-image = "assets/logo.png"
-st.logo(image, size='large')
+from review_system.review_store import ReviewStore
+from review_system.word_filter import WordFilter
+from review_system.word_cloud_cache import WordCloudCache
 
 # Page Title
 st.title("View Reviews📨")
 
-# File Paths
-REVIEW_PATH = "reviews/recent_reviews.json"
-WORD_COUNT_PATH = "reviews/word_count.json"
+# Review storage (append-only log + snapshot inside the reviews folder)
+REVIEW_DIR = "reviews"
 REVIEW_LIMIT = 6
 
-# Expanded filter words to prevent "lol" variations and vandalism
-FILTER_WORDS = {
-    "lol", "lolis", "laughing", "out", "loud",  # Cover "laughing out loud" and variations
-    "haha", "hehe", "lmao", "rofl"  # Other informal laughter terms
-}
-
-# Load reviews
-def load_reviews():
-    if os.path.exists(REVIEW_PATH):
-        with open(REVIEW_PATH, "r", encoding="utf-8") as file:
-            return deque(json.load(file), maxlen=REVIEW_LIMIT)
-    return deque(maxlen=REVIEW_LIMIT)
-
-# Save reviews
-def save_reviews(reviews):
-    with open(REVIEW_PATH, "w", encoding="utf-8") as file:
-        json.dump(list(reviews), file)
-
-# Load word count
-def load_word_count():
-    if os.path.exists(WORD_COUNT_PATH):
-        with open(WORD_COUNT_PATH, "r", encoding="utf-8") as file:
-            return Counter(json.load(file))
-    return Counter()
-
-# Save word count
-def save_word_count(counter):
-    with open(WORD_COUNT_PATH, "w", encoding="utf-8") as file:
-        json.dump(dict(counter), file)
-
-# Filter words: stop words, "lol" variations, and vandalism
-def should_count_word(word):
-    # Use regex to catch "lol" with special characters (e.g., "lol!")
-    if re.search(r'l+o+l+[!@#$%^&*]*', word.lower()):
-        return False
-    # Check against stop words and filter words
-    return (word.lower() not in STOPWORDS and 
-            word.lower() not in FILTER_WORDS and 
-            not any(fw in word.lower() for fw in FILTER_WORDS))
+# Shared across sessions so the blocklist is compiled, and compaction runs, once per process
+@st.cache_resource
+def get_review_store():
+    store = ReviewStore(REVIEW_DIR, review_limit=REVIEW_LIMIT, word_filter=WordFilter())
+    if store.needs_refilter():
+        store.compact()  # Counts are stored filtered with the current blocklist
+    return store
 
-# Check if review contains "lol" or filtered words
-def contains_filtered_words(review):
-    words = review.split()
-    for word in words:
-        # Check for "lol" variations with regex
-        if re.search(r'l+o+l+[!@#$%^&*]*', word.lower()):
-            return True
-        # Check for other filter words
-        if any(fw in word.lower() for fw in FILTER_WORDS) or word.lower() in FILTER_WORDS:
-            return True
-    return False
+@st.cache_resource
+def get_word_cloud_cache():
+    return WordCloudCache(REVIEW_DIR)
 
 # Initialize data
-review_queue = load_reviews()
-word_count = load_word_count()
+review_store = get_review_store()
+word_filter = review_store.word_filter
+if word_filter.reload_if_changed():
+    review_store.compact()  # Blocklist edited: re-filter the stored counts once
+review_queue, word_count = review_store.load()
 
 # Streamlit UI
 st.title("Echoes of the Community")
@@ -86,36 +40,11 @@ else:
 
 st.subheader("📊 Word Cloud")
 if word_count:
-    # Filter word_count to remove stop words and filtered words
-    filtered_word_count = Counter()
-    for word, freq in word_count.items():
-        if should_count_word(word):
-            filtered_word_count[word.lower()] += freq
-
-    if filtered_word_count:
-        # Custom color function for a cohesive look (shades of blue)
-        def blue_color_func(word, font_size, position, orientation, random_state=None, **kwargs):
-            return f"hsl(210, 70%, {np.random.randint(40, 80)}%)"
-
-        # Generate word cloud with improved aesthetics
-        wordcloud = WordCloud(
-            width=800,
-            height=400,
-            background_color="white",  # Lighter background for clarity
-            max_words=50,  # Limit to avoid clutter
-            min_font_size=12,  # Ensure readability
-            scale=3,  # Higher resolution
-            stopwords=STOPWORDS.union(FILTER_WORDS),  # Double-check stop words
-            color_func=blue_color_func  # Apply custom colors
-        ).generate_from_frequencies(filtered_word_count)
-
-        # Display word cloud
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.imshow(wordcloud, interpolation="bilinear")
-        ax.axis("off")
-        st.pyplot(fig)
-    else:
-        st.write("No valid words to display in the word cloud after filtering.")
+    # Counts are stored already filtered; the cloud is re-rendered only when the top words change
+    image_path, fresh = get_word_cloud_cache().get(word_count)
+    st.image(image_path, use_container_width=True)
+    if not fresh:
+        st.caption("Refreshing the word cloud with the latest reviews...")
 else:
     st.write("No words to display in the word cloud yet. Submit a review!")
 
@@ -123,18 +52,11 @@ else:
 user_review = st.text_area("Got a complaint or suggestion? Drop it here", "")
 if st.button("Submit Review"):
     if user_review:
-        # Check if the review contains filtered words
-        if not contains_filtered_words(user_review):
+        # Check for filtered words and count the remaining words in one pass
+        blocked, word_deltas = word_filter.classify(user_review)
+        if not blocked:
             # Only save and process the review if it doesn't contain filtered words
-            review_queue.append(user_review)
-            save_reviews(review_queue)
-
-            # Process words for word count: remove punctuation, normalize case
-            words = re.findall(r'\b\w+\b', user_review.lower())
-            for word in words:
-                if should_count_word(word):
-                    word_count[word] += 1
-            save_word_count(word_count)
+            review_store.append(user_review, word_deltas)
 
         # Always show balloons and thanks message, even if review isn't saved
         st.balloons()
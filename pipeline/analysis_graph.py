@@ -0,0 +1,195 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Pipeline stages, in dependency order
+STAGES = ("ingest", "clean", "enrich", "aggregate", "render")
+
+MEMO_SIZE = 128  # Node outputs kept in memory (least recently used are evicted)
+
+def requires(*inputs):
+    """
+    Declares the datasets a function reads; the analysis graph wires its node to them.
+
+    Parameters:
+    - inputs (str): Names of the upstream nodes (e.g. 'sales', 'products').
+    """
+    def decorate(func):
+        func.requires = tuple(inputs)
+        return func
+    return decorate
+
+class CycleError(Exception):
+    """Raised when a node (indirectly) depends on itself."""
+    pass
+
+class GraphMemo:
+    """
+    Thread-safe LRU cache of node outputs keyed by node fingerprint; can be shared by
+    several graphs (e.g. across Streamlit sessions).
+    """
+
+    def __init__(self, max_entries=MEMO_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint, default=None):
+        with self._lock:
+            if fingerprint not in self._entries:
+                return default
+            self._entries.move_to_end(fingerprint)
+            return self._entries[fingerprint]
+
+    def put(self, fingerprint, value):
+        with self._lock:
+            self._entries[fingerprint] = value
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, fingerprint):
+        with self._lock:
+            self._entries.pop(fingerprint, None)
+
+    def __contains__(self, fingerprint):
+        with self._lock:
+            return fingerprint in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+class AnalysisGraph:
+    """
+    Explicit DAG of pipeline steps, memoized by input fingerprints.
+
+    Source nodes (the ingested uploads) carry a fingerprint of their contents. Every other
+    node's fingerprint hashes its name, version and its inputs' fingerprints, so it can be
+    computed without running anything: a node is recomputed only when something it
+    (transitively) depends on changed, and otherwise served from the memo.
+    """
+
+    def __init__(self, memo=None):
+        self.memo = memo if memo is not None else GraphMemo()
+        self.nodes = {}
+        self.sources = {}
+        self.recomputed = []  # Nodes computed (not served from the memo) by this graph
+
+    # === Building ===
+
+    def source(self, name, value, fingerprint):
+        """Registers an ingested input (stage 'ingest') with a fingerprint of its contents."""
+        self.sources[name] = (value, fingerprint)
+
+    def add(self, name, func, inputs=None, stage="aggregate", version="1", key=None):
+        """
+        Registers a step.
+
+        Parameters:
+        - name (str): Node name.
+        - func (callable): Called with the outputs of the inputs, in order.
+        - inputs (tuple, optional): Upstream node names (defaults to func.requires).
+        - stage (str): One of STAGES (documentation and inspection only).
+        - version (str): Bump to invalidate memoized outputs when func's logic changes.
+        - key (tuple, optional): (upstream nodes, content node) fingerprinting the output
+          instead of the inputs: the upstream nodes' fingerprints and the content node's
+          output (a short string). An output that often stays the same when an input
+          changes then keeps the memoized results downstream of it.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}. Expected one of {STAGES}")
+        inputs = tuple(inputs if inputs is not None else getattr(func, "requires", ()))
+        self.nodes[name] = {"func": func, "inputs": inputs, "stage": stage, "version": version, "key": key}
+
+    # === Evaluation ===
+
+    def fingerprint(self, name, _visiting=None):
+        """
+        Returns:
+        - str: Fingerprint of the node's output, derived from its transitive inputs.
+        """
+        if name in self.sources:
+            return self.sources[name][1]
+        if name not in self.nodes:
+            raise KeyError(f"Unknown node: {name}")
+
+        visiting = _visiting or set()
+        if name in visiting:
+            raise CycleError(f"Cycle detected at node: {name}")
+        visiting.add(name)
+
+        node = self.nodes[name]
+        digest = hashlib.sha256(f"{name}@{node['version']}".encode("utf-8"))
+        upstreams, content = node["key"] if node.get("key") else (node["inputs"], None)
+        for upstream in upstreams:
+            digest.update(self.fingerprint(upstream, visiting).encode("utf-8"))
+        if content is not None:  # Computed (or served from the memo) to identify the output
+            digest.update(f"|{self.compute(content)}".encode("utf-8"))
+        visiting.discard(name)
+        return digest.hexdigest()
+
+    def compute(self, name):
+        """
+        Returns the node's output, computing it (and any stale upstream node) if needed.
+        """
+        if name in self.sources:
+            return self.sources[name][0]
+
+        fingerprint = self.fingerprint(name)
+        missing = object()
+        value = self.memo.get(fingerprint, missing)
+        if value is not missing:
+            return value
+
+        node = self.nodes[name]
+        value = node["func"](*(self.compute(upstream) for upstream in node["inputs"]))
+        self.memo.put(fingerprint, value)
+        self.recomputed.append(name)
+        return value
+
+    def seed(self, name, value):
+        """Stores an already computed output for a node (e.g. a dataset attached from shared memory)."""
+        self.memo.put(self.fingerprint(name), value)
+
+    def evict(self, name):
+        """Drops a node's memoized output (e.g. a heap copy of a dataset now in shared memory)."""
+        self.memo.discard(self.fingerprint(name))
+
+    def dependents(self, source):
+        """
+        Lists the nodes that (transitively) depend on a source or node.
+
+        Returns:
+        - list: Node names, in registration order.
+        """
+        affected = {source}
+        changed = True
+        while changed:
+            changed = False
+            for name, node in self.nodes.items():
+                if name not in affected and affected.intersection(node["inputs"]):
+                    affected.add(name)
+                    changed = True
+        return [name for name in self.nodes if name in affected]
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    memo = GraphMemo()
+
+    def build(customers_version):
+        graph = AnalysisGraph(memo)
+        graph.source("sales_file", [3, 5, 8], "sales-v1")
+        graph.source("customer_file", ["C1", "C2"][:customers_version], f"customers-v{customers_version}")
+        graph.add("sales", list, ["sales_file"], "clean")
+        graph.add("customers", list, ["customer_file"], "clean")
+        graph.add("total_sales", sum, ["sales"])
+        graph.add("customer_count", len, ["customers"])
+        return graph
+
+    first = build(1)
+    print(first.compute("total_sales"), first.compute("customer_count"), first.recomputed)
+
+    second = build(2)  # Only the customer upload changed
+    print(second.compute("total_sales"), second.compute("customer_count"), second.recomputed)
+    print("Depends on customer_file:", second.dependents("customer_file"))
@@ -0,0 +1,175 @@
+import io
+import matplotlib.pyplot as plt
+import data_preproccesing.data_preprocessor as dp
+import sales_analysis.sales_trends as sts
+import sales_analysis.repeat_customers as rc
+import sales_analysis.profit_per_category as ppc
+import sales_analysis.location_sales_analysis as lsa
+import sales_analysis.location_profit as lp
+import sales_analysis.cohort_retention as cr
+import sales_analysis.sales_anomalies as an
+import prediction.sales_analysis as sa
+import prediction.grouped_regression as gr
+import prediction.forecasting as fc
+from prediction.correlation import build_sales_correlation
+from data_storage.sql_store import frame_fingerprint, uploads_key
+from .analysis_graph import AnalysisGraph
+
+# Image settings matching st.pyplot, so charts look the same when served as PNG
+PNG_OPTIONS = {"format": "png", "dpi": 200, "bbox_inches": "tight"}
+
+def figure_png(fig, options=PNG_OPTIONS):
+    """
+    Renders a figure to PNG bytes and frees it (memoized charts are kept as images,
+    which every session can display without sharing a live Matplotlib figure).
+
+    Parameters:
+    - fig (matplotlib.figure.Figure): Figure to render.
+    - options (dict): savefig options (e.g. a lower dpi for quick previews).
+
+    Returns:
+    - bytes: PNG image.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, **options)
+    plt.close(fig)
+    return buffer.getvalue()
+
+def add_category(sales_df, products_df):
+    """Enriches sales with each product's category (used by the category forecasts)."""
+    return sales_df.merge(products_df[["PID", "Category"]], on="PID", how="left")
+
+def build_analysis_graph(product_file, sales_file, customer_file, memo=None, store=None, warehouse=None, in_memory=(),
+                         integrity_policy=dp.INTEGRITY_POLICY, string_dtype=dp.STRING_DTYPE):
+    """
+    Wires the uploads through ingest -> clean -> enrich -> aggregate -> render.
+
+    Aggregates run in pandas, or are pushed down to the SQL store when one is given; their
+    fingerprints only depend on the datasets each function declares with @requires, so
+    replacing one upload recomputes only the nodes that read it.
+
+    Parameters:
+    - product_file, sales_file, customer_file: Uploaded files.
+    - memo (GraphMemo, optional): Output cache shared between graphs (e.g. across sessions).
+    - store (SalesStore, optional): SQL store holding the processed datasets.
+    - warehouse (SalesWarehouse, optional): Date-partitioned sales history.
+    - in_memory (set, optional): Aggregates kept in pandas even when a store is given
+      (as chosen by the execution planner).
+    - integrity_policy (str): What to do with sales of unknown products or customers
+      (one of data_preprocessor.INTEGRITY_POLICIES); the report is the 'integrity' node.
+    - string_dtype (str): Dtype of the cleaned text columns (one of data_preprocessor.STRING_DTYPES).
+
+    Returns:
+    - AnalysisGraph: Render nodes end in '_chart' and return (table or None, PNG bytes).
+    """
+    graph = AnalysisGraph(memo)
+
+    # === Ingest ===
+    graph.source("product_file", product_file, uploads_key(product_file))
+    graph.source("sales_file", sales_file, uploads_key(sales_file))
+    graph.source("customer_file", customer_file, uploads_key(customer_file))
+
+    # === Clean ===
+    graph.add("products", lambda file: dp.process_product_file(file, string_dtype), ["product_file"], "clean", version=string_dtype)
+    graph.add("sales_rows", lambda file: dp.process_sales_file(file, string_dtype), ["sales_file"], "clean", version=string_dtype)
+    graph.add("customers", lambda file: dp.process_customer_file(file, string_dtype), ["customer_file"], "clean", version=string_dtype)
+
+    # Sales referencing unknown products or customers would skew the merges downstream
+    def check_integrity(sales_df, products_df, customers_df):
+        kept, report = dp.check_referential_integrity(sales_df, dp.build_key_indexes(products_df, customers_df), integrity_policy)
+        removed = "" if len(kept) == len(sales_df) else frame_fingerprint(sales_df.loc[~sales_df["SID"].isin(kept["SID"]), ["SID"]])
+        return kept, report, removed
+    graph.add("checked_sales", check_integrity, ["sales_rows", "products", "customers"], "clean", version=integrity_policy)
+    graph.add("integrity", lambda checked: checked[1], ["checked_sales"], "clean")
+    graph.add("removed_sales", lambda checked: checked[2], ["checked_sales"], "clean")
+
+    # The cleaned sales are the sales rows less the removed SIDs: new product or customer
+    # files that remove no other rows (always, under 'keep') keep the analyses' results
+    graph.add("sales", lambda checked: checked[0], ["checked_sales"], "clean", key=(("sales_rows",), "removed_sales"))
+
+    add_analysis_nodes(graph, store, warehouse, in_memory=in_memory)
+    return graph
+
+def add_analysis_nodes(graph, store=None, warehouse=None, png_options=PNG_OPTIONS, in_memory=(),
+                       persist_models=True, n_boot=sa.BOOTSTRAP_REPLICATES):
+    """
+    Adds the enrich, aggregate and render nodes on top of the 'products', 'sales' and
+    'customers' nodes (or sources) of a graph.
+
+    Parameters:
+    - persist_models (bool): Register fitted models (False for graphs over samples).
+    - n_boot (int): Bootstrap replicates of the regression's confidence band (0 disables it).
+    """
+    def png(fig):
+        return figure_png(fig, png_options)
+
+    # === Enrich ===
+    graph.add("sales_with_category", add_category, ["sales", "products"], "enrich")
+
+    # === Aggregate ===
+    def aggregate(name, pandas_func, sql_func):
+        if store is None or name in in_memory:
+            graph.add(name, pandas_func)
+        else:  # Same inputs (the tables the query reads), result computed by SQLite
+            graph.add(name, lambda *_: sql_func(store), sql_func.requires)
+
+    aggregate("daily_sales", sts.aggregate_daily_sales, sts.query_daily_sales)
+    aggregate("repeat_purchase_days", rc.aggregate_repeat_purchase_days, rc.query_repeat_purchase_days)
+    aggregate("category_stats", ppc.aggregate_profit_per_category, ppc.query_profit_per_category)
+    aggregate("location_stats", lsa.aggregate_sales_by_location, lsa.query_sales_by_location)
+    aggregate("category_profit", lp.aggregate_category_and_profit, lp.query_category_and_profit)
+    aggregate("cohort_retention", cr.aggregate_cohort_retention, cr.query_cohort_retention)
+    aggregate("daily_location_sales", an.aggregate_daily_location_sales, an.query_daily_location_sales)
+    graph.add("sales_anomalies", an.detect_sales_anomalies, ["daily_location_sales"])
+    if warehouse is not None:  # Only the partitions of the longest window are read
+        graph.add("repeat_customer_counts", lambda *_: rc.load_repeat_customer_counts(warehouse), rc.load_repeat_customer_counts.requires)
+    else:
+        aggregate("repeat_customer_counts", rc.aggregate_repeat_customer_counts, rc.query_repeat_customer_counts)
+    # Filled chunk by chunk (seeded instead when the sales were streamed into the store)
+    graph.add("correlation_accumulator", build_sales_correlation, ["sales", "products", "customers"])
+
+    # === Render ===
+    graph.add("sales_trends_chart", lambda daily, scores: (None, png(sts.plot_daily_sales_trends(daily, anomalies=an.flagged_anomalies(scores)))),
+              ["daily_sales", "sales_anomalies"], "render")
+    graph.add("sales_anomalies_chart", lambda scores: (an.flagged_anomalies(scores), png(an.plot_location_anomalies(scores))),
+              ["sales_anomalies"], "render")
+    graph.add("repeat_customers_chart", lambda counts, days: (counts, png(rc.plot_repeat_customers(days))),
+              ["repeat_customer_counts", "repeat_purchase_days"], "render")
+    graph.add("category_profit_chart", lambda stats: (None, png(ppc.plot_profit_per_category(stats))), ["category_stats"], "render")
+    graph.add("location_sales_chart", lambda stats: (None, png(lsa.plot_sales_by_location(*stats))), ["location_stats"], "render")
+    graph.add("location_profit_chart", lambda stats: (None, png(lp.plot_category_and_profit(*stats))), ["category_profit"], "render")
+    graph.add("cohort_retention_chart", lambda counts: (counts, png(cr.plot_cohort_retention(counts))), ["cohort_retention"], "render")
+    graph.add("sales_analysis_chart", lambda *inputs: (None, png(sa.generate_combined_figure(*inputs, persist_model=persist_models, n_boot=n_boot))),
+              [*sa.generate_combined_figure.requires, "correlation_accumulator"], "render")
+
+    def elasticity_chart(sales_df, products_df):
+        coefficients, fig = gr.generate_elasticity_figure(sales_df, products_df)
+        return coefficients, png(fig)
+    graph.add("elasticity_chart", elasticity_chart, gr.generate_elasticity_figure.requires, "render")
+
+    def forecast_chart(group_col, freq, horizon):
+        def render(sales_df):
+            forecasts, fig = fc.plot_group_forecasts(sales_df, group_col, freq=freq, horizon=horizon)
+            return forecasts, png(fig)
+        return render
+    graph.add("location_forecast_chart", forecast_chart("Location", "W", 8), ["sales"], "render")
+    graph.add("category_forecast_chart", forecast_chart("Category", "M", 3), ["sales_with_category"], "render")
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    from .analysis_graph import GraphMemo
+
+    memo = GraphMemo()
+    with open("tests/p3.csv", "rb") as products, open("tests/s3.csv", "rb") as sales, open("tests/c3.csv", "rb") as customers:
+        graph = build_analysis_graph(products, sales, customers, memo)
+        for chart in ("sales_trends_chart", "location_sales_chart", "category_profit_chart"):
+            graph.compute(chart)
+        print("First run computed:", graph.recomputed)
+
+    # A new product file invalidates what reads products; the sales only if other rows are quarantined
+    with open("tests/products.csv", "rb") as products, open("tests/s3.csv", "rb") as sales, open("tests/c3.csv", "rb") as customers:
+        graph = build_analysis_graph(products, sales, customers, memo)
+        for chart in ("sales_trends_chart", "location_sales_chart", "category_profit_chart"):
+            graph.compute(chart)
+        print("After replacing products:", graph.recomputed)
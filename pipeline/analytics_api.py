@@ -0,0 +1,558 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import data_preproccesing.data_preprocessor as dp
+import sales_analysis.sales_anomalies as an
+import prediction.sales_analysis as sa
+import prediction.grouped_regression as gr
+import prediction.forecasting as fc
+from prediction.model_registry import fit_or_load_model, predict
+from data_storage.sql_store import uploads_key
+from .analysis_graph import AnalysisGraph, GraphMemo
+from .analysis_pipeline import add_analysis_nodes
+from .data_export import EXPORT_AGGREGATES, as_table
+
+# Address of the service (local only: datasets are registered by server-side file paths)
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+
+# Computations run at once (further requests queue for a worker)
+API_WORKERS = min(8, os.cpu_count() or 1)
+
+# Serialized responses kept for repeated requests, and analysis outputs shared by all datasets
+RESPONSE_CACHE_SIZE = 256
+GRAPH_MEMO_SIZE = 512
+
+# Seconds a request waits for its computation before answering 504 (the computation goes on)
+REQUEST_TIMEOUT = 300
+
+# Largest accepted request body (registration requests only carry file paths)
+MAX_BODY_BYTES = 1 << 20
+
+# Recent latencies kept per route for the percentiles of /metrics
+LATENCY_WINDOW = 1000
+
+# Dataset names usable in URLs
+DATASET_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# Forecast endpoint: grouping columns and the longest horizon served (in periods)
+FORECAST_GROUPS = ("Location", "Category")
+MAX_FORECAST_HORIZON = 52
+
+# Most prices scored in one quantity prediction
+MAX_PREDICTION_PRICES = 1000
+
+class ApiError(Exception):
+    """Raised to answer a request with an HTTP error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# === Analyses ===
+
+def table_payload(result):
+    """
+    Converts an aggregate (Series or DataFrame) into JSON columns and rows.
+
+    Returns:
+    - dict: 'columns', 'rows' (lists of values; dates in ISO format, NaN as null) and 'row_count'.
+    """
+    split = json.loads(as_table(result).to_json(orient="split", index=False, date_format="iso"))
+    return {"columns": split["columns"], "rows": split["data"], "row_count": len(split["data"])}
+
+def _choice(options):
+    def parse(value):
+        if value not in options:
+            raise ValueError(f"expected one of {', '.join(options)}")
+        return value
+    return parse
+
+def _int_between(low, high):
+    def parse(value):
+        number = int(value)
+        if not low <= number <= high:
+            raise ValueError(f"expected an integer from {low} to {high}")
+        return number
+    return parse
+
+def _prices(value):
+    prices = [float(price) for price in value.split(",") if price.strip()]
+    if len(prices) > MAX_PREDICTION_PRICES:
+        raise ValueError(f"at most {MAX_PREDICTION_PRICES} prices")
+    return prices
+
+def _forecast(graph, by, freq, horizon):
+    sales_df = graph.compute("sales_with_category" if by == "Category" else "sales")
+    return table_payload(fc.forecast_series_matrix(fc.build_series_matrix(sales_df, by, freq), horizon, freq))
+
+def _quantity_model(graph, prices):
+    model = graph.compute("quantity_model")
+    payload = {"model": model}
+    if prices:
+        if model is None:
+            raise ApiError(422, "The quantity model cannot be fitted on this dataset (constant prices or quantities)")
+        payload["predictions"] = [{"Sales_Price": price, "Quantity_Sold": float(quantity)}
+                                  for price, quantity in zip(prices, predict(model, prices))]
+    return payload
+
+def _node_table(node, to_table):
+    return lambda graph: table_payload(to_table(graph.compute(node)))
+
+# Analyses served at /datasets/<name>/<analysis>: 'run' (graph and parsed query parameters ->
+# JSON payload), 'params' (name -> (parser, default)) and a short 'description'. The tables of
+# the exports are served as they are, except those only available with a rendered chart.
+ANALYSES = {
+    name: {"run": _node_table(node, to_table), "params": {}, "description": f"Table behind the '{node}' analysis"}
+    for name, (node, to_table) in EXPORT_AGGREGATES.items() if not node.endswith("_chart")
+}
+ANALYSES.update({
+    "flagged_anomalies": {
+        "run": _node_table("sales_anomalies", an.flagged_anomalies), "params": {},
+        "description": "Days on which a location's sales fell or jumped out of their usual range (latest first)",
+    },
+    "price_elasticity": {
+        "run": _node_table("price_elasticities", lambda coefficients: coefficients), "params": {},
+        "description": "Price -> quantity regressions per product, category and location",
+    },
+    "sales_correlation": {
+        "run": _node_table("sales_correlation", lambda matrix: matrix), "params": {},
+        "description": "Correlations of quantity, price, manufacturing cost and age",
+    },
+    "quantity_model": {
+        "run": _quantity_model, "params": {"prices": (_prices, [])},
+        "description": "Fitted price -> quantity model, scoring the comma-separated 'prices' if given",
+    },
+    "forecast": {
+        "run": _forecast,
+        "params": {
+            "by": (_choice(FORECAST_GROUPS), "Location"),
+            "freq": (_choice(tuple(fc.SEASON_LENGTHS)), "W"),
+            "horizon": (_int_between(1, MAX_FORECAST_HORIZON), 8),
+        },
+        "description": "Holt-Winters sales forecast of every location or category",
+    },
+})
+
+def parse_params(analysis, query):
+    """
+    Parses the query parameters of an analysis request.
+
+    Parameters:
+    - analysis (str): One of ANALYSES.
+    - query (dict): From urllib.parse.parse_qs.
+
+    Returns:
+    - dict: Parameter name -> parsed value (defaults filled in).
+
+    Raises:
+    - ApiError: 400 for unknown or invalid parameters.
+    """
+    specs = ANALYSES[analysis]["params"]
+    unknown = set(query) - set(specs)
+    if unknown:
+        raise ApiError(400, f"Unknown parameters for {analysis}: {', '.join(sorted(unknown))}")
+    params = {}
+    for name, (parse, default) in specs.items():
+        if name not in query:
+            params[name] = default
+            continue
+        try:
+            params[name] = parse(query[name][-1])
+        except ValueError as e:
+            raise ApiError(400, f"Invalid '{name}': {e}") from e
+    return params
+
+# === Datasets ===
+
+def build_dataset_graph(frames, fingerprint, memo=None):
+    """
+    Builds the analysis graph of a registered dataset, its cleaned frames being the sources.
+
+    Parameters:
+    - frames (dict): 'products', 'sales' and 'customers' DataFrames.
+    - fingerprint (str): Identifies the dataset (keys its outputs in the shared memo).
+    - memo (GraphMemo, optional): Output cache shared between datasets.
+
+    Returns:
+    - AnalysisGraph: The pipeline's aggregate nodes, and the prediction nodes of the API.
+    """
+    graph = AnalysisGraph(memo)
+    for name in ("products", "sales", "customers"):
+        graph.source(name, frames[name], f"{fingerprint}:{name}")
+    add_analysis_nodes(graph)
+    graph.add("price_elasticities", gr.fit_price_elasticities, ["sales", "products"])
+    graph.add("sales_correlation", lambda accumulator: accumulator.correlation().rename_axis("Column"),
+              ["correlation_accumulator"])
+    graph.add("quantity_model", lambda sales_df: fit_or_load_model(sales_df, sa.fit_quantity_model), ["sales"])
+    return graph
+
+class DatasetRegistry:
+    """Datasets served by the API, cleaned once when registered."""
+
+    def __init__(self, memo=None):
+        self.memo = memo if memo is not None else GraphMemo(GRAPH_MEMO_SIZE)
+        self._datasets = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, products_path, sales_path, customers_path,
+                 integrity_policy=dp.INTEGRITY_POLICY, string_dtype=dp.STRING_DTYPE):
+        """
+        Loads and cleans a dataset's files like the app's uploads (replacing any dataset
+        registered under the same name).
+
+        Parameters:
+        - name (str): Dataset name (letters, digits, '_', '.' and '-').
+        - products_path, sales_path, customers_path (str): Files on the server.
+        - integrity_policy (str): One of data_preprocessor.INTEGRITY_POLICIES.
+        - string_dtype (str): One of data_preprocessor.STRING_DTYPES.
+
+        Returns:
+        - dict: Description of the dataset (see describe).
+        """
+        if not DATASET_NAME.match(name):
+            raise ValueError(f"Invalid dataset name: {name!r}")
+        with open(products_path, "rb") as products, open(sales_path, "rb") as sales, open(customers_path, "rb") as customers:
+            fingerprint = f"{uploads_key(products, sales, customers)}-{integrity_policy}-{string_dtype}"
+            products_df = dp.process_product_file(products, string_dtype)
+            sales_df = dp.process_sales_file(sales, string_dtype)
+            customers_df = dp.process_customer_file(customers, string_dtype)
+        sales_df, report = dp.check_referential_integrity(
+            sales_df, dp.build_key_indexes(products_df, customers_df), integrity_policy
+        )
+        frames = {"products": products_df, "sales": sales_df, "customers": customers_df}
+        dataset = {
+            "name": name,
+            "fingerprint": fingerprint,
+            "graph": build_dataset_graph(frames, fingerprint, self.memo),
+            "rows": {table: len(df) for table, df in frames.items()},
+            "quarantined_rows": report["quarantined"],
+            "registered_at": time.time(),
+        }
+        with self._lock:
+            self._datasets[name] = dataset
+        return self.describe(dataset)
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._datasets:
+                raise ApiError(404, f"Unknown dataset: {name}")
+            return self._datasets[name]
+
+    def names(self):
+        with self._lock:
+            return sorted(self._datasets)
+
+    @staticmethod
+    def describe(dataset):
+        """
+        Returns:
+        - dict: 'name', 'fingerprint', 'rows' per table, 'quarantined_rows' and 'registered_at'.
+        """
+        return {key: value for key, value in dataset.items() if key != "graph"}
+
+# === Metrics ===
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2), "max": round(max(values), 2)}
+
+class ApiMetrics:
+    """Thread-safe request counters and latency windows, served at /metrics."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._statuses = {}
+        self._routes = {}
+        self._in_flight = 0
+
+    def _route(self, name):
+        if name not in self._routes:
+            self._routes[name] = {"requests": 0, "errors": 0, "cache_hits": 0, "coalesced": 0, "computed": 0,
+                                  "latency_ms": deque(maxlen=self.window), "compute_ms": deque(maxlen=self.window)}
+        return self._routes[name]
+
+    def start(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def finish(self, route, status, seconds, cache=None):
+        """Records a response (cache is 'hit', 'coalesced' or 'miss' for analysis requests)."""
+        with self._lock:
+            self._in_flight -= 1
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+            stats = self._route(route)
+            stats["requests"] += 1
+            stats["errors"] += status >= 400
+            stats["latency_ms"].append(seconds * 1000)
+            if cache == "hit":
+                stats["cache_hits"] += 1
+            elif cache == "coalesced":
+                stats["coalesced"] += 1
+
+    def computed(self, route, seconds):
+        with self._lock:
+            stats = self._route(route)
+            stats["computed"] += 1
+            stats["compute_ms"].append(seconds * 1000)
+
+    def snapshot(self):
+        """
+        Returns:
+        - dict: 'uptime_seconds', 'in_flight', 'responses' per status, 'cache' totals
+          ('hits', 'coalesced', 'computed', 'hit_rate') and per-route counters with
+          latency and compute-time percentiles (ms).
+        """
+        with self._lock:
+            routes = {
+                name: {**{key: value for key, value in stats.items() if not key.endswith("_ms")},
+                       "latency_ms": _percentiles(list(stats["latency_ms"])),
+                       "compute_ms": _percentiles(list(stats["compute_ms"]))}
+                for name, stats in sorted(self._routes.items())
+            }
+            statuses = {str(status): count for status, count in sorted(self._statuses.items())}
+            in_flight = self._in_flight
+        hits = sum(route["cache_hits"] for route in routes.values())
+        coalesced = sum(route["coalesced"] for route in routes.values())
+        computed = sum(route["computed"] for route in routes.values())
+        served = hits + coalesced + computed
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "in_flight": in_flight,
+            "responses": statuses,
+            "cache": {"hits": hits, "coalesced": coalesced, "computed": computed,
+                      "hit_rate": round((hits + coalesced) / served, 4) if served else None},
+            "routes": routes,
+        }
+
+# === Service ===
+
+class AnalyticsApi:
+    """
+    JSON analytics over registered datasets, independent of the HTTP transport.
+
+    Analysis requests are computed in a worker pool. Identical requests (same dataset
+    contents, analysis and parameters) share one computation while it runs, and its
+    serialized response is cached for later ones; the graph memo also shares the
+    aggregates underneath between different analyses.
+    """
+
+    def __init__(self, registry=None, workers=API_WORKERS, timeout=REQUEST_TIMEOUT):
+        self.registry = registry if registry is not None else DatasetRegistry()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analytics")
+        self.workers = workers
+        self.timeout = timeout
+        self.responses = GraphMemo(RESPONSE_CACHE_SIZE)  # Thread-safe LRU of response bodies
+        self.metrics = ApiMetrics()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    # === Coalescing ===
+
+    def _compute(self, key, route, compute):
+        start = time.perf_counter()
+        try:
+            body = json.dumps(compute()).encode("utf-8")
+            self.responses.put(key, body)  # Cached before leaving _in_flight: no request recomputes it
+            self.metrics.computed(route, time.perf_counter() - start)
+            return body
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def coalesced_result(self, key, route, compute):
+        """
+        Returns the response body for key: cached, from the computation already running
+        for it, or computed in the worker pool.
+
+        Returns:
+        - bytes: JSON body.
+        - str: 'hit', 'coalesced' or 'miss'.
+        """
+        with self._lock:
+            body = self.responses.get(key)
+            if body is not None:
+                return body, "hit"
+            future = self._in_flight.get(key)
+            outcome = "coalesced" if future is not None else "miss"
+            if future is None:
+                future = self.pool.submit(self._compute, key, route, compute)
+                self._in_flight[key] = future
+        try:
+            return future.result(timeout=self.timeout), outcome
+        except FutureTimeoutError as e:
+            raise ApiError(504, f"The analysis took longer than {self.timeout} s (it is still running)") from e
+
+    # === Routes ===
+
+    def handle(self, method, target, body=None):
+        """
+        Answers one request.
+
+        Routes:
+        - GET /health, GET /metrics, GET /analyses
+        - GET /datasets, POST /datasets (JSON: name, products, sales, customers and the
+          optional integrity_policy and string_dtype), GET /datasets/<name>
+        - GET /datasets/<name>/<analysis>?<params>
+
+        Parameters:
+        - method (str): HTTP method.
+        - target (str): Request path with its query string.
+        - body (bytes, optional): Request body.
+
+        Returns:
+        - int: HTTP status.
+        - bytes: JSON body.
+        - dict: Extra headers ('X-Cache' for analysis requests).
+        """
+        start = time.perf_counter()
+        self.metrics.start()
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        analysis_request = method == "GET" and len(parts) == 3 and parts[0] == "datasets"
+        if analysis_request:  # Metrics are kept per analysis
+            route = parts[2] if parts[2] in ANALYSES else "unknown_analysis"
+        else:
+            route = f"{method} /{parts[0]}/<name>" if len(parts) == 2 else f"{method} /{'/'.join(parts[:1])}"
+        cache = None
+        try:
+            if analysis_request:
+                payload, cache = self._analysis(parts[1], parts[2], parse_qs(url.query))
+            else:
+                payload = self._route(method, parts, body)
+            status = 200
+        except ApiError as e:
+            status, payload = e.status, json.dumps({"error": str(e)}).encode("utf-8")
+        except (ValueError, KeyError, OSError, dp.DuplicateKeyError, dp.CorruptedFileError,
+                dp.InvalidFileExtensionError, dp.ReferentialIntegrityError) as e:
+            status, payload = 400, json.dumps({"error": str(e)}).encode("utf-8")
+        except Exception as e:  # The service stays up: the error is reported to the client
+            status, payload = 500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8")
+        self.metrics.finish(route, status, time.perf_counter() - start, cache)
+        return status, payload, {"X-Cache": cache} if cache else {}
+
+    def _analysis(self, name, analysis, query):
+        dataset = self.registry.get(name)
+        if analysis not in ANALYSES:
+            raise ApiError(404, f"Unknown analysis: {analysis}. Expected one of {', '.join(ANALYSES)}")
+        params = parse_params(analysis, query)
+        key = json.dumps([dataset["fingerprint"], analysis, params], sort_keys=True)
+
+        def compute():
+            graph = dataset["graph"]
+            return {"dataset": name, "analysis": analysis, "params": params, **ANALYSES[analysis]["run"](graph, **params)}
+        return self.coalesced_result(key, analysis, compute)
+
+    def _route(self, method, parts, body):
+        if method == "GET" and parts == ["health"]:
+            payload = {"status": "ok", "datasets": len(self.registry.names()), "workers": self.workers}
+        elif method == "GET" and parts == ["metrics"]:
+            payload = self.metrics.snapshot()
+        elif method == "GET" and parts == ["analyses"]:
+            payload = {name: {"description": spec["description"], "params": {param: default for param, (_, default) in spec["params"].items()}}
+                       for name, spec in ANALYSES.items()}
+        elif method == "GET" and parts == ["datasets"]:
+            payload = [self.registry.describe(self.registry.get(name)) for name in self.registry.names()]
+        elif method == "GET" and len(parts) == 2 and parts[0] == "datasets":
+            payload = self.registry.describe(self.registry.get(parts[1]))
+        elif method == "POST" and parts == ["datasets"]:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ApiError(400, "Expected a JSON object")
+            missing = [field for field in ("name", "products", "sales", "customers") if field not in request]
+            if missing:
+                raise ApiError(400, f"Missing fields: {', '.join(missing)}")
+            payload = self.registry.register(
+                request["name"], request["products"], request["sales"], request["customers"],
+                request.get("integrity_policy", dp.INTEGRITY_POLICY), request.get("string_dtype", dp.STRING_DTYPE)
+            )
+        else:
+            raise ApiError(404 if method in ("GET", "POST") else 405, f"No route for {method} /{'/'.join(parts)}")
+        return json.dumps(payload).encode("utf-8")
+
+class AnalyticsRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front of the AnalyticsApi set as the server's 'api' attribute."""
+
+    server_version = "ProfitOracleAnalytics/1.0"
+
+    def _respond(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            status, body, headers = 413, json.dumps({"error": "Request body too large"}).encode("utf-8"), {}
+        else:
+            status, body, headers = self.server.api.handle(method, self.path, self.rfile.read(length) if length else None)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
+
+    def do_PUT(self):
+        self._respond("PUT")
+
+    def do_DELETE(self):
+        self._respond("DELETE")
+
+    def log_message(self, format, *args):  # Requests are counted in /metrics rather than logged
+        pass
+
+def serve(api, host=API_HOST, port=API_PORT):
+    """
+    Starts the HTTP server (one thread per connection; computations run in api's pool).
+
+    Returns:
+    - ThreadingHTTPServer: Call serve_forever() (or run it in a thread) and shutdown().
+    """
+    server = ThreadingHTTPServer((host, port), AnalyticsRequestHandler)
+    server.daemon_threads = True
+    server.api = api
+    return server
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the sales analyses as JSON over HTTP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Size of the worker pool")
+    parser.add_argument("--dataset", nargs=4, action="append", default=[], metavar=("NAME", "PRODUCTS", "SALES", "CUSTOMERS"),
+                        help="Register a dataset at startup (repeatable)")
+    parser.add_argument("--string-dtype", choices=dp.STRING_DTYPES, default=dp.STRING_DTYPE)
+    args = parser.parse_args()
+
+    api = AnalyticsApi(workers=args.workers)
+    for name, products_path, sales_path, customers_path in args.dataset:
+        print("Registered", api.registry.register(name, products_path, sales_path, customers_path, string_dtype=args.string_dtype))
+
+    server = serve(api, args.host, args.port)
+    print(f"Serving http://{args.host}:{server.server_port} (GET /analyses lists the endpoints)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        api.close()
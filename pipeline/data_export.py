@@ -0,0 +1,318 @@
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_preproccesing.data_preprocessor import parse_datetimes
+from data_storage.sql_store import STORE_DIR
+
+# File formats of the exports
+EXPORT_FORMATS = ("parquet", "csv")
+
+# Folder of the finished export files (one subfolder per dataset)
+EXPORT_DIR = os.path.join(STORE_DIR, "exports")
+
+# Rows enriched and written at a time
+EXPORT_CHUNK_ROWS = 100_000
+
+# Largest piece of an export offered as one browser download (st.download_button holds it in
+# memory while offered); larger files are offered in parts of this size
+DOWNLOAD_MAX_BYTES = 512 * 2**20
+
+# Dataset export folders untouched for this long are removed when another export is prepared
+EXPORT_MAX_AGE_SECONDS = 24 * 3600
+
+# Parquet compression (row groups are written one chunk at a time)
+PARQUET_COMPRESSION = "zstd"
+
+# Columns of the sales table that are dates (typed in the export whatever the source)
+DATE_COLUMNS = ("Date", "Timestamp")
+
+# Tables behind each analysis: export name -> (graph node, function turning its output into a table)
+EXPORT_AGGREGATES = {
+    "daily_sales": ("daily_sales", lambda daily: daily),
+    "daily_location_sales": ("daily_location_sales", lambda daily: daily),
+    "sales_anomalies": ("sales_anomalies", lambda scores: scores),
+    "repeat_customers": ("repeat_customer_counts", lambda counts: counts),
+    "repeat_purchase_days": ("repeat_purchase_days", lambda days: days),
+    "category_profit": ("category_stats", lambda stats: stats),
+    "location_sales": ("location_stats", lambda stats: pd.concat([
+        stats[0], stats[1].rename("Unique_Customers"), stats[2], stats[3].rename("Median_Age")
+    ], axis=1)),
+    "location_category_counts": ("category_profit", lambda result: result[0]),
+    "location_profit": ("category_profit", lambda result: result[1]),
+    "cohort_retention": ("cohort_retention", lambda counts: counts),
+    "price_elasticity": ("elasticity_chart", lambda result: result[0]),
+    "location_forecast": ("location_forecast_chart", lambda result: result[0]),
+    "category_forecast": ("category_forecast_chart", lambda result: result[0]),
+}
+
+def as_table(result):
+    """
+    Flattens an aggregate (Series or DataFrame, possibly indexed by its keys) into a
+    DataFrame with string column names, as CSV and Parquet files expect.
+    """
+    table = result.to_frame() if isinstance(result, pd.Series) else result
+    if any(name is not None for name in table.index.names):
+        table = table.reset_index()
+    table = table.copy(deep=False)
+    table.columns = [column.strftime("%Y-%m-%d") if isinstance(column, pd.Timestamp) else str(column) for column in table.columns]
+    return table
+
+# === Enriched sales ===
+
+def _with_missing_values(dimension, keys):
+    if pd.Index(keys.unique()).isin(dimension.index).all():
+        return dimension
+    integers = [column for column in dimension.columns if pd.api.types.is_integer_dtype(dimension[column])]
+    return dimension.astype(dict.fromkeys(integers, "float64"))
+
+def enriched_sales_chunks(sales_df, products_df, customers_df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Joins each sale with its product and customer attributes, one slice of rows at a time
+    (only a slice is ever copied, whatever the size of the sales).
+
+    Yields:
+    - pd.DataFrame: Enriched sales, with 'Profit' (sales price minus manufacturing cost).
+    """
+    products = products_df.drop_duplicates("PID").set_index("PID")
+    customers = customers_df.drop_duplicates("CID").set_index("CID")
+
+    # Sales without a product or customer turn the joined integers into floats: decided once
+    # for every chunk, so they all have the same dtypes
+    products = _with_missing_values(products, sales_df["PID"])
+    customers = _with_missing_values(customers, sales_df["CID"])
+
+    for start in range(0, len(sales_df), chunk_rows):
+        chunk = sales_df.iloc[start:start + chunk_rows]
+        enriched = chunk.join(products, on="PID", rsuffix="_product").join(customers, on="CID", rsuffix="_customer")
+        if "Manufacturing Cost" in enriched.columns:
+            enriched["Profit"] = enriched["Sales_Price"] - enriched["Manufacturing Cost"]
+        yield enriched
+
+def enriched_sales_sql(store):
+    """The same join as enriched_sales_chunks, as a query over the SQL store's tables."""
+    sales_columns = set(store.columns("sales"))
+    product_columns = [column for column in store.columns("products") if column != "PID"]
+    customer_columns = [column for column in store.columns("customers") if column != "CID"]
+    selected = ["s.*"]
+    selected += [f'p."{column}"' + (f' AS "{column}_product"' if column in sales_columns else "") for column in product_columns]
+    selected += [f'c."{column}"' + (f' AS "{column}_customer"' if column in sales_columns else "") for column in customer_columns]
+    if "Manufacturing Cost" in product_columns:
+        selected.append('s.Sales_Price - p."Manufacturing Cost" AS Profit')
+    return (
+        f"SELECT {', '.join(selected)} FROM sales AS s "
+        "LEFT JOIN products AS p ON p.PID = s.PID LEFT JOIN customers AS c ON c.CID = s.CID "
+        "ORDER BY s.rowid"
+    )
+
+def stored_enriched_sales_chunks(store, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Streams the enriched sales out of the SQL store (for sales that were ingested in
+    chunks and are not in memory).
+
+    Yields:
+    - pd.DataFrame: Enriched sales, with the same typed columns as enriched_sales_chunks.
+    """
+    for chunk in store.query_chunks(enriched_sales_sql(store), chunk_rows=chunk_rows):
+        for column in DATE_COLUMNS:
+            if column in chunk.columns:
+                chunk[column] = parse_datetimes(chunk[column])
+        yield chunk
+
+def stored_enriched_sales_schema(store):
+    """
+    Arrow schema of the enriched sales in the SQL store, from the storage classes of all its
+    values: each chunk of a query infers its own dtypes (a column of whole numbers in one chunk
+    may hold fractions in the next), so no single chunk tells the type of the file.
+
+    Returns:
+    - pyarrow.Schema: Text if any value is text, float if any is real, else integer (text when
+      every value is NULL); DATE_COLUMNS are timestamps.
+    """
+    sql = enriched_sales_sql(store)
+    columns = list(store.query(f"SELECT * FROM ({sql}) LIMIT 0").columns)
+    kinds = ("text", "real", "integer")
+    checks = ", ".join(f"MAX(typeof(\"{column}\") = '{kind}')" for column in columns for kind in kinds)
+    flags = store.query(f"SELECT {checks} FROM ({sql})").iloc[0].fillna(0).to_numpy().reshape(len(columns), len(kinds))
+
+    fields = []
+    for column, (text, real, integer) in zip(columns, flags):
+        if column in DATE_COLUMNS:
+            kind = pa.timestamp("ns")
+        elif real and not text:
+            kind = pa.float64()
+        elif integer and not text:
+            kind = pa.int64()
+        else:
+            kind = pa.string()
+        fields.append(pa.field(column, kind))
+    return pa.schema(fields)
+
+# === Writers ===
+
+def _parquet_schema(chunk):
+    # Columns that are empty in the first chunk have no type yet: they are written as text
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in schema])
+
+def _chunk_table(chunk, schema):
+    arrays = []
+    for field in schema:
+        values = chunk[field.name]
+        if pa.types.is_string(field.type) and not pd.api.types.is_string_dtype(values.dtype):
+            values = values.astype("string")  # Numbers of a text column are written as text
+        # Safe casts only (integers to floats, whole floats to integers): never truncates
+        arrays.append(pa.array(values, from_pandas=True).cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def write_chunks(chunks, stream, fmt, schema=None):
+    """
+    Writes DataFrame chunks with the same columns to a binary stream, one chunk at a time.
+
+    Parameters:
+    - chunks (iterable): pd.DataFrame chunks.
+    - stream: Writable binary file object (a file, a zip member, a socket...).
+    - fmt (str): One of EXPORT_FORMATS.
+    - schema (pyarrow.Schema, optional): Parquet schema of every chunk (e.g. from
+      stored_enriched_sales_schema); defaults to the first chunk's, for chunks whose
+      dtypes cannot change (slices of one DataFrame).
+
+    Returns:
+    - int: Rows written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}. Expected one of {EXPORT_FORMATS}")
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if fmt == "csv":
+                stream.write(chunk.to_csv(index=False, header=rows == 0).encode("utf-8"))
+            else:
+                if writer is None:
+                    writer = pq.ParquetWriter(stream, schema or _parquet_schema(chunk), compression=PARQUET_COMPRESSION)
+                writer.write_table(_chunk_table(chunk, writer.schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def write_file(path, write):
+    """
+    Writes a file through write(stream), atomically (readers never see a partial export).
+
+    Returns:
+    - Whatever write returned.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as stream:
+            result = write(stream)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return result
+
+def export_enriched_sales(path, chunks, fmt="parquet", schema=None):
+    """
+    Writes the enriched sales (from enriched_sales_chunks, or stored_enriched_sales_chunks
+    with the schema of stored_enriched_sales_schema) to a file.
+
+    Returns:
+    - int: Rows written.
+    """
+    return write_file(path, lambda stream: write_chunks(chunks, stream, fmt, schema))
+
+def export_aggregates(path, graph, fmt="parquet", names=None):
+    """
+    Writes the table behind every analysis into one zip file, one member per table.
+
+    Parameters:
+    - path (str): Zip file to write.
+    - graph (AnalysisGraph): Graph from build_analysis_graph() (memoized results are reused).
+    - fmt (str): Format of the members (one of EXPORT_FORMATS).
+    - names (list, optional): Tables to export (defaults to every EXPORT_AGGREGATES entry).
+
+    Returns:
+    - dict: Table name -> rows written.
+    """
+    def write(stream):
+        rows = {}
+        # Parquet members are already compressed
+        compression = zipfile.ZIP_STORED if fmt == "parquet" else zipfile.ZIP_DEFLATED
+        with zipfile.ZipFile(stream, "w", compression=compression) as archive:
+            for name in names or EXPORT_AGGREGATES:
+                node, to_table = EXPORT_AGGREGATES[name]
+                with archive.open(f"{name}.{fmt}", "w") as member:
+                    rows[name] = write_chunks([as_table(to_table(graph.compute(node)))], member, fmt)
+        return rows
+    return write_file(path, write)
+
+# === Downloads ===
+def download_parts(path, part_bytes=DOWNLOAD_MAX_BYTES):
+    """
+    Splits an export into the byte ranges offered as separate downloads (one when it is small).
+
+    Returns:
+    - list: (offset, size) of each part; concatenating the parts in order gives the file back.
+    """
+    size = os.path.getsize(path)
+    return [(offset, min(part_bytes, size - offset)) for offset in range(0, size, part_bytes)] or [(0, 0)]
+
+def read_part(path, offset, size):
+    """Reads one part of an export from disk (only when its download is requested)."""
+    with open(path, "rb") as file:
+        file.seek(offset)
+        return file.read(size)
+
+def prune_exports(keep=(), max_age=EXPORT_MAX_AGE_SECONDS, export_dir=EXPORT_DIR):
+    """
+    Removes the export folders of datasets nobody exported from in max_age seconds.
+
+    Parameters:
+    - keep (iterable): Folders (paths) kept whatever their age.
+
+    Returns:
+    - list: Removed folders.
+    """
+    if not os.path.isdir(export_dir):
+        return []
+    keep = {os.path.abspath(path) for path in keep}
+    cutoff = time.time() - max_age
+    removed = []
+    for entry in os.scandir(export_dir):
+        if not entry.is_dir() or os.path.abspath(entry.path) in keep:
+            continue
+        try:  # A folder being written to has a fresh mtime (each export lands through a new temp file)
+            newest = max([entry.stat().st_mtime] + [file.stat().st_mtime for file in os.scandir(entry.path)])
+        except FileNotFoundError:  # Pruned by another session
+            continue
+        if newest < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed.append(entry.path)
+    return removed
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    from .analysis_graph import GraphMemo
+    from .analysis_pipeline import build_analysis_graph
+
+    directory = tempfile.mkdtemp()
+    with open("tests/p3.csv", "rb") as products, open("tests/s3.csv", "rb") as sales, open("tests/c3.csv", "rb") as customers:
+        graph = build_analysis_graph(products, sales, customers, GraphMemo())
+        chunks = enriched_sales_chunks(graph.compute("sales"), graph.compute("products"), graph.compute("customers"), chunk_rows=30)
+        print("Enriched sales rows:", export_enriched_sales(os.path.join(directory, "sales_enriched.parquet"), chunks))
+        print("Aggregates:", export_aggregates(os.path.join(directory, "aggregates.zip"), graph, fmt="csv"))
+
+    print(pd.read_parquet(os.path.join(directory, "sales_enriched.parquet")).head())
+    print("Download parts of 4 KB:", download_parts(os.path.join(directory, "sales_enriched.parquet"), part_bytes=4096))
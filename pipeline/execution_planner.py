@@ -0,0 +1,359 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+import data_preproccesing.data_preprocessor as dp
+from prediction.correlation import CORRELATION_COLUMNS, CoMomentAccumulator, enrich_sales_chunk
+from prediction.sales_analysis import BOOTSTRAP_REPLICATES
+from .analysis_pipeline import PNG_OPTIONS
+from .progressive import add_sample_order, preview_graph
+
+# Memory the analyses may use, in bytes; None budgets a fraction of the machine's RAM
+MEMORY_BUDGET_BYTES = None
+MEMORY_BUDGET_FRACTION = 0.5
+
+# Estimation: bytes read from the start of a CSV upload and parsed to measure its rows
+HEAD_BYTES = 1 << 20
+# Excel uploads cannot be sampled cheaply; their in-memory size is bounded from the file
+# size, and their rows from an assumed row size
+EXCEL_EXPANSION = 10
+EXCEL_ROW_BYTES = 200
+
+# Peak memory of reading and cleaning an upload, as a multiple of the cleaned frame
+INGEST_FACTOR = 2.5
+
+# Rows per chunk when the sales are streamed into the SQL store instead of loaded (at most:
+# chunks shrink to what the budget leaves after the resident data, down to MIN_CHUNK_ROWS)
+CHUNK_ROWS = 100_000
+MIN_CHUNK_ROWS = 1_000
+
+# Sampled analyses use at least this many sales rows, even over budget
+MIN_SAMPLE_ROWS = 20_000
+
+# Aggregates filled from every sales row at ingestion, which a sampled analysis reads
+# instead of recomputing them from its sample
+EXACT_AGGREGATES = ("correlation_accumulator",)
+
+# Execution strategies, in order of preference
+STRATEGY_LABELS = {
+    "in_memory": "In memory (pandas)",
+    "chunked": "Chunked (aggregated in the SQL store)",
+    "sampled": "Sampled (stratified, totals scaled)",
+}
+
+# Per analysis: the datasets it reads, its working memory as a multiple of their size
+# (merges and sorts copy their inputs), and the aggregate nodes the SQL store can compute
+# instead (none when the analysis needs the rows themselves)
+ANALYSES = {
+    "sales_trends_chart": {"label": "Sales Trends", "inputs": ("sales",), "working_factor": 0.5, "aggregates": ("daily_sales", "daily_location_sales")},
+    "sales_anomalies_chart": {"label": "Sales Anomalies", "inputs": ("sales",), "working_factor": 0.5, "aggregates": ("daily_location_sales",)},
+    "repeat_customers_chart": {"label": "Repeat Customers", "inputs": ("sales",), "working_factor": 1.5, "aggregates": ("repeat_customer_counts", "repeat_purchase_days")},
+    "category_profit_chart": {"label": "Categorywise Profit", "inputs": ("sales", "products"), "working_factor": 2.0, "aggregates": ("category_stats",)},
+    "location_sales_chart": {"label": "Sales Location Analysis", "inputs": ("sales", "customers"), "working_factor": 2.0, "aggregates": ("location_stats",)},
+    "location_profit_chart": {"label": "Locationwise Profit", "inputs": ("sales", "products"), "working_factor": 2.0, "aggregates": ("category_profit",)},
+    "cohort_retention_chart": {"label": "Cohort Retention", "inputs": ("sales",), "working_factor": 0.5, "aggregates": ("cohort_retention",)},
+    "sales_analysis_chart": {"label": "Sales Analysis", "inputs": ("sales", "products", "customers"), "working_factor": 3.0, "aggregates": ()},
+    "elasticity_chart": {"label": "Price Elasticity", "inputs": ("sales", "products"), "working_factor": 2.0, "aggregates": ()},
+    "location_forecast_chart": {"label": "Location Forecast", "inputs": ("sales",), "working_factor": 1.0, "aggregates": ()},
+    "category_forecast_chart": {"label": "Category Forecast", "inputs": ("sales", "products"), "working_factor": 2.0, "aggregates": ()},
+}
+
+def memory_budget():
+    """
+    Returns:
+    - int: Configured memory budget in bytes (MEMORY_BUDGET_BYTES, or a fraction of the RAM).
+    """
+    if MEMORY_BUDGET_BYTES is not None:
+        return int(MEMORY_BUDGET_BYTES)
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):  # Not available on this platform
+        total = 4 << 30
+    return int(total * MEMORY_BUDGET_FRACTION)
+
+def format_bytes(size):
+    """Human-readable size (e.g. '1.5 GB')."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:,.1f} {unit}" if unit != "B" else f"{size:,.0f} B"
+        size /= 1024
+    return f"{size:,.1f} TB"
+
+def _file_size(file):
+    size = getattr(file, "size", None)
+    if size is None:
+        position = file.tell()
+        file.seek(0, io.SEEK_END)
+        size = file.tell()
+        file.seek(position)
+    return size
+
+def estimate_upload(file, prepare=None):
+    """
+    Estimates the in-memory size of an upload without loading it.
+
+    CSV files are measured from their first HEAD_BYTES: the parsed rows give the bytes per
+    row on disk and in memory, extrapolated to the file size. Excel files are bounded by
+    EXCEL_EXPANSION times their size.
+
+    Parameters:
+    - file: Uploaded file (name, and getvalue()/read()).
+    - prepare (callable, optional): Applied to the sampled rows before measuring them
+      (e.g. the date parsing done at ingestion).
+
+    Returns:
+    - dict: 'name', 'file_bytes', 'rows', 'row_bytes' (in memory), 'memory_bytes' and 'streamable'.
+    """
+    size = _file_size(file)
+    estimate = {"name": file.name, "file_bytes": size, "streamable": file.name.endswith(".csv")}
+
+    if not estimate["streamable"]:
+        memory = size * EXCEL_EXPANSION
+        return {**estimate, "rows": memory // EXCEL_ROW_BYTES, "row_bytes": EXCEL_ROW_BYTES, "memory_bytes": memory}
+
+    file.seek(0)
+    head = file.read(HEAD_BYTES)
+    file.seek(0)
+    complete = len(head) >= size
+    if not complete:
+        head = head[:head.rfind(b"\n") + 1]  # Whole lines only
+
+    sample = pd.read_csv(io.BytesIO(head))
+    if prepare is not None:
+        sample = prepare(sample)
+    if sample.empty:
+        return {**estimate, "rows": 0, "row_bytes": 0, "memory_bytes": 0}
+
+    rows = len(sample) if complete else int(len(sample) * size / len(head))
+    row_bytes = float(sample.memory_usage(deep=True, index=False).sum() / len(sample))
+    return {**estimate, "rows": rows, "row_bytes": row_bytes, "memory_bytes": int(rows * row_bytes)}
+
+def estimate_uploads(product_file, sales_file, customer_file, string_dtype=dp.STRING_DTYPE):
+    """
+    Parameters:
+    - string_dtype (str): Dtype of the text columns at ingestion (Arrow-backed ones take less memory).
+
+    Returns:
+    - dict: Dataset name -> estimate_upload() result.
+    """
+    def typed(df):
+        return dp.use_string_dtype(df, string_dtype)
+
+    return {
+        "products": estimate_upload(product_file, prepare=typed),
+        "sales": estimate_upload(sales_file, prepare=lambda df: typed(dp.add_parsed_dates(df))),
+        "customers": estimate_upload(customer_file, prepare=typed),
+    }
+
+def plan_execution(estimates, budget=None, store_available=True):
+    """
+    Chooses how each analysis runs within the memory budget.
+
+    The datasets are loaded in memory when they fit (with INGEST_FACTOR headroom), and
+    otherwise the sales are streamed into the SQL store in chunks, keeping only a sample.
+    Each analysis then runs in memory if its peak fits, else as SQL aggregates over the
+    store (when it has an aggregate form), else on the largest sample that fits.
+
+    Parameters:
+    - estimates (dict): From estimate_uploads().
+    - budget (int, optional): Memory budget in bytes (defaults to memory_budget()).
+    - store_available (bool): Whether the SQL store can be used.
+
+    Returns:
+    - dict: 'budget', 'estimates', 'ingest' ('in_memory' or 'chunked'), 'resident_bytes',
+      'sales_rows', 'sample_rows', 'chunk_rows' (sales rows read at a time when chunked)
+      and 'analyses' (chart node -> 'label', 'strategy', 'rows' processed, 'peak_bytes',
+      'within_budget').
+    """
+    budget = budget if budget is not None else memory_budget()
+    sales = estimates["sales"]
+    row_bytes, sales_rows = max(sales["row_bytes"], 1), sales["rows"]
+    upload_bytes = sum(estimate["file_bytes"] for estimate in estimates.values())  # Uploads stay in memory
+    dataset_bytes = {name: estimate["memory_bytes"] for name, estimate in estimates.items()}
+    dimension_bytes = dataset_bytes["products"] + dataset_bytes["customers"]
+
+    # === Ingestion ===
+    fits = upload_bytes + INGEST_FACTOR * sum(dataset_bytes.values()) <= budget
+    chunked = not fits and store_available and sales["streamable"]
+    chunk_rows = CHUNK_ROWS
+    chunk_bytes = min(chunk_rows, sales_rows) * row_bytes * INGEST_FACTOR
+
+    if chunked:
+        # The sales sample kept in memory, plus the working memory of the most demanding
+        # analysis over it, takes what the budget leaves after a chunk
+        spare = budget - upload_bytes - dimension_bytes - chunk_bytes
+        largest_factor = max(profile["working_factor"] for profile in ANALYSES.values())
+        sample_rows = int(min(sales_rows, max(MIN_SAMPLE_ROWS, spare / (1 + largest_factor) / row_bytes)))
+        resident = upload_bytes + dimension_bytes + sample_rows * row_bytes
+        # Chunks take what the resident data leaves (less than CHUNK_ROWS when the sample
+        # could not shrink below MIN_SAMPLE_ROWS)
+        chunk_rows = int(min(CHUNK_ROWS, max(MIN_CHUNK_ROWS, (budget - resident) / (row_bytes * INGEST_FACTOR))))
+        chunk_bytes = min(chunk_rows, sales_rows) * row_bytes * INGEST_FACTOR
+    else:
+        sample_rows = sales_rows
+        resident = upload_bytes + sum(dataset_bytes.values())
+
+    # === Analyses ===
+    analyses = {}
+    for name, profile in ANALYSES.items():
+        factor = profile["working_factor"]
+        other_inputs = sum(dataset_bytes[dataset] for dataset in profile["inputs"] if dataset != "sales")
+
+        def peak(rows):
+            return resident + factor * (rows * row_bytes + other_inputs)
+
+        if not chunked and peak(sales_rows) <= budget:
+            strategy, rows, peak_bytes = "in_memory", sales_rows, peak(sales_rows)
+        elif profile["aggregates"] and store_available:
+            strategy, rows, peak_bytes = "chunked", sales_rows, resident + chunk_bytes
+        else:
+            spare = budget - resident - factor * other_inputs
+            rows = int(min(sample_rows, max(MIN_SAMPLE_ROWS, spare / factor / row_bytes)))
+            strategy, peak_bytes = "sampled", peak(rows)
+        analyses[name] = {
+            "label": profile["label"],
+            "strategy": strategy,
+            "rows": min(rows, sales_rows),
+            "peak_bytes": int(peak_bytes),
+            "within_budget": peak_bytes <= budget,
+        }
+
+    return {
+        "budget": budget,
+        "estimates": estimates,
+        "ingest": "chunked" if chunked else "in_memory",
+        "resident_bytes": int(resident),
+        "sales_rows": sales_rows,
+        "sample_rows": sample_rows,
+        "chunk_rows": chunk_rows,
+        "analyses": analyses,
+    }
+
+def plan_table(plan):
+    """
+    Returns:
+    - pd.DataFrame: One row per analysis with its strategy and estimated cost, for display.
+    """
+    return pd.DataFrame([
+        {
+            "Analysis": analysis["label"],
+            "Strategy": STRATEGY_LABELS[analysis["strategy"]],
+            "Sales rows": f"{analysis['rows']:,}",
+            "Estimated peak memory": format_bytes(analysis["peak_bytes"]),
+            "Within budget": "✅" if analysis["within_budget"] else "⚠️",
+        }
+        for analysis in plan["analyses"].values()
+    ])
+
+def in_memory_aggregates(plan):
+    """Aggregate nodes to compute in pandas rather than in the SQL store."""
+    return {
+        aggregate for name, analysis in plan["analyses"].items() if analysis["strategy"] == "in_memory"
+        for aggregate in ANALYSES[name]["aggregates"]
+    }
+
+# === Execution ===
+
+def ingest_sales_in_chunks(store, sales_file, fingerprint, sample_rows, estimated_rows, indexes,
+                           policy=dp.INTEGRITY_POLICY, seed=0, string_dtype=dp.STRING_DTYPE,
+                           products_df=None, customers_df=None, chunk_rows=CHUNK_ROWS):
+    """
+    Streams the sales upload into the SQL store chunk by chunk, keeping a uniform sample.
+
+    Every chunk's foreign keys are checked against key indexes built once, with the
+    given orphan policy (a rejected upload leaves the stored table unchanged). Given the
+    products and customers, each kept chunk also fills a correlation accumulator, so the
+    correlation matrix covers every row rather than the sample.
+
+    Parameters:
+    - store (SalesStore): Store receiving the 'sales' table.
+    - sales_file: Uploaded sales CSV.
+    - fingerprint (str): Identifies the upload and policy (the table is only rewritten when it changed).
+    - sample_rows (int): Rows to keep in memory.
+    - estimated_rows (int): Estimated rows of the upload (sets the sampling rate).
+    - indexes (dict): From data_preprocessor.build_key_indexes().
+    - policy (str): One of data_preprocessor.INTEGRITY_POLICIES.
+    - string_dtype (str): Dtype of the text columns (one of data_preprocessor.STRING_DTYPES).
+    - products_df, customers_df (pd.DataFrame, optional): Cleaned dimensions (for the correlations).
+    - chunk_rows (int): Sales rows read at a time (the plan's 'chunk_rows').
+
+    Returns:
+    - pd.DataFrame: Sampled, cleaned sales rows.
+    - int: Rows in the stored table.
+    - dict: Integrity report over all chunks.
+    - CoMomentAccumulator: Correlations of the kept rows (None without the dimensions).
+    """
+    rng = np.random.default_rng(seed)
+    rate = min(1.0, sample_rows / max(estimated_rows, 1))
+    sampled = []
+    report = dp.empty_integrity_report(policy)
+    enrich = products_df is not None and customers_df is not None
+    accumulator = CoMomentAccumulator(CORRELATION_COLUMNS) if enrich else None
+
+    def checked(chunks):
+        nonlocal report
+        for chunk in chunks:
+            chunk, chunk_report = dp.check_referential_integrity(chunk, indexes, policy)
+            report = dp.merge_integrity_reports(report, chunk_report)
+            sampled.append(chunk[rng.random(len(chunk)) < rate])
+            if enrich:
+                accumulator.update(enrich_sales_chunk(chunk, products_df, customers_df))
+            yield chunk
+
+    sales_file.seek(0)
+    chunks = checked(dp.process_sales_chunks(sales_file, chunk_rows, string_dtype))
+    store.write_table_chunks("sales", chunks, fingerprint)
+    for _ in chunks:  # Table already stored: the file is still read for the sample and report
+        pass
+    sales_file.seek(0)
+
+    # Chunks have their own categories: the concatenated labels are categorized again
+    sample = dp.use_string_dtype(pd.concat(sampled, ignore_index=True), string_dtype) if sampled else pd.DataFrame()
+    if len(sample) > sample_rows:
+        sample = sample.sample(sample_rows, random_state=seed).sort_index().reset_index(drop=True)
+    return sample, store.row_count("sales"), report, accumulator
+
+def apply_plan(graph, plan, total_rows):
+    """
+    Rewires the sampled analyses of a graph to run on a stratified sample of the sales.
+
+    When the sales were ingested in chunks, the graph's 'sales' are already a sample of
+    total_rows stored rows; otherwise each sampled analysis takes its own sample. The
+    EXACT_AGGREGATES an analysis reads still come from the full graph.
+
+    Parameters:
+    - graph (AnalysisGraph): Graph from build_analysis_graph().
+    - plan (dict): From plan_execution().
+    - total_rows (int): Rows of the full sales dataset (totals are scaled to it).
+    """
+    if plan["ingest"] == "chunked":  # Keep the sample's outputs apart from the full dataset's
+        graph.nodes["sales"].update(version=f"sample-{plan['sample_rows']}", key=None)
+
+    add_sample_order(graph)
+    for name, analysis in plan["analyses"].items():
+        if analysis["strategy"] != "sampled":
+            continue
+
+        exact = [aggregate for aggregate in EXACT_AGGREGATES if aggregate in graph.nodes[name]["inputs"]]
+
+        def sampled(sales_df, products_df, customers_df, order, *exact_values, name=name, rows=analysis["rows"], exact=exact):
+            sample = sales_df.take(order[:rows]).reset_index(drop=True)
+            scale = total_rows / max(len(sample), 1)
+            preview = preview_graph(sample, products_df, customers_df, scale, PNG_OPTIONS, BOOTSTRAP_REPLICATES)
+            for aggregate, value in zip(exact, exact_values):
+                preview.seed(aggregate, value)
+            return preview.compute(name)
+
+        graph.add(name, sampled, ["sales", "products", "customers", "sample_order", *exact], "render",
+                  version=f"sampled-{analysis['rows']}-of-{total_rows}")
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    with open("tests/p3.csv", "rb") as products, open("tests/s3.csv", "rb") as sales, open("tests/c3.csv", "rb") as customers:
+        estimates = estimate_uploads(products, sales, customers)
+
+    for budget in (memory_budget(), 250_000, 150_000):
+        plan = plan_execution(estimates, budget)
+        print(f"Budget {format_bytes(budget)}: ingest {plan['ingest']}, resident {format_bytes(plan['resident_bytes'])}")
+        print(plan_table(plan).to_string(index=False), "\n")
@@ -0,0 +1,286 @@
+import io
+import numpy as np
+import pandas as pd
+import data_preproccesing.data_preprocessor as dp
+from .analysis_graph import AnalysisGraph
+from .analysis_pipeline import PNG_OPTIONS, add_analysis_nodes, add_category
+from sales_analysis.sales_anomalies import detect_sales_anomalies
+from prediction.sales_analysis import BOOTSTRAP_REPLICATES
+
+# Sales rows behind each preview, before the exact result (sizes at or above the
+# dataset's row count are skipped)
+PREVIEW_ROWS = (20_000, 200_000)
+
+# Smallest sales dataset for which the page enables progressive previews by default
+PROGRESSIVE_MIN_ROWS = 100_000
+
+# Sales rows read across the upload for the first look, previewed while the whole file is
+# cleaned (it stands in for the smallest preview), and the evenly spaced blocks they come from
+FIRST_LOOK_ROWS = PREVIEW_ROWS[0]
+FIRST_LOOK_BLOCKS = 64
+
+# Bytes read from the start of the upload to measure its line length
+FIRST_LOOK_HEAD_BYTES = 1 << 16
+
+# Previews are drawn at a lower resolution: saving the image dominates a small sample's cost
+PREVIEW_PNG_OPTIONS = {**PNG_OPTIONS, "dpi": 50}
+
+# Previews skip the regression's bootstrap band: the exact chart draws it
+PREVIEW_BOOTSTRAP_REPLICATES = 0
+
+Z_95 = 1.96  # Normal quantile of the 95% confidence margins
+
+def _scale_location_stats(stats, scale):
+    location_sales, unique_customers, gender_counts, median_age = stats
+    # Distinct customers cannot be extrapolated from a row sample: the preview shows those seen
+    return location_sales * scale, unique_customers, gender_counts * scale, median_age
+
+def _scale_category_profit(result, scale):
+    category_counts, location_profit = result
+    return category_counts * scale, location_profit.assign(Profit=location_profit["Profit"] * scale)
+
+# Aggregates holding totals or counts, and how to extrapolate them from a sample
+# (means, medians and fitted coefficients are estimated as they are)
+PREVIEW_SCALERS = {
+    "daily_sales": lambda daily, scale: daily * scale,
+    "daily_location_sales": lambda daily, scale: daily * scale,
+    "location_stats": _scale_location_stats,
+    "category_profit": _scale_category_profit,
+}
+
+# Charts that can be previewed; repeat customers and cohort retention need every purchase
+# of a customer, which a row sample does not keep, and sampling noise would be flagged as
+# sales anomalies, so those are only shown exactly
+PREVIEW_CHARTS = (
+    "sales_trends_chart", "category_profit_chart", "location_sales_chart", "location_profit_chart",
+    "sales_analysis_chart", "elasticity_chart", "location_forecast_chart", "category_forecast_chart",
+)
+
+def stratified_order(strata, seed=0):
+    """
+    Shuffles row positions so that every prefix is a proportional stratified sample.
+
+    Rows are shuffled within their stratum and interleaved by their relative rank, so the
+    first n rows hold about n * N_h / N rows of each stratum h.
+
+    Parameters:
+    - strata (pd.DataFrame): One column per stratification variable, one row per sales row.
+    - seed (int): Random seed (the same data always gives the same previews).
+
+    Returns:
+    - np.ndarray: Row positions in sampling order.
+    """
+    rng = np.random.default_rng(seed)
+    codes = strata.groupby(list(strata.columns), dropna=False, sort=False, observed=True).ngroup().to_numpy()
+    n = len(codes)
+
+    # Rank of each row within its stratum, in random order
+    by_stratum = np.lexsort((rng.random(n), codes))
+    counts = np.bincount(codes)
+    starts = np.cumsum(counts) - counts
+    rank = np.empty(n)
+    rank[by_stratum] = np.arange(n) - np.repeat(starts, counts)
+
+    # Relative position within the stratum (jittered so strata interleave evenly)
+    return np.argsort((rank + rng.random(n)) / counts[codes], kind="stable")
+
+def sample_strata(sales_df, products_df):
+    """Stratification columns of the sales rows (Location, and Category through the product)."""
+    categories = products_df.drop_duplicates("PID").set_index("PID")["Category"]
+    # .array keeps categorical labels categorical (to_numpy would make them Python objects)
+    return pd.DataFrame({"Location": sales_df["Location"].array, "Category": sales_df["PID"].map(categories).array})
+
+def add_sample_order(graph):
+    """Registers the 'sample_order' node (memoized like any other enrich step)."""
+    if "sample_order" not in graph.nodes:
+        graph.add("sample_order", lambda sales_df, products_df: stratified_order(sample_strata(sales_df, products_df)),
+                  ["sales", "products"], "enrich")
+
+def sample_precision(sample, strata, total_rows):
+    """
+    Relative 95% margin of error of the total sales estimated from a stratified sample.
+
+    Parameters:
+    - sample (pd.DataFrame): Sampled sales rows.
+    - strata (pd.DataFrame): Stratification columns of the sampled rows.
+    - total_rows (int): Rows in the full dataset.
+
+    Returns:
+    - float: Margin as a fraction of the estimate (0 for a full pass).
+    """
+    n = len(sample)
+    prices = pd.Series(sample["Sales_Price"].to_numpy(dtype=float))
+    keys = [strata[column].array for column in strata.columns]
+    grouped = prices.groupby(keys, dropna=False, observed=True)
+
+    # Proportional allocation: var(mean) = (1 - f) / n * sum_h W_h * s_h^2
+    # (strata sampled once borrow the overall variance)
+    variances = grouped.var(ddof=1).fillna(prices.var(ddof=1) if n > 1 else 0.0)
+    within = (grouped.size() / n * variances).sum()
+    mean = prices.mean()
+    if not mean or n >= total_rows:
+        return 0.0
+    return float(Z_95 * np.sqrt((1 - n / total_rows) / n * within) / abs(mean))
+
+def spread_sample(file, rows=FIRST_LOOK_ROWS, blocks=FIRST_LOOK_BLOCKS):
+    """
+    Reads about `rows` lines of a CSV upload from evenly spaced blocks, leaving the rest of
+    the file unread (sorted uploads, say by date, are covered from start to end).
+
+    Returns:
+    - bytes: The header and the sampled lines.
+    - float: Bytes of data in the file per sampled byte (the rows' scale).
+    None if the file is not a CSV or is not much larger than the sample.
+    """
+    if not file.name.endswith(".csv"):
+        return None
+    file.seek(0, io.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    head = file.read(FIRST_LOOK_HEAD_BYTES)
+    header = head[:head.find(b"\n") + 1]
+    lines = head[len(header):head.rfind(b"\n") + 1]
+    body = size - len(header)
+    blocks = max(2, min(blocks, rows // 2))  # Several lines per block
+    block_bytes = int(rows * len(lines) / max(lines.count(b"\n"), 1) / blocks) + 1
+    if not header or block_bytes * blocks * 2 >= body:  # Hardly faster than cleaning it all
+        file.seek(0)
+        return None
+
+    parts = [header]
+    for block in range(blocks):
+        start = len(header) + (body - block_bytes) * block // (blocks - 1)
+        file.seek(start)
+        data = file.read(block_bytes)
+        if block:  # Whole lines only
+            data = data[data.find(b"\n") + 1:]
+        parts.append(data[:data.rfind(b"\n") + 1])
+    file.seek(0)
+    sampled = sum(len(part) for part in parts[1:])
+    return b"".join(parts), body / max(sampled, 1)
+
+def first_look(sales_file, products_df, customers_df, policy=dp.INTEGRITY_POLICY, string_dtype=dp.STRING_DTYPE,
+               rows=FIRST_LOOK_ROWS):
+    """
+    Samples the sales upload for previews shown before the whole file is cleaned.
+
+    Parameters:
+    - sales_file: Uploaded sales file (read from evenly spaced blocks; see spread_sample()).
+    - products_df, customers_df (pd.DataFrame): Cleaned dimensions (the sample's orphans are set aside).
+    - policy (str): Orphan policy of the full load ('reject' previews without the orphans,
+      the full load reports them).
+
+    Returns:
+    - dict: 'sample' (cleaned sales rows), 'products', 'customers', 'scale' and the
+      estimated 'total_rows'; None if the upload cannot be sampled.
+    """
+    spread = spread_sample(sales_file, rows)
+    if spread is None:
+        return None
+    data, scale = spread
+    upload = io.BytesIO(data)
+    upload.name = sales_file.name
+    try:
+        sample = dp.process_sales_file(upload, string_dtype)
+    except (dp.CorruptedFileError, dp.DuplicateKeyError):  # Reported by the full load
+        return None
+    read_rows = len(sample)
+    indexes = dp.build_key_indexes(products_df, customers_df)
+    sample, _ = dp.check_referential_integrity(sample, indexes, "keep" if policy == "keep" else "quarantine")
+    return {"sample": sample, "products": products_df, "customers": customers_df,
+            "scale": scale, "total_rows": int(read_rows * scale)}
+
+def preview_graph(sample, products_df, customers_df, scale, png_options=PREVIEW_PNG_OPTIONS, n_boot=PREVIEW_BOOTSTRAP_REPLICATES):
+    """
+    Builds a throwaway pandas graph over a sample, with its totals extrapolated by scale.
+    Models fitted on the sample are not registered.
+
+    Parameters:
+    - png_options (dict): savefig options of the charts (lower resolution by default).
+    - n_boot (int): Bootstrap replicates of the regression's band (none by default).
+
+    Returns:
+    - AnalysisGraph: Same chart nodes as the full graph, memoized privately.
+    """
+    graph = AnalysisGraph()
+    graph.source("sales", sample, "sample")
+    graph.source("products", products_df, "products")
+    graph.source("customers", customers_df, "customers")
+    add_analysis_nodes(graph, png_options=png_options, persist_models=False, n_boot=n_boot)
+
+    for name, scaler in PREVIEW_SCALERS.items():
+        node = graph.nodes[name]
+        node["func"] = lambda *frames, func=node["func"], scaler=scaler: scaler(func(*frames), scale)
+
+    # The forecasts sum the sales themselves: they read sales with extrapolated prices
+    graph.add("scaled_sales", lambda sales_df: sales_df.assign(Sales_Price=sales_df["Sales_Price"] * scale), ["sales"], "enrich")
+    graph.add("scaled_sales_with_category", add_category, ["scaled_sales", "products"], "enrich")
+    graph.nodes["location_forecast_chart"]["inputs"] = ("scaled_sales",)
+    graph.nodes["category_forecast_chart"]["inputs"] = ("scaled_sales_with_category",)
+
+    # Extrapolated daily totals are too noisy to score: samples flag no anomalies
+    graph.nodes["sales_anomalies"]["func"] = lambda daily: detect_sales_anomalies(daily.iloc[:0])
+    return graph
+
+def progressive_charts(graph, name, preview_rows=PREVIEW_ROWS, first_look=None):
+    """
+    Computes a chart from growing stratified samples, then exactly.
+
+    Parameters:
+    - graph (AnalysisGraph or callable): Full analysis graph, or a function returning it
+      (called once the first look is shown, e.g. one waiting for the cleaned uploads).
+    - name (str): Chart node (one of PREVIEW_CHARTS is previewed; others are only computed exactly).
+    - preview_rows (tuple): Sample sizes of the previews (empty for the exact result only).
+    - first_look (dict, optional): From first_look(), previewed before the full graph is needed
+      (in place of the preview sizes up to FIRST_LOOK_ROWS).
+
+    Yields:
+    - dict: 'rows', 'total_rows', 'scale', 'margin' (relative 95% error), 'exact' and
+      'first_look' (whether the rows were read from the upload, out of estimated total rows).
+    - tuple: The chart node's output for that stage.
+    """
+    if first_look is not None and name in PREVIEW_CHARTS:
+        sample, products_df = first_look["sample"], first_look["products"]
+        stage = {"rows": len(sample), "total_rows": first_look["total_rows"], "scale": first_look["scale"],
+                 "margin": sample_precision(sample, sample_strata(sample, products_df), first_look["total_rows"]),
+                 "exact": False, "first_look": True}
+        yield stage, preview_graph(sample, products_df, first_look["customers"], first_look["scale"]).compute(name)
+        preview_rows = [rows for rows in preview_rows if rows > FIRST_LOOK_ROWS]
+
+    graph = graph() if callable(graph) else graph
+    sales_df = graph.compute("sales")
+    total_rows = len(sales_df)
+
+    if name in PREVIEW_CHARTS and preview_rows:
+        add_sample_order(graph)
+        products_df, customers_df = graph.compute("products"), graph.compute("customers")
+        order = graph.compute("sample_order")
+        for rows in preview_rows:
+            if rows >= total_rows:
+                break
+            positions = order[:rows]
+            sample = sales_df.take(positions).reset_index(drop=True)
+            strata = sample_strata(sample, products_df)
+            scale = total_rows / rows
+            stage = {"rows": rows, "total_rows": total_rows, "scale": scale,
+                     "margin": sample_precision(sample, strata, total_rows), "exact": False, "first_look": False}
+            yield stage, preview_graph(sample, products_df, customers_df, scale).compute(name)
+
+    yield {"rows": total_rows, "total_rows": total_rows, "scale": 1.0, "margin": 0.0, "exact": True,
+           "first_look": False}, graph.compute(name)
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    import time
+    from .analysis_graph import GraphMemo
+    from .analysis_pipeline import build_analysis_graph
+
+    with open("tests/p3.csv", "rb") as products, open("tests/s3.csv", "rb") as sales, open("tests/c3.csv", "rb") as customers:
+        graph = build_analysis_graph(products, sales, customers, GraphMemo())
+        look = first_look(sales, graph.compute("products"), graph.compute("customers"), rows=20)
+        start = time.perf_counter()
+        for stage, (_, chart) in progressive_charts(graph, "location_sales_chart", preview_rows=(5, 40), first_look=look):
+            kind = "exact" if stage["exact"] else "first look" if stage["first_look"] else "preview"
+            print(f"{time.perf_counter() - start:.2f}s: {stage['rows']} of {stage['total_rows']} rows, "
+                  f"±{stage['margin']:.1%}, {kind} ({len(chart)} bytes)")
@@ -0,0 +1,95 @@
+import numpy as np
+from .linear_regression import validate_data
+
+# Upper bound on resampled values materialized at once (replicates x rows)
+MAX_BATCH_ELEMENTS = 4_000_000
+
+def bootstrap_regression(x, y, n_boot=200, seed=0, max_batch_elements=MAX_BATCH_ELEMENTS):
+    """
+    Fits simple linear regressions on bootstrap resamples, solving all replicates at once.
+
+    Each batch of replicates is drawn as an index matrix (replicates x rows); the
+    sufficient statistics of every replicate are row-wise reductions over that matrix,
+    and the closed-form least-squares solution is applied to all of them together.
+
+    Parameters:
+    - x (array-like): Independent variable.
+    - y (array-like): Dependent variable.
+    - n_boot (int): Number of bootstrap replicates.
+    - seed (int): Seed of the random generator, for reproducible bands.
+    - max_batch_elements (int): Memory cap on the size of one index matrix.
+
+    Returns:
+    - slopes (np.ndarray): Slope of each replicate (NaN if the resample has no variance in x).
+    - intercepts (np.ndarray): Intercept of each replicate.
+    """
+    x, y = validate_data(x, y)
+    n = len(x)
+    if n == 0:
+        return np.full(n_boot, np.nan), np.full(n_boot, np.nan)
+
+    # Center once so the per-replicate sums stay well conditioned
+    x_center, y_center = x.mean(), y.mean()
+    xc, yc = x - x_center, y - y_center
+
+    rng = np.random.default_rng(seed)
+    batch = max(1, min(n_boot, max_batch_elements // n))
+    slopes = np.empty(n_boot)
+    intercepts = np.empty(n_boot)
+
+    for start in range(0, n_boot, batch):
+        stop = min(start + batch, n_boot)
+        idx = rng.integers(0, n, size=(stop - start, n))
+        xs, ys = xc[idx], yc[idx]
+
+        # Sufficient statistics of every replicate in one reduction each
+        sx, sy = xs.sum(axis=1), ys.sum(axis=1)
+        sxx = np.einsum("ij,ij->i", xs, xs)
+        sxy = np.einsum("ij,ij->i", xs, ys)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var_x = sxx - sx * sx / n
+            w = np.where(var_x > 0, (sxy - sx * sy / n) / var_x, np.nan)
+        b = (sy - w * sx) / n
+
+        slopes[start:stop] = w
+        intercepts[start:stop] = b + y_center - w * x_center
+
+    return slopes, intercepts
+
+def bootstrap_confidence_band(x, y, x_grid, n_boot=200, level=0.95, seed=0):
+    """
+    Computes a pointwise bootstrap confidence band for the regression line.
+
+    Parameters:
+    - x (array-like): Independent variable.
+    - y (array-like): Dependent variable.
+    - x_grid (array-like): Points at which the band is evaluated.
+    - n_boot (int): Number of bootstrap replicates.
+    - level (float): Confidence level of the band (e.g. 0.95).
+    - seed (int): Seed of the random generator.
+
+    Returns:
+    - lower (np.ndarray): Lower bound at each grid point.
+    - upper (np.ndarray): Upper bound at each grid point.
+    """
+    slopes, intercepts = bootstrap_regression(x, y, n_boot=n_boot, seed=seed)
+    valid = ~np.isnan(slopes)
+    x_grid = np.asarray(x_grid, dtype=float)
+
+    # All replicate lines evaluated on the grid at once: (replicates x grid points)
+    lines = intercepts[valid, None] + slopes[valid, None] * x_grid[None, :]
+    alpha = (1 - level) / 2
+    lower, upper = np.quantile(lines, [alpha, 1 - alpha], axis=0)
+    return lower, upper
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    x = rng.uniform(0, 10, 5_000)
+    y = 2 * x + 1 + rng.normal(0, 2, 5_000)
+
+    slopes, intercepts = bootstrap_regression(x, y, n_boot=500)
+    print(f"Slope 95% CI: [{np.quantile(slopes, 0.025):.4f}, {np.quantile(slopes, 0.975):.4f}]")
+    print(f"Intercept 95% CI: [{np.quantile(intercepts, 0.025):.4f}, {np.quantile(intercepts, 0.975):.4f}]")
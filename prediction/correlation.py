@@ -0,0 +1,221 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Numeric columns shown in the sales correlation heatmap
+CORRELATION_COLUMNS = ["Quantity_Sold", "Sales_Price", "Manufacturing Cost", "Age"]
+
+# Chunks in flight per worker, bounding memory while a chunked reader is streamed
+MAX_PENDING_CHUNKS = 2
+
+class ColumnMismatchError(Exception):
+    """Raised when accumulators over different column sets are combined."""
+    pass
+
+class CoMomentAccumulator:
+    """
+    Mergeable running means and co-moments (Welford / Chan et al.) for a fixed set of numeric columns.
+
+    Rows with a missing value in any tracked column are skipped, which matches
+    calling dropna() before DataFrame.corr(). Accumulators filled on separate chunks
+    or workers can be merged, and a previously added chunk can be removed again.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))  # Sum of outer products of deviations from the mean
+
+    @classmethod
+    def _from_stats(cls, columns, n, mean, comoment):
+        acc = cls(columns)
+        acc.n, acc.mean, acc.comoment = int(n), np.asarray(mean, dtype=float), np.asarray(comoment, dtype=float)
+        return acc
+
+    def _chunk_stats(self, chunk):
+        values = chunk[self.columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        values = values[~np.isnan(values).any(axis=1)]
+        n = len(values)
+        if n == 0:
+            return self._from_stats(self.columns, 0, np.zeros(len(self.columns)), np.zeros((len(self.columns),) * 2))
+        mean = values.mean(axis=0)
+        centered = values - mean
+        return self._from_stats(self.columns, n, mean, centered.T @ centered)
+
+    def _check_columns(self, other):
+        if other.columns != self.columns:
+            raise ColumnMismatchError(f"Cannot combine accumulators over {self.columns} and {other.columns}")
+
+    def merge(self, other):
+        """
+        Folds another accumulator into this one in place.
+
+        Parameters:
+        - other (CoMomentAccumulator): Accumulator over the same columns.
+
+        Returns:
+        - CoMomentAccumulator: self, for chaining.
+        """
+        self._check_columns(other)
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.comoment = other.n, other.mean.copy(), other.comoment.copy()
+            return self
+
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * (self.n * other.n / n)
+        self.mean = self.mean + delta * (other.n / n)
+        self.n = n
+        return self
+
+    def subtract(self, other):
+        """
+        Removes the contribution of a previously merged accumulator in place (inverse of merge).
+
+        Parameters:
+        - other (CoMomentAccumulator): Accumulator of rows that were part of this one.
+
+        Returns:
+        - CoMomentAccumulator: self, for chaining.
+        """
+        self._check_columns(other)
+        if other.n == 0:
+            return self
+        if other.n > self.n:
+            raise ValueError("Cannot remove more rows than were accumulated.")
+
+        remaining = self.n - other.n
+        if remaining == 0:
+            self.__init__(self.columns)
+            return self
+
+        mean = (self.n * self.mean - other.n * other.mean) / remaining
+        delta = other.mean - mean
+        self.comoment = self.comoment - other.comoment - np.outer(delta, delta) * (remaining * other.n / self.n)
+        self.mean, self.n = mean, remaining
+        return self
+
+    def update(self, chunk):
+        """
+        Adds the rows of a DataFrame chunk.
+
+        Parameters:
+        - chunk (pd.DataFrame): Contains every tracked column.
+
+        Returns:
+        - CoMomentAccumulator: self, for chaining.
+        """
+        return self.merge(self._chunk_stats(chunk))
+
+    def remove(self, chunk):
+        """
+        Removes the rows of a DataFrame chunk that was added earlier (e.g. deleted or corrected sales).
+
+        Returns:
+        - CoMomentAccumulator: self, for chaining.
+        """
+        return self.subtract(self._chunk_stats(chunk))
+
+    def __add__(self, other):
+        return self.copy().merge(other)
+
+    def copy(self):
+        return self._from_stats(self.columns, self.n, self.mean.copy(), self.comoment.copy())
+
+    def correlation(self):
+        """
+        Pearson correlation matrix of the accumulated rows; costs O(columns²) regardless of row count.
+
+        Returns:
+        - pd.DataFrame: Correlation matrix indexed by the tracked columns (NaN for constant columns).
+        """
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self.comoment / np.outer(scale, scale)
+        corr = np.clip(corr, -1.0, 1.0)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def to_dict(self):
+        """Serializes the accumulator so it can be shipped between workers or persisted."""
+        return {"columns": self.columns, "n": self.n, "mean": self.mean.tolist(), "comoment": self.comoment.tolist()}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restores an accumulator produced by to_dict."""
+        return cls._from_stats(state["columns"], state["n"], state["mean"], state["comoment"])
+
+def enrich_sales_chunk(sales_chunk, products_df, customers_df):
+    """
+    Attaches 'Manufacturing Cost' and 'Age' to a chunk of sales rows.
+
+    Returns:
+    - pd.DataFrame: Sales chunk with the correlation columns.
+    """
+    enriched = sales_chunk.merge(products_df[["PID", "Manufacturing Cost"]], on="PID", how="left")
+    return enriched.merge(customers_df[["CID", "Age"]], on="CID", how="left")
+
+def accumulate_chunks(chunks, columns=CORRELATION_COLUMNS, max_workers=None):
+    """
+    Fills one accumulator per chunk in a worker pool and merges the partial results.
+    Chunks are pulled from the iterable only as workers free up, so a chunked reader is
+    never read far ahead.
+
+    Parameters:
+    - chunks (iterable of pd.DataFrame): Chunks containing the tracked columns.
+    - columns (list): Numeric columns to correlate.
+    - max_workers (int, optional): Size of the worker pool.
+
+    Returns:
+    - CoMomentAccumulator: Accumulator over all chunks.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    total = CoMomentAccumulator(columns)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(CoMomentAccumulator(columns).update, chunk))
+            if len(pending) >= workers * MAX_PENDING_CHUNKS:
+                total.merge(pending.popleft().result())
+        while pending:
+            total.merge(pending.popleft().result())
+    return total
+
+def build_sales_correlation(sales_df, products_df, customers_df, chunk_size=100_000, max_workers=None):
+    """
+    Builds the sales correlation accumulator chunk by chunk without materializing the full merge.
+
+    Parameters:
+    - sales_df (pd.DataFrame or iterable of pd.DataFrame): Sales rows, or a chunked reader.
+    - products_df (pd.DataFrame)
+    - customers_df (pd.DataFrame)
+    - chunk_size (int): Rows per chunk when sales_df is a DataFrame.
+    - max_workers (int, optional): Size of the worker pool.
+
+    Returns:
+    - CoMomentAccumulator
+    """
+    if isinstance(sales_df, pd.DataFrame):
+        sales_chunks = (sales_df.iloc[start:start + chunk_size] for start in range(0, len(sales_df), chunk_size))
+    else:
+        sales_chunks = sales_df
+
+    enriched = (enrich_sales_chunk(chunk, products_df, customers_df) for chunk in sales_chunks)
+    return accumulate_chunks(enriched, CORRELATION_COLUMNS, max_workers)
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    # Load test data
+    sales_df = pd.read_csv("tests/s3.csv")
+    products_df = pd.read_csv("tests/p3.csv")
+    customers_df = pd.read_csv("tests/c3.csv")
+
+    # Fill the accumulator in chunks, as an ingestion pipeline would
+    accumulator = build_sales_correlation(sales_df, products_df, customers_df, chunk_size=1)
+    print(accumulator.correlation())
@@ -0,0 +1,194 @@
+from itertools import product
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from data_preproccesing.data_preprocessor import parse_datetimes
+from pipeline.analysis_graph import requires
+
+# Seasonal period for each resampling frequency used in sales_trends
+SEASON_LENGTHS = {"W": 52, "M": 12}
+
+# Pandas offset aliases for each frequency ('M' is deprecated in favour of 'ME')
+OFFSET_ALIASES = {"W": "W", "M": "ME"}
+
+# Smoothing parameter grid searched per series (level, trend, seasonal)
+ALPHAS = (0.2, 0.5, 0.8)
+BETAS = (0.0, 0.1, 0.3)
+GAMMAS = (0.1, 0.3, 0.5)
+
+def build_series_matrix(sales_df, group_col, freq="W"):
+    """
+    Resamples sales into one row per group and one column per period.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'Date', 'Sales_Price' and group_col.
+    - group_col (str): Column whose values define the series (e.g. 'Location').
+    - freq (str): Resampling frequency, 'W' (weekly) or 'M' (monthly) as in sales_trends.
+
+    Returns:
+    - pd.DataFrame: Total sales per group (rows) and period (columns), missing periods filled with 0.
+    """
+    data = sales_df[[group_col, "Date", "Sales_Price"]].copy()
+    data["Date"] = parse_datetimes(data["Date"])
+    data = data.dropna(subset=["Date", group_col])
+    offset = OFFSET_ALIASES.get(freq, freq)
+
+    matrix = data.groupby([group_col, pd.Grouper(key="Date", freq=offset)], observed=True)["Sales_Price"].sum().unstack(fill_value=0)
+    if matrix.empty:
+        return matrix
+
+    periods = pd.date_range(matrix.columns.min(), matrix.columns.max(), freq=offset)
+    return matrix.reindex(columns=periods, fill_value=0)
+
+def holt_winters_batch(Y, season_length=None, horizon=1, alphas=ALPHAS, betas=BETAS, gammas=GAMMAS):
+    """
+    Fits additive Holt-Winters exponential smoothing to many series at once.
+
+    All series and all smoothing-parameter combinations are advanced together as one
+    (parameters x series) array, so the Python loop only runs over time steps. Each series
+    keeps the parameters with the lowest one-step-ahead squared error. Series shorter than
+    two seasons fall back to Holt's linear trend method (no seasonal component).
+
+    Parameters:
+    - Y (array-like): Matrix of shape (series, periods).
+    - season_length (int, optional): Periods per season (e.g. 12 for monthly data).
+    - horizon (int): Number of future periods to forecast.
+    - alphas, betas, gammas (tuple): Candidate level, trend and seasonal smoothing factors.
+
+    Returns:
+    - forecasts (np.ndarray): Shape (series, horizon), clipped at 0.
+    - params (np.ndarray): Shape (series, 3), the chosen (alpha, beta, gamma) per series.
+    """
+    Y = np.asarray(Y, dtype=float)
+    S, T = Y.shape
+    if S == 0 or T == 0:
+        return np.zeros((S, horizon)), np.full((S, 3), np.nan)
+
+    seasonal = bool(season_length) and T >= 2 * season_length
+    m = season_length if seasonal else 1
+    grid = np.array(list(product(alphas, betas, gammas if seasonal else (0.0,))))
+    a, b, g = grid[:, 0, None], grid[:, 1, None], grid[:, 2, None]  # (parameters, 1) broadcast over series
+
+    # === Initial state from the first one or two seasons ===
+    if seasonal:
+        level0 = Y[:, :m].mean(axis=1)
+        trend0 = (Y[:, m:2 * m].mean(axis=1) - level0) / m
+        season0 = Y[:, :m] - level0[:, None]
+    else:
+        level0 = Y[:, 0]
+        trend0 = Y[:, 1] - Y[:, 0] if T > 1 else np.zeros(S)
+        season0 = np.zeros((S, 1))
+
+    G = len(grid)
+    level = np.broadcast_to(level0, (G, S)).copy()
+    trend = np.broadcast_to(trend0, (G, S)).copy()
+    season = np.broadcast_to(season0, (G, S, m)).copy()
+    sse = np.zeros((G, S))
+
+    # === Smoothing recursions, vectorized over parameters and series ===
+    for t in range(T):
+        s = t % m
+        current_season = season[:, :, s]
+        error = Y[:, t] - (level + trend + current_season)
+        sse += error ** 2
+
+        new_level = a * (Y[:, t] - current_season) + (1 - a) * (level + trend)
+        trend = b * (new_level - level) + (1 - b) * trend
+        season[:, :, s] = g * (Y[:, t] - new_level) + (1 - g) * current_season
+        level = new_level
+
+    # === Keep the best parameters per series and extrapolate ===
+    best = sse.argmin(axis=0)
+    series = np.arange(S)
+    steps = np.arange(1, horizon + 1)
+    forecasts = (
+        level[best, series][:, None]
+        + steps[None, :] * trend[best, series][:, None]
+        + season[best, series][:, (T + steps - 1) % m]
+    )
+    return np.clip(forecasts, 0, None), grid[best]
+
+def forecast_series_matrix(series_matrix, horizon, freq="W"):
+    """
+    Forecasts every row of a series matrix produced by build_series_matrix.
+
+    Parameters:
+    - series_matrix (pd.DataFrame): Groups (rows) x periods (columns).
+    - horizon (int): Number of future periods to forecast.
+    - freq (str): Frequency of the periods, 'W' or 'M'.
+
+    Returns:
+    - pd.DataFrame: Forecast sales per group (rows) and future period (columns).
+    """
+    if series_matrix.columns.empty:  # No dated sales: no history to extrapolate from
+        return pd.DataFrame(index=series_matrix.index, columns=pd.DatetimeIndex([]), dtype=float)
+    forecasts, _ = holt_winters_batch(series_matrix.to_numpy(), SEASON_LENGTHS.get(freq), horizon)
+    offset = OFFSET_ALIASES.get(freq, freq)
+    future = pd.date_range(series_matrix.columns[-1], periods=horizon + 1, freq=offset)[1:]
+    return pd.DataFrame(forecasts, index=series_matrix.index, columns=future)
+
+def forecast_sales_series(sales_series, horizon, freq="W"):
+    """
+    Forecasts a single resampled sales series (e.g. weekly or monthly totals from sales_trends).
+
+    Parameters:
+    - sales_series (pd.Series): Totals indexed by period end date.
+    - horizon (int): Number of future periods to forecast.
+    - freq (str): Frequency of the series, 'W' or 'M'.
+
+    Returns:
+    - pd.Series: Forecast totals indexed by future period end date.
+    """
+    matrix = sales_series.to_frame().T
+    return forecast_series_matrix(matrix, horizon, freq).iloc[0]
+
+@requires("sales")
+def plot_group_forecasts(sales_df, group_col="Location", freq="W", horizon=8, max_groups=12):
+    """
+    Plots history and forecast for the largest groups.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'Date', 'Sales_Price' and group_col.
+    - group_col (str): Column whose values define the series.
+    - freq (str): 'W' (weekly) or 'M' (monthly).
+    - horizon (int): Number of future periods to forecast.
+    - max_groups (int): Number of groups drawn (all groups are still forecast).
+
+    Returns:
+    - forecasts (pd.DataFrame): Forecasts for every group.
+    - fig (matplotlib.figure.Figure)
+    """
+    series_matrix = build_series_matrix(sales_df, group_col, freq)
+    forecasts = forecast_series_matrix(series_matrix, horizon, freq)
+
+    top_groups = series_matrix.sum(axis=1).sort_values(ascending=False).index[:max_groups]
+    fig, ax = plt.subplots(figsize=(14, 6))
+    colors = plt.cm.tab20.colors
+
+    for i, group in enumerate(top_groups):
+        color = colors[i % len(colors)]
+        ax.plot(series_matrix.columns, series_matrix.loc[group], color=color, alpha=0.7, label=str(group))
+        ax.plot(forecasts.columns, forecasts.loc[group], color=color, linestyle="--", linewidth=2)
+
+    if len(series_matrix.columns):
+        ax.axvline(series_matrix.columns[-1], color="black", linestyle=":", linewidth=1)
+
+    period = "Weekly" if freq == "W" else "Monthly"
+    ax.set_title(f"{period} Sales Forecast per {group_col} (dashed = forecast)", fontsize=14, fontweight="bold")
+    ax.set_ylabel("Total Sales")
+    ax.legend(title=group_col, fontsize=9, ncol=2)
+    ax.grid(True, linestyle="--", alpha=0.6)
+
+    fig.tight_layout()
+    return forecasts, fig
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    # Load test data
+    sales_df = pd.read_csv("tests/s3.csv")
+
+    # Forecast the next 4 weeks for every location at once
+    forecasts, fig = plot_group_forecasts(sales_df, "Location", freq="W", horizon=4)
+    print(forecasts)
+    plt.show()
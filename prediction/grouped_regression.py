@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from pipeline.analysis_graph import requires
+
+# Dimensions for which one price -> quantity model is fitted per group
+ELASTICITY_DIMENSIONS = ("PID", "Category", "Location")
+
+def segment_sums(values, starts):
+    """
+    Sums contiguous segments of an array sorted by group.
+
+    Parameters:
+    - values (np.ndarray): Values already ordered by group key.
+    - starts (np.ndarray): Index where each group's segment begins.
+
+    Returns:
+    - np.ndarray: One sum per segment.
+    """
+    return np.add.reduceat(values, starts)
+
+def fit_grouped_regression(df, group_col, x_col="Sales_Price", y_col="Quantity_Sold"):
+    """
+    Fits one simple linear regression (y = w * x + b) per group in a single vectorized pass.
+
+    Rows are sorted once by group key and every group's sufficient statistics are
+    obtained with segmented reductions, so the cost does not depend on the number of groups.
+    Groups with fewer than two rows or no price variance get NaN coefficients.
+
+    Parameters:
+    - df (pd.DataFrame): Contains group_col, x_col and y_col.
+    - group_col (str): Column whose values define the groups.
+    - x_col (str): Independent variable (default 'Sales_Price').
+    - y_col (str): Dependent variable (default 'Quantity_Sold').
+
+    Returns:
+    - pd.DataFrame: Coefficient table indexed by group with
+      'n', 'slope', 'intercept', 'r2', 'x_mean', 'y_mean' and 'elasticity' columns.
+    """
+    data = df[[group_col, x_col, y_col]].dropna()
+    x = pd.to_numeric(data[x_col], errors="coerce").to_numpy(dtype=float)
+    y = pd.to_numeric(data[y_col], errors="coerce").to_numpy(dtype=float)
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    codes, groups = pd.factorize(data[group_col][valid], sort=True)
+    x, y = x[valid], y[valid]
+
+    columns = ["n", "slope", "intercept", "r2", "x_mean", "y_mean", "elasticity"]
+    if len(codes) == 0:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name=group_col))
+
+    # === Sort once by group key and locate segment boundaries ===
+    order = np.argsort(codes, kind="stable")
+    codes, x, y = codes[order], x[order], y[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+
+    # === Segmented reductions over centered values (numerically stable) ===
+    x_mean = segment_sums(x, starts) / counts
+    y_mean = segment_sums(y, starts) / counts
+    dx = x - np.repeat(x_mean, counts)
+    dy = y - np.repeat(y_mean, counts)
+    sxx = segment_sums(dx * dx, starts)
+    sxy = segment_sums(dx * dy, starts)
+    syy = segment_sums(dy * dy, starts)
+
+    # === Closed-form least squares per group ===
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fit_ok = (counts > 1) & (sxx > 0)
+        slope = np.where(fit_ok, sxy / sxx, np.nan)
+        intercept = y_mean - slope * x_mean
+        r2 = np.where(fit_ok & (syy > 0), (sxy * sxy) / (sxx * syy), np.nan)
+        elasticity = np.where(y_mean != 0, slope * x_mean / y_mean, np.nan)
+
+    return pd.DataFrame(
+        {
+            "n": counts,
+            "slope": slope,
+            "intercept": intercept,
+            "r2": r2,
+            "x_mean": x_mean,
+            "y_mean": y_mean,
+            "elasticity": elasticity,
+        },
+        index=pd.Index(groups[codes[starts]], name=group_col),
+    )
+
+def fit_price_elasticities(sales_df, products_df, dimensions=ELASTICITY_DIMENSIONS):
+    """
+    Fits price -> quantity models per product, category and location.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'PID', 'Location', 'Sales_Price', 'Quantity_Sold'.
+    - products_df (pd.DataFrame): Contains 'PID' and 'Category'.
+    - dimensions (tuple): Grouping columns to fit models for.
+
+    Returns:
+    - pd.DataFrame: Coefficient table with 'Dimension' and 'Group' columns
+      followed by the columns of fit_grouped_regression.
+    """
+    data = sales_df
+    if "Category" in dimensions and "Category" not in sales_df.columns:
+        data = sales_df.merge(products_df[["PID", "Category"]], on="PID", how="left")
+
+    tables = []
+    for dimension in dimensions:
+        table = fit_grouped_regression(data, dimension)
+        table.index.name = "Group"
+        tables.append(table.reset_index().assign(Dimension=dimension))
+
+    coefficients = pd.concat(tables, ignore_index=True)
+    return coefficients[["Dimension", "Group"] + [c for c in coefficients.columns if c not in ("Dimension", "Group")]]
+
+def plot_elasticity_summary(coefficients, ax):
+    """
+    Summarizes per-group elasticities as one box plot per dimension
+    instead of drawing a scatter for every group.
+
+    Parameters:
+    - coefficients (pd.DataFrame): Output of fit_price_elasticities.
+    - ax (matplotlib.axes._axes.Axes): The subplot axis to draw the graph on.
+
+    Returns:
+    - None (Plots directly on ax)
+    """
+    fitted = coefficients.dropna(subset=["elasticity"])
+    if fitted.empty:
+        ax.text(0.5, 0.5, "No groups with enough price variation", ha="center", va="center", fontsize=12)
+        return
+
+    dimensions = list(dict.fromkeys(fitted["Dimension"]))
+    values = [fitted.loc[fitted["Dimension"] == d, "elasticity"].to_numpy() for d in dimensions]
+    labels = [f"{d}\n(n={len(v)})" for d, v in zip(dimensions, values)]
+
+    ax.boxplot(values, vert=False, showfliers=False)
+    ax.set_yticks(range(1, len(labels) + 1))
+    ax.set_yticklabels(labels)
+    ax.axvline(0, color="black", linewidth=1)
+    ax.axvline(-1, color="red", linestyle="--", linewidth=1, label="Unit elastic (-1)")
+
+    # Median marker per dimension for a quick read
+    for i, v in enumerate(values, start=1):
+        ax.text(np.median(v), i + 0.3, f"{np.median(v):.2f}", ha="center", va="bottom", fontsize=9)
+
+    ax.set_xlabel("Price Elasticity of Quantity Sold (at mean)")
+    ax.set_title("Price Elasticity per Group")
+    ax.legend()
+    ax.grid(axis="x", linestyle="--", alpha=0.6)
+
+@requires("sales", "products")
+def generate_elasticity_figure(sales_df, products_df):
+    """
+    Generates a figure summarizing per-group price elasticities.
+
+    Parameters:
+    - sales_df (pd.DataFrame)
+    - products_df (pd.DataFrame)
+
+    Returns:
+    - coefficients (pd.DataFrame): Coefficient table for every group.
+    - fig (matplotlib.figure.Figure)
+    """
+    coefficients = fit_price_elasticities(sales_df, products_df)
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    plot_elasticity_summary(coefficients, ax)
+    fig.tight_layout()
+    return coefficients, fig
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    # Load test data
+    sales_df = pd.read_csv("tests/s3.csv")
+    products_df = pd.read_csv("tests/p3.csv")
+
+    # Fit every group at once and plot the summary
+    coefficients, fig = generate_elasticity_figure(sales_df, products_df)
+    print(coefficients)
+    plt.show()
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from data_storage.file_io import atomic_write_json, file_lock
+
+# Default location of the persisted model registry
+REGISTRY_PATH = "models/model_registry.json"
+
+# Sidecar lock file serializing registrations (next to the registry file)
+LOCK_SUFFIX = ".lock"
+
+# Models kept in the registry (one per dataset fingerprint and feature set); registering
+# more evicts the least recently trained
+REGISTRY_MAX_MODELS = 64
+
+# In-process copy of the registry, refreshed whenever the file changes on disk
+_registry_cache = {"path": None, "mtime": None, "models": {}}
+
+class ModelNotFoundError(KeyError):
+    """Raised when no fitted model is registered for a dataset fingerprint and feature set."""
+    pass
+
+def dataset_fingerprint(df, columns):
+    """
+    Computes a stable fingerprint of the values in the given columns.
+
+    Parameters:
+    - df (pd.DataFrame): Dataset the model is trained on.
+    - columns (list): Columns that influence the fit.
+
+    Returns:
+    - str: Hex digest identifying the dataset contents.
+    """
+    digest = hashlib.sha256("|".join(columns).encode("utf-8"))
+    row_hashes = pd.util.hash_pandas_object(df[list(columns)], index=False)
+    digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+def model_key(fingerprint, features, target):
+    """
+    Builds the registry key for a dataset fingerprint and feature set.
+
+    Returns:
+    - str: Key of the form '<fingerprint>:<feature|feature>-><target>'.
+    """
+    return f"{fingerprint}:{'|'.join(features)}->{target}"
+
+def load_registry(path=None, refresh=False):
+    """
+    Loads all registered models, reusing the in-process copy if the file is unchanged.
+
+    Parameters:
+    - path (str, optional): Registry file (defaults to REGISTRY_PATH).
+    - refresh (bool): Re-read the file even if its modification time did not change.
+
+    Returns:
+    - dict: Registry key -> model dictionary.
+    """
+    path = path or REGISTRY_PATH
+    if not os.path.exists(path):
+        return {}
+
+    mtime = os.path.getmtime(path)
+    if refresh or _registry_cache["path"] != path or _registry_cache["mtime"] != mtime:
+        with open(path, "r", encoding="utf-8") as file:
+            _registry_cache.update(path=path, mtime=mtime, models=json.load(file))
+    return _registry_cache["models"]
+
+def save_registry(models, path=None):
+    """
+    Atomically writes the registry so concurrent readers never see a partial file.
+
+    Parameters:
+    - models (dict): Registry key -> model dictionary.
+    - path (str, optional): Registry file (defaults to REGISTRY_PATH).
+    """
+    path = path or REGISTRY_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    atomic_write_json(path, models)
+
+def register_model(model, fingerprint, path=None, max_models=REGISTRY_MAX_MODELS):
+    """
+    Persists a fitted model under its dataset fingerprint and feature set.
+
+    The registry is re-read and rewritten under an exclusive lock, so models registered
+    concurrently by other sessions or processes are kept. Beyond max_models, the least
+    recently trained models are evicted (and refitted if their dataset comes back).
+
+    Parameters:
+    - model (dict): Fitted model with 'features', 'target', 'w' and 'b'.
+    - fingerprint (str): Output of dataset_fingerprint.
+    - path (str, optional): Registry file (defaults to REGISTRY_PATH).
+    - max_models (int): Models kept in the registry.
+
+    Returns:
+    - str: The registry key the model was stored under.
+    """
+    path = path or REGISTRY_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    key = model_key(fingerprint, model["features"], model["target"])
+    with file_lock(path + LOCK_SUFFIX, exclusive=True):
+        models = dict(load_registry(path, refresh=True))
+        models[key] = {**model, "fingerprint": fingerprint, "trained_at": datetime.now(timezone.utc).isoformat()}
+        if len(models) > max_models:  # ISO timestamps in UTC sort chronologically
+            newest = sorted(models, key=lambda name: models[name].get("trained_at", ""), reverse=True)[:max_models]
+            models = {name: models[name] for name in newest}
+        save_registry(models, path)
+    return key
+
+def get_model(fingerprint, features, target, path=None):
+    """
+    Looks up a fitted model.
+
+    Raises:
+    - ModelNotFoundError: If nothing is registered for this dataset and feature set.
+    """
+    key = model_key(fingerprint, features, target)
+    models = load_registry(path)
+    if key not in models:
+        raise ModelNotFoundError(f"No fitted model registered for {key}")
+    return models[key]
+
+def fit_or_load_model(df, fit_func, features=("Sales_Price",), target="Quantity_Sold", path=None, persist=True):
+    """
+    Returns the registered model for this dataset, fitting and registering it only once.
+
+    Parameters:
+    - df (pd.DataFrame): Training data.
+    - fit_func (callable): Fits a model from df, returning a dict or None if fitting is impossible.
+    - features (tuple): Feature columns of the model.
+    - target (str): Target column of the model.
+    - path (str, optional): Registry file (defaults to REGISTRY_PATH).
+    - persist (bool): Use the registry; False fits a throwaway model (e.g. on a sample,
+      whose model would never be looked up again).
+
+    Returns:
+    - dict or None: The fitted model.
+    """
+    data = df.dropna(subset=[*features, target])
+    if not persist:
+        return fit_func(data)
+    fingerprint = dataset_fingerprint(data, [*features, target])
+    try:
+        return get_model(fingerprint, features, target, path)
+    except ModelNotFoundError:
+        model = fit_func(data)
+        if model is not None:
+            register_model(model, fingerprint, path)
+        return model
+
+def predict(model, prices):
+    """
+    Scores a batch of candidate prices with a fitted model in one vectorized step.
+
+    Parameters:
+    - model (dict): Fitted model with 'w' and 'b' on the original scale.
+    - prices (array-like): Candidate 'Sales_Price' values.
+
+    Returns:
+    - np.ndarray: Predicted 'Quantity_Sold' for each price.
+    """
+    prices = np.asarray(prices, dtype=float)
+    return prices * model["w"] + model["b"]
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    import time
+    from prediction.sales_analysis import fit_quantity_model
+
+    # Load test data
+    sales_df = pd.read_csv("tests/s3.csv")
+
+    # Fit once, then reuse the registered coefficients for what-if pricing
+    model = fit_or_load_model(sales_df, fit_quantity_model)
+    if model is None:
+        print("Data issue: Zero variance")
+    else:
+        candidate_prices = np.linspace(1_000, 100_000, 1_000_000)
+        start = time.perf_counter()
+        quantities = predict(model, candidate_prices)
+        elapsed = time.perf_counter() - start
+        print(f"Scored {len(candidate_prices):,} prices in {elapsed * 1e6 / len(candidate_prices):.4f} µs/row")
@@ -1,18 +1,25 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from pipeline.analysis_graph import requires
 from .linear_regression import linear_regression_custom
+from .model_registry import fit_or_load_model, predict
+from .correlation import build_sales_correlation
+from .bootstrap import bootstrap_confidence_band
 
-def predict_quantity_sold(sales_df, ax):
+# Bootstrap replicates of the confidence band around the regression line
+BOOTSTRAP_REPLICATES = 200
+
+def fit_quantity_model(sales_df):
     """
-    Predicts 'Quantity_Sold' using 'Sales_Price' based on Linear Regression.
+    Fits the 'Sales_Price' -> 'Quantity_Sold' regression on normalized inputs.
 
     Parameters:
     - sales_df (pd.DataFrame): DataFrame containing 'Sales_Price' and 'Quantity_Sold'.
-    - ax (matplotlib.axes._axes.Axes): The subplot axis to draw the graph on.
 
     Returns:
-    - None (Plots directly on ax)
+    - dict: Fitted coefficients on the original scale ('w', 'b') together with the
+      normalization statistics, or None if either column has zero variance.
     """
 
     # Clean data: Remove NaN and ensure correct type
@@ -25,8 +32,7 @@ def predict_quantity_sold(sales_df, ax):
     y_mean, y_std = np.mean(y), np.std(y)
 
     if X_std == 0 or y_std == 0:
-        ax.text(0.5, 0.5, "Data issue: Zero variance", ha="center", va="center", fontsize=12)
-        return
+        return None
 
     X_norm = (X - X_mean) / X_std
     y_norm = (y - y_mean) / y_std
@@ -38,14 +44,67 @@ def predict_quantity_sold(sales_df, ax):
     w = w_norm * (y_std / X_std)
     b = (b_norm * y_std) + y_mean - w * X_mean
 
+    return {
+        "features": ["Sales_Price"],
+        "target": "Quantity_Sold",
+        "w": float(w),
+        "b": float(b),
+        "w_norm": float(w_norm),
+        "b_norm": float(b_norm),
+        "x_mean": float(X_mean),
+        "x_std": float(X_std),
+        "y_mean": float(y_mean),
+        "y_std": float(y_std),
+        "n_rows": int(len(X)),
+    }
+
+
+def predict_quantity_sold(sales_df, ax, registry_path=None, n_boot=BOOTSTRAP_REPLICATES, confidence_level=0.95, persist_model=True):
+    """
+    Predicts 'Quantity_Sold' using 'Sales_Price' based on Linear Regression.
+
+    A model already fitted on the same data is reused from the model registry
+    instead of being retrained. A bootstrap confidence band is drawn around the line.
+
+    Parameters:
+    - sales_df (pd.DataFrame): DataFrame containing 'Sales_Price' and 'Quantity_Sold'.
+    - ax (matplotlib.axes._axes.Axes): The subplot axis to draw the graph on.
+    - registry_path (str, optional): Model registry file (defaults to REGISTRY_PATH).
+    - n_boot (int): Bootstrap replicates for the confidence band (0 disables the band).
+    - confidence_level (float): Confidence level of the band.
+    - persist_model (bool): Register the fitted model (False for samples, see fit_or_load_model).
+
+    Returns:
+    - None (Plots directly on ax)
+    """
+
+    # Clean data: Remove NaN and ensure correct type
+    sales_df = sales_df.dropna(subset=["Sales_Price", "Quantity_Sold"])
+    X = pd.to_numeric(sales_df["Sales_Price"], errors="coerce").values
+    y = pd.to_numeric(sales_df["Quantity_Sold"], errors="coerce").values
+
+    model = fit_or_load_model(sales_df, fit_quantity_model, path=registry_path, persist=persist_model)
+
+    if model is None:
+        ax.text(0.5, 0.5, "Data issue: Zero variance", ha="center", va="center", fontsize=12)
+        return
+
+    w, b = model["w"], model["b"]
+
     # Generate predictions
     X_range = np.linspace(X.min(), X.max(), 100)
-    y_pred = w * X_range + b
+    y_pred = predict(model, X_range)
 
     # Scatter plot of actual data
     ax.scatter(X, y, label="Actual Data", color="blue", alpha=0.6)
     ax.plot(X_range, y_pred, label=f"y = {w:.2f}x + {b:.2f}", color="red", linewidth=2)
 
+    # Bootstrap confidence band around the regression line
+    if n_boot:
+        lower, upper = bootstrap_confidence_band(X, y, X_range, n_boot=n_boot, level=confidence_level)
+        ax.fill_between(X_range, lower, upper, color="red", alpha=0.2,
+                        label=f"{confidence_level:.0%} Bootstrap Band")
+
     # Labels and title
     ax.set_xlabel("Sales Price")
     ax.set_ylabel("Quantity Sold")
@@ -54,33 +113,34 @@ def predict_quantity_sold(sales_df, ax):
     ax.grid(True)
 
 
-def correlation_matrix(sales_df, products_df, customers_df, ax):
+def correlation_matrix(sales_df, products_df, customers_df, ax, accumulator=None):
     """
     Generates a correlation matrix for Quantity_Sold, Sales_Price, Manufacturing Cost, and Age.
-    
+
+    The matrix is derived from mergeable co-moment accumulators filled chunk by chunk,
+    so the three frames are never merged in full. A pre-built accumulator (e.g. filled
+    during ingestion) skips the scan entirely.
+
     Parameters:
     - sales_df (pd.DataFrame)
     - products_df (pd.DataFrame)
     - customers_df (pd.DataFrame)
     - ax (matplotlib.axes._axes.Axes): The subplot axis to draw the heatmap on.
+    - accumulator (CoMomentAccumulator, optional): Accumulator over CORRELATION_COLUMNS.
 
     Returns:
     - None (Plots directly on ax)
     """
 
-    # Merge datasets
-    merged_df = sales_df.merge(products_df[["PID", "Manufacturing Cost"]], on="PID", how="left")
-    merged_df = merged_df.merge(customers_df[["CID", "Age"]], on="CID", how="left")
-
-    # Select relevant numerical columns
-    correlation_data = merged_df[["Quantity_Sold", "Sales_Price", "Manufacturing Cost", "Age"]].dropna()
+    if accumulator is None:
+        accumulator = build_sales_correlation(sales_df, products_df, customers_df)
 
-    if correlation_data.empty:
+    if accumulator.n == 0:
         ax.text(0.5, 0.5, "No valid correlation data", ha="center", va="center", fontsize=12)
         return
 
     # Compute correlation matrix
-    corr_matrix = correlation_data.corr()
+    corr_matrix = accumulator.correlation()
 
     # Plot heatmap
     cax = ax.matshow(corr_matrix, cmap="coolwarm", vmin=-1, vmax=1)
@@ -99,7 +159,8 @@ def correlation_matrix(sales_df, products_df, customers_df, ax):
             ax.text(j, i, f"{corr_matrix.iloc[i, j]:.2f}", ha="center", va="center", color="black")
 
 
-def generate_combined_figure(sales_df, products_df, customers_df):
+@requires("sales", "products", "customers")
+def generate_combined_figure(sales_df, products_df, customers_df, accumulator=None, persist_model=True, n_boot=BOOTSTRAP_REPLICATES):
     """
     Generates a single figure with two subplots: 
     1. Scatter plot of 'Sales_Price' vs 'Quantity_Sold' with a regression line.
@@ -109,6 +170,10 @@ def generate_combined_figure(sales_df, products_df, customers_df):
     - sales_df (pd.DataFrame)
     - products_df (pd.DataFrame)
     - customers_df (pd.DataFrame)
+    - accumulator (CoMomentAccumulator, optional): Correlation accumulator filled at ingestion
+      (e.g. over every stored row when sales_df is only a sample).
+    - persist_model (bool): Register the regression model (False for samples).
+    - n_boot (int): Bootstrap replicates of the regression's band (0 disables it).
 
     Returns:
     - matplotlib.figure.Figure
@@ -117,8 +182,8 @@ def generate_combined_figure(sales_df, products_df, customers_df):
     fig, axes = plt.subplots(1, 2, figsize=(12, 5))
 
     # Call individual plotting functions
-    predict_quantity_sold(sales_df, axes[0])
-    correlation_matrix(sales_df, products_df, customers_df, axes[1])
+    predict_quantity_sold(sales_df, axes[0], n_boot=n_boot, persist_model=persist_model)
+    correlation_matrix(sales_df, products_df, customers_df, axes[1], accumulator)
 
     fig.tight_layout()
     return fig
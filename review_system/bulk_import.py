@@ -0,0 +1,155 @@
+import argparse
+import os
+import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from .review_store import REVIEW_DIR, REVIEW_LIMIT, ReviewStore
+from .word_filter import FILTER_WORDS_PATH, TOKEN_PATTERN, WordFilter
+
+BATCH_SIZE = 5_000  # Lines handed to a worker at once
+MAX_PENDING_BATCHES = 4  # Batches in flight per worker, bounding memory while streaming
+
+# 'word: count' lines, as in reviews/word_count.txt
+WORD_COUNT_LINE = re.compile(r"^\s*(\S+)\s*:\s*(\d+)\s*$")
+
+_worker_filter = None  # Compiled once per worker process
+
+def _get_filter(filter_path):
+    global _worker_filter
+    if _worker_filter is None or _worker_filter.path != filter_path:
+        _worker_filter = WordFilter(filter_path)
+    return _worker_filter
+
+def detect_format(path):
+    """
+    Guesses whether a file holds one review per line or 'word: count' pairs.
+
+    Returns:
+    - str: 'word_count' or 'reviews'.
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        lines = [line for _, line in zip(range(50), file) if line.strip()]
+    if lines and all(WORD_COUNT_LINE.match(line) for line in lines):
+        return "word_count"
+    return "reviews"
+
+def iter_batches(path, batch_size=BATCH_SIZE):
+    """
+    Streams the non-empty lines of a file in batches.
+
+    Yields:
+    - list: Up to batch_size stripped lines.
+    """
+    batch = []
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                batch.append(line)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+def process_review_batch(lines, filter_path=FILTER_WORDS_PATH, review_limit=REVIEW_LIMIT):
+    """
+    Tokenizes and filters one batch of reviews (runs inside a worker process).
+
+    Returns:
+    - dict: 'read', 'accepted', the batch's word 'counts' and its last accepted 'reviews'.
+    """
+    word_filter = _get_filter(filter_path)
+    counts = Counter()
+    recent = deque(maxlen=review_limit)
+    accepted = 0
+    for review in lines:
+        blocked, words = word_filter.classify(review)
+        if not blocked:
+            counts.update(words)
+            recent.append(review)
+            accepted += 1
+    return {"read": len(lines), "accepted": accepted, "counts": counts, "reviews": list(recent)}
+
+def process_word_count_batch(lines, filter_path=FILTER_WORDS_PATH, review_limit=REVIEW_LIMIT):
+    """
+    Parses and filters one batch of 'word: count' lines (runs inside a worker process).
+    Entries are re-tokenized like reviews, so 'trends,' counts as 'trends'.
+
+    Returns:
+    - dict: Same shape as process_review_batch, with no reviews.
+    """
+    word_filter = _get_filter(filter_path)
+    counts = Counter()
+    for line in lines:
+        match = WORD_COUNT_LINE.match(line)
+        if match is None:
+            continue
+        for word in TOKEN_PATTERN.findall(match.group(1).lower()):
+            if word_filter.should_count(word):
+                counts[word] += int(match.group(2))
+    return {"read": 0, "accepted": 0, "counts": counts, "reviews": []}
+
+def import_files(paths, store, workers=None, batch_size=BATCH_SIZE, filter_path=FILTER_WORDS_PATH):
+    """
+    Streams review files through a worker pool and merges the results into the store at once.
+
+    Parameters:
+    - paths (list): Review files (one review per line) or 'word: count' archives.
+    - store (ReviewStore): Destination store.
+    - workers (int, optional): Worker processes (defaults to the CPU count).
+    - batch_size (int): Lines per worker batch.
+    - filter_path (str): Blocklist file used by the workers.
+
+    Returns:
+    - dict: Import statistics including 'reviews_per_second'.
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    totals = Counter()
+    recent = deque(maxlen=store.review_limit)
+    stats = {"files": len(paths), "reviews_read": 0, "reviews_accepted": 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in paths:
+            process = process_word_count_batch if detect_format(path) == "word_count" else process_review_batch
+            pending = deque()
+            for batch in iter_batches(path, batch_size):
+                pending.append(pool.submit(process, batch, filter_path, store.review_limit))
+                if len(pending) >= workers * MAX_PENDING_BATCHES:
+                    _merge_result(pending.popleft().result(), totals, recent, stats)
+            while pending:
+                _merge_result(pending.popleft().result(), totals, recent, stats)
+
+    store.import_bulk(list(recent), totals)
+
+    elapsed = time.perf_counter() - start
+    stats.update(
+        distinct_words=len(totals),
+        words_counted=sum(totals.values()),
+        seconds=elapsed,
+        reviews_per_second=stats["reviews_read"] / elapsed if elapsed else 0.0,
+    )
+    return stats
+
+def _merge_result(result, totals, recent, stats):
+    totals.update(result["counts"])
+    recent.extend(result["reviews"])
+    stats["reviews_read"] += result["read"]
+    stats["reviews_accepted"] += result["accepted"]
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import review files into the review store.")
+    parser.add_argument("paths", nargs="+", help="Review files (one per line) or 'word: count' archives")
+    parser.add_argument("--store", default=REVIEW_DIR, help="Review store directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Lines per worker batch")
+    args = parser.parse_args()
+
+    result = import_files(args.paths, ReviewStore(args.store), args.workers, args.batch_size)
+    print(f"Imported {result['reviews_accepted']:,}/{result['reviews_read']:,} reviews and "
+          f"{result['words_counted']:,} words ({result['distinct_words']:,} distinct) from {result['files']} files "
+          f"in {result['seconds']:.2f}s — {result['reviews_per_second']:,.0f} reviews/s")
@@ -0,0 +1,254 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from data_storage.file_io import atomic_write_json, file_lock
+from .word_index import WORD_INDEX_FILE, WordIndex
+
+# Default storage layout inside the reviews folder
+REVIEW_DIR = "reviews"
+LOG_FILE = "review_log.jsonl"
+SNAPSHOT_FILE = "review_snapshot.json"
+LOCK_FILE = "review_store.lock"
+
+# Files written by the previous whole-file storage, imported once into the snapshot
+LEGACY_REVIEW_FILE = "recent_reviews.json"
+LEGACY_WORD_COUNT_FILE = "word_count.json"
+
+REVIEW_LIMIT = 6
+TOP_K = 50  # Words returned by load()
+COMPACTION_THRESHOLD = 200  # Log entries tolerated before the log is folded into the snapshot
+
+class ReviewStore:
+    """
+    Append-only review storage.
+
+    Every submission appends one JSON line (the review text, its word-count deltas and a
+    timestamp) to a log under an exclusive file lock. Compaction folds the log's word counts
+    into the SQLite word index and its reviews into a snapshot; readers combine the snapshot,
+    an indexed top-k query and the log entries written after them.
+    Each entry carries a sequence number, and both the snapshot and the word index record
+    the last one they contain, so an interrupted compaction never double-counts entries.
+
+    Word counts are stored already filtered. When a word_filter is given, the word index
+    records the blocklist version it was filtered with, and compaction re-filters the
+    counts once whenever that version changes.
+    """
+
+    def __init__(self, directory=REVIEW_DIR, review_limit=REVIEW_LIMIT, compaction_threshold=COMPACTION_THRESHOLD,
+                 word_filter=None, half_life_days=None):
+        self.directory = directory
+        self.word_filter = word_filter
+        self.review_limit = review_limit
+        self.compaction_threshold = compaction_threshold
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.lock_path = os.path.join(directory, LOCK_FILE)
+        self._compaction_thread = None
+        os.makedirs(directory, exist_ok=True)
+
+        index_path = os.path.join(directory, WORD_INDEX_FILE)
+        self.word_index = WordIndex(index_path, half_life_days) if half_life_days else WordIndex(index_path)
+
+    # === Snapshot & log reading ===
+
+    def _read_snapshot(self):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        return self._legacy_snapshot()
+
+    def _legacy_snapshot(self):
+        """Builds the initial snapshot from the old whole-file JSON storage, if present."""
+        snapshot = {"last_seq": 0, "reviews": [], "word_count": {}}
+        legacy_reviews = os.path.join(self.directory, LEGACY_REVIEW_FILE)
+        legacy_words = os.path.join(self.directory, LEGACY_WORD_COUNT_FILE)
+        if os.path.exists(legacy_reviews):
+            with open(legacy_reviews, "r", encoding="utf-8") as file:
+                snapshot["reviews"] = json.load(file)[-self.review_limit:]
+        if os.path.exists(legacy_words):
+            with open(legacy_words, "r", encoding="utf-8") as file:
+                snapshot["word_count"] = json.load(file)
+        return snapshot
+
+    def _read_log(self, after_seq):
+        entries = []
+        if not os.path.exists(self.log_path):
+            return entries
+        with open(self.log_path, "r", encoding="utf-8") as file:
+            for line in file:
+                if not line.endswith("\n"):
+                    break  # Torn write from a crashed appender; it was never acknowledged
+                entry = json.loads(line)
+                if entry["seq"] > after_seq:
+                    entries.append(entry)
+        return entries
+
+    def _last_seq(self):
+        """Sequence number of the newest entry, read from the log tail or the snapshot."""
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > 0:
+            with open(self.log_path, "rb") as file:
+                file.seek(max(0, os.path.getsize(self.log_path) - 65536))
+                lines = [line for line in file.read().split(b"\n") if line.strip()]
+            for line in reversed(lines):
+                try:
+                    return json.loads(line)["seq"]
+                except (ValueError, KeyError):
+                    continue
+        return self._read_snapshot()["last_seq"]
+
+    def _index_seq(self):
+        return int(self.word_index.get_meta("last_seq", 0))
+
+    def _pending_words(self, entries):
+        """(timestamp, word deltas) of log entries not yet folded into the word index."""
+        index_seq = self._index_seq()
+        return [(entry["ts"], entry["words"]) for entry in entries if entry["seq"] > index_seq and entry.get("words")]
+
+    def load(self, k=TOP_K, decayed=False):
+        """
+        Returns the latest state: snapshot reviews, indexed top-k words and the log tail.
+
+        Parameters:
+        - k (int): Number of top words to return.
+        - decayed (bool): Rank by time-decayed counts instead of all-time counts.
+
+        Returns:
+        - reviews (deque): The most recent reviews (at most review_limit).
+        - word_count (Counter): The k most frequent words.
+        """
+        with file_lock(self.lock_path, exclusive=False):
+            snapshot = self._read_snapshot()
+            entries = self._read_log(min(snapshot["last_seq"], self._index_seq()))
+
+            reviews = deque(snapshot["reviews"], maxlen=self.review_limit)
+            reviews.extend(entry["review"] for entry in entries
+                           if entry["seq"] > snapshot["last_seq"] and entry.get("review") is not None)
+            word_count = self.word_index.top_k(k, decayed=decayed, pending=self._pending_words(entries))
+        return reviews, word_count
+
+    # === Writing ===
+
+    def append(self, review=None, words=None):
+        """
+        Appends one review and/or its word-count deltas to the log.
+
+        Parameters:
+        - review (str, optional): Review text to show among the recent reviews.
+        - words (dict, optional): Word -> count increments.
+
+        Returns:
+        - int: Sequence number of the new entry.
+        """
+        with file_lock(self.lock_path, exclusive=True):
+            seq = self._last_seq() + 1
+            line = json.dumps({"seq": seq, "ts": time.time(), "review": review, "words": dict(words or {})})
+            with open(self.log_path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+        self.compact_in_background()
+        return seq
+
+    def compact(self):
+        """
+        Folds the log into the word index and the snapshot, then truncates the log.
+
+        Returns:
+        - int: Number of log entries folded.
+        """
+        with file_lock(self.lock_path, exclusive=True):
+            return self._compact_locked()
+
+    def _compact_locked(self):
+        snapshot = self._read_snapshot()
+        entries = self._read_log(min(snapshot["last_seq"], self._index_seq()))
+        refilter = self.needs_refilter()
+        legacy_words = snapshot.get("word_count")
+        if not entries and not refilter and not legacy_words and os.path.exists(self.snapshot_path):
+            return 0
+
+        # === Word counts: one SQLite transaction, tagged with the last folded sequence ===
+        last_seq = max([snapshot["last_seq"], self._index_seq()] + [entry["seq"] for entry in entries])
+        with self.word_index.transaction() as conn:
+            if legacy_words and not self.word_index.get_meta("legacy_imported", conn=conn):
+                self.word_index.increment_many(legacy_words, conn=conn)
+                self.word_index.set_meta("legacy_imported", 1, conn)
+            for timestamp, words in self._pending_words(entries):
+                self.word_index.increment_many(words, timestamp, conn=conn)
+            if refilter:
+                self.word_index.refilter(self.word_filter, conn)
+                self.word_index.set_meta("filter_version", self.word_filter.version, conn)
+            self.word_index.set_meta("last_seq", last_seq, conn)
+
+        # === Reviews: snapshot of the most recent ones ===
+        reviews = deque(snapshot["reviews"], maxlen=self.review_limit)
+        reviews.extend(entry["review"] for entry in entries
+                       if entry["seq"] > snapshot["last_seq"] and entry.get("review") is not None)
+        atomic_write_json(self.snapshot_path, {"last_seq": last_seq, "reviews": list(reviews)})
+
+        # Entries are now covered by the snapshot and the index, so truncating is safe
+        open(self.log_path, "w").close()
+        return len(entries)
+
+    def import_bulk(self, reviews, word_count):
+        """
+        Merges a bulk import into the store: all word counts in one transaction,
+        and the given reviews appended after the current recent reviews.
+
+        Parameters:
+        - reviews (list): Reviews to add to the recent reviews, oldest first.
+        - word_count (dict): Already filtered word counts.
+        """
+        with file_lock(self.lock_path, exclusive=True):
+            self._compact_locked()
+            self.word_index.increment_many(word_count)
+
+            snapshot = self._read_snapshot()
+            recent = deque(snapshot["reviews"], maxlen=self.review_limit)
+            recent.extend(reviews)
+            atomic_write_json(self.snapshot_path, {"last_seq": snapshot["last_seq"], "reviews": list(recent)})
+
+    def needs_refilter(self):
+        """Whether the stored counts were filtered with a different blocklist than word_filter's."""
+        if self.word_filter is None:
+            return False
+        return self.word_index.get_meta("filter_version") != self.word_filter.version
+
+    def log_size(self):
+        """Number of entries currently waiting in the log."""
+        if not os.path.exists(self.log_path):
+            return 0
+        with open(self.log_path, "rb") as file:
+            return sum(1 for _ in file)
+
+    def compact_in_background(self):
+        """
+        Starts a compaction thread once the log exceeds the compaction threshold.
+
+        Returns:
+        - bool: Whether a compaction was started.
+        """
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return False
+        if self.log_size() < self.compaction_threshold:
+            return False
+
+        self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+        self._compaction_thread.start()
+        return True
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    store = ReviewStore(tempfile.mkdtemp())
+
+    store.append("Great tool for sales trends", {"great": 1, "tool": 1, "sales": 1, "trends": 1})
+    store.append("Love the sales heatmaps", {"love": 1, "sales": 1, "heatmaps": 1})
+    print(store.load(k=3))
+
+    print("Folded entries:", store.compact())
+    print(store.load(k=3))
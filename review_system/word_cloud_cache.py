@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from data_storage.file_io import atomic_write_json, file_lock
+from .review_store import REVIEW_DIR
+
+# Cached rendering inside the reviews folder
+CLOUD_IMAGE_FILE = "word_cloud.png"
+CLOUD_META_FILE = "word_cloud.json"
+CLOUD_LOCK_FILE = "word_cloud.lock"
+
+TOP_K = 50  # Words drawn in the cloud
+
+def top_k_words(word_count, k=TOP_K):
+    """
+    Ranks words by frequency (ties broken alphabetically so the order is stable).
+
+    Returns:
+    - list: (word, frequency) pairs of the k most frequent words.
+    """
+    return sorted(((word, freq) for word, freq in word_count.items() if freq > 0),
+                  key=lambda item: (-item[1], item[0]))[:k]
+
+def top_k_fingerprint(word_count, k=TOP_K):
+    """
+    Fingerprints the top-k set and its ranking; frequency changes that keep the ranking are ignored.
+
+    Returns:
+    - str: Hex digest of the ranked top-k words.
+    """
+    ranked = [word for word, _ in top_k_words(word_count, k)]
+    return hashlib.sha1("\n".join(ranked).encode("utf-8")).hexdigest()
+
+def blue_color_func(word, font_size, position, orientation, random_state=None, **kwargs):
+    """Deterministic shade of blue per word, so re-renders of the same words look the same."""
+    return f"hsl(210, 70%, {40 + zlib.crc32(word.encode('utf-8')) % 40}%)"
+
+def render_word_cloud(frequencies):
+    """
+    Lays out and rasterizes the word cloud.
+
+    Parameters:
+    - frequencies (dict): Word -> frequency of the words to draw.
+
+    Returns:
+    - PIL.Image.Image: The rendered cloud.
+    """
+    from wordcloud import WordCloud  # Heavy import, only needed when the ranking changed
+
+    wordcloud = WordCloud(
+        width=800,
+        height=400,
+        background_color="white",  # Lighter background for clarity
+        max_words=TOP_K,  # Limit to avoid clutter
+        min_font_size=12,  # Ensure readability
+        scale=3,  # Higher resolution
+        random_state=42,  # Stable layout for the same words
+        color_func=blue_color_func  # Apply custom colors
+    ).generate_from_frequencies(frequencies)
+    return wordcloud.to_image()
+
+class WordCloudCache:
+    """
+    Keeps the rendered word cloud on disk next to the fingerprint of the top-k words it shows.
+
+    The cached image is served as long as the top-k set and ranking are unchanged. When they
+    change, the stale image keeps being served while a background thread renders the new one;
+    only the very first render (no image yet) happens in the foreground.
+    """
+
+    def __init__(self, directory=REVIEW_DIR, k=TOP_K):
+        self.k = k
+        self.image_path = os.path.join(directory, CLOUD_IMAGE_FILE)
+        self.meta_path = os.path.join(directory, CLOUD_META_FILE)
+        self.lock_path = os.path.join(directory, CLOUD_LOCK_FILE)
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def cached_fingerprint(self):
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.image_path)):
+            return None
+        with open(self.meta_path, "r", encoding="utf-8") as file:
+            return json.load(file).get("fingerprint")
+
+    def rebuild(self, word_count):
+        """
+        Renders the cloud for word_count and stores it with its fingerprint.
+
+        Returns:
+        - str: Path of the rendered image.
+        """
+        fingerprint = top_k_fingerprint(word_count, self.k)
+        with file_lock(self.lock_path, exclusive=True):
+            if self.cached_fingerprint() == fingerprint:
+                return self.image_path  # Another session already rendered this ranking
+
+            image = render_word_cloud(dict(top_k_words(word_count, self.k)))
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.image_path) or ".", suffix=".png")
+            with os.fdopen(fd, "wb") as file:
+                image.save(file, format="PNG")
+            os.replace(tmp_path, self.image_path)
+            atomic_write_json(self.meta_path, {"fingerprint": fingerprint, "words": [w for w, _ in top_k_words(word_count, self.k)]})
+        return self.image_path
+
+    def get(self, word_count):
+        """
+        Returns the image to display for word_count.
+
+        Parameters:
+        - word_count (Counter): Current (filtered) word frequencies.
+
+        Returns:
+        - image_path (str): Path of the rendered cloud.
+        - fresh (bool): False while a re-render for a changed ranking runs in the background.
+        """
+        fingerprint = top_k_fingerprint(word_count, self.k)
+        cached = self.cached_fingerprint()
+        if cached == fingerprint:
+            return self.image_path, True
+        if cached is None:
+            return self.rebuild(word_count), True
+
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.rebuild, args=(dict(word_count),), daemon=True)
+            self._thread.start()
+        return self.image_path, False
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    from collections import Counter
+
+    cache = WordCloudCache(tempfile.mkdtemp())
+    counts = Counter({"sales": 12, "trends": 9, "charts": 7, "profit": 5, "heatmap": 3})
+
+    print(cache.get(counts))  # First render happens in the foreground
+    counts["sales"] += 1
+    print(cache.get(counts))  # Same ranking: served from the cache
+    counts["heatmap"] += 10
+    print(cache.get(counts))  # Ranking changed: stale image while re-rendering
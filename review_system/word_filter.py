@@ -0,0 +1,144 @@
+import hashlib
+import importlib.util
+import os
+import re
+import threading
+from collections import Counter
+
+# Expanded filter words to prevent "lol" variations and vandalism
+DEFAULT_FILTER_WORDS = {
+    "lol", "lolis", "laughing", "out", "loud",  # Cover "laughing out loud" and variations
+    "haha", "hehe", "lmao", "rofl"  # Other informal laughter terms
+}
+
+# Optional blocklist file (one word per line, '#' starts a comment); replaces the defaults when present
+FILTER_WORDS_PATH = "reviews/filter_words.txt"
+
+# "lol" with repeated letters (e.g. "lloool"); trailing symbols need no match of their own
+LOL_PATTERN = r"l+o+l+"
+TOKEN_PATTERN = re.compile(r"\b\w+\b")
+
+def load_stopwords():
+    """
+    Reads WordCloud's bundled stopword list without importing wordcloud
+    (which would pull in NumPy, Pillow and Matplotlib on every page load).
+
+    Returns:
+    - frozenset: Lowercase stopwords (same as wordcloud.STOPWORDS).
+    """
+    spec = importlib.util.find_spec("wordcloud")
+    path = os.path.join(spec.submodule_search_locations[0], "stopwords")
+    with open(path, "r", encoding="utf-8") as file:
+        return frozenset(line.strip().lower() for line in file if line.strip())
+
+def load_filter_words(path=FILTER_WORDS_PATH):
+    """
+    Reads the blocklist file, falling back to DEFAULT_FILTER_WORDS if it does not exist.
+
+    Returns:
+    - frozenset: Lowercase filter words.
+    """
+    if not path or not os.path.exists(path):
+        return frozenset(DEFAULT_FILTER_WORDS)
+    with open(path, "r", encoding="utf-8") as file:
+        words = (line.split("#", 1)[0].strip().lower() for line in file)
+        return frozenset(word for word in words if word)
+
+def compile_filter(filter_words):
+    """
+    Compiles the filter words and the lol-pattern into one alternation, longest words first.
+
+    Returns:
+    - re.Pattern: Matches anywhere a filter word (or a lol variant) occurs as a substring.
+    """
+    alternatives = [LOL_PATTERN] + [re.escape(word) for word in sorted(filter_words, key=len, reverse=True)]
+    return re.compile("|".join(alternatives))
+
+class WordFilter:
+    """
+    Single-pass review classifier over a hot-reloadable blocklist.
+
+    A review is rejected when any filter word occurs inside any of its words; since
+    filter words contain no whitespace this is one search of the combined pattern over
+    the lowercased review. Accepted reviews therefore contain no filtered substrings,
+    so their tokens only need the stopword check before being counted.
+    """
+
+    def __init__(self, path=FILTER_WORDS_PATH, stopwords=None):
+        self.path = path
+        self.stopwords = load_stopwords() if stopwords is None else frozenset(word.lower() for word in stopwords)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._install(load_filter_words(path))
+
+    def _install(self, filter_words):
+        self.filter_words = filter_words
+        self.pattern = compile_filter(filter_words)
+        digest = hashlib.sha1("\n".join(sorted(filter_words)).encode("utf-8"))
+        self.version = digest.hexdigest()
+        if self.path and os.path.exists(self.path):
+            self._mtime = os.path.getmtime(self.path)
+        else:
+            self._mtime = None
+
+    def reload_if_changed(self):
+        """
+        Recompiles the matcher if the blocklist file was created, edited or removed.
+
+        Returns:
+        - bool: Whether the blocklist changed.
+        """
+        mtime = os.path.getmtime(self.path) if self.path and os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            previous = self.version
+            self._install(load_filter_words(self.path))
+            return self.version != previous
+
+    def is_blocked(self, text):
+        """Whether the text contains a filter word or a lol variant."""
+        return self.pattern.search(text.lower()) is not None
+
+    def should_count(self, word):
+        """Whether a single word belongs in the word counts."""
+        word = word.lower()
+        return word not in self.stopwords and self.pattern.search(word) is None
+
+    def classify(self, review):
+        """
+        Classifies a whole review in one scan.
+
+        Parameters:
+        - review (str): Raw review text.
+
+        Returns:
+        - blocked (bool): Whether the review contains filtered words.
+        - word_counts (Counter): Countable words of an accepted review (empty if blocked).
+        """
+        text = review.lower()
+        if self.pattern.search(text):
+            return True, Counter()
+        return False, Counter(token for token in TOKEN_PATTERN.findall(text) if token not in self.stopwords)
+
+    def filter_counts(self, word_count):
+        """
+        Re-applies the current blocklist to stored counts (used after the blocklist changes).
+
+        Returns:
+        - Counter: Lowercased counts without stopwords or filtered words.
+        """
+        filtered = Counter()
+        for word, freq in word_count.items():
+            if self.should_count(word):
+                filtered[word.lower()] += freq
+        return filtered
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    word_filter = WordFilter()
+
+    print(word_filter.classify("The trend charts are really clear and useful"))
+    print(word_filter.classify("lool this is great"))
+    print(word_filter.filter_counts(Counter({"Great": 2, "the": 5, "haha": 1, "charts": 3})))
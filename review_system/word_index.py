@@ -0,0 +1,210 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Default database inside the reviews folder
+WORD_INDEX_FILE = "word_index.sqlite3"
+
+HALF_LIFE_DAYS = 30  # Half-life of the time-decayed counts
+MAX_DECAY_EXPONENT = 500  # Rebase stored weights before exp() gets near float overflow
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS word_counts (
+    word TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    decayed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_word_counts_count ON word_counts (count DESC, word);
+CREATE INDEX IF NOT EXISTS idx_word_counts_decayed ON word_counts (decayed DESC, word);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+UPSERT = """
+INSERT INTO word_counts (word, count, decayed) VALUES (?, ?, ?)
+ON CONFLICT (word) DO UPDATE SET
+    count = count + excluded.count,
+    decayed = decayed + excluded.decayed
+"""
+
+class WordIndex:
+    """
+    Word frequencies in SQLite with indexed top-k queries.
+
+    Increments are upserts inside a single transaction. Time-decayed counts use forward
+    decay: an occurrence at time t adds exp(rate * (t - epoch)) to the stored weight, and
+    the decayed count at time now is weight * exp(-rate * (now - epoch)). The scaling is the
+    same for every word, so the stored weights keep the decayed ranking and the top-k
+    query is served by an index without rewriting rows as time passes.
+    """
+
+    def __init__(self, path=WORD_INDEX_FILE, half_life_days=HALF_LIFE_DAYS):
+        self.path = path
+        self.rate = math.log(2) / (half_life_days * 86400)
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+        with self.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (repr(time.time()),))
+
+    # === Connection handling ===
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Runs the block in one write transaction (rolled back on error)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get_meta(self, key, default=None, conn=None):
+        row = (conn or self._connection()).execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value, conn):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # === Decay ===
+
+    def epoch(self, conn=None):
+        return float(self.get_meta("epoch", conn=conn))
+
+    def weight(self, timestamp, epoch):
+        """Forward-decay weight of one occurrence at timestamp."""
+        return math.exp(self.rate * (timestamp - epoch))
+
+    def _rebase_if_needed(self, conn, timestamp):
+        epoch = self.epoch(conn)
+        if self.rate * (timestamp - epoch) > MAX_DECAY_EXPONENT:
+            conn.execute("UPDATE word_counts SET decayed = decayed * ?", (self.weight(epoch, timestamp),))
+            self.set_meta("epoch", repr(timestamp), conn)
+            epoch = timestamp
+        return epoch
+
+    # === Writing ===
+
+    def increment_many(self, counts, timestamp=None, conn=None):
+        """
+        Atomically adds word counts observed at timestamp.
+
+        Parameters:
+        - counts (dict): Word -> count increments.
+        - timestamp (float, optional): Unix time of the occurrences (defaults to now).
+        - conn (sqlite3.Connection, optional): Join an open transaction instead of starting one.
+        """
+        if not counts:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        if conn is None:
+            with self.transaction() as conn:
+                return self.increment_many(counts, timestamp, conn)
+
+        w = self.weight(timestamp, self._rebase_if_needed(conn, timestamp))
+        conn.executemany(UPSERT, ((word, n, n * w) for word, n in counts.items()))
+
+    def refilter(self, word_filter, conn):
+        """
+        Drops and merges stored words according to word_filter, keeping their decayed weights.
+        """
+        rows = conn.execute("SELECT word, count, decayed FROM word_counts").fetchall()
+        merged = {}
+        for word, count, decayed in rows:
+            if word_filter.should_count(word):
+                total = merged.setdefault(word.lower(), [0, 0.0])
+                total[0] += count
+                total[1] += decayed
+        conn.execute("DELETE FROM word_counts")
+        conn.executemany(UPSERT, ((word, count, decayed) for word, (count, decayed) in merged.items()))
+
+    # === Reading ===
+
+    def top_k(self, k, decayed=False, now=None, pending=()):
+        """
+        Returns the k most frequent words using the count (or decayed) index.
+
+        Increments not yet written to the index can be passed as pending; the result stays
+        exact because a word outside the stored top-k can only overtake it through them.
+
+        Parameters:
+        - k (int): Number of words to return.
+        - decayed (bool): Rank by time-decayed counts.
+        - now (float, optional): Unix time the decayed counts are evaluated at.
+        - pending (iterable): (timestamp, counts) pairs not yet stored.
+
+        Returns:
+        - Counter: Word -> count (or decayed count at now).
+        """
+        conn = self._connection()
+        column = "decayed" if decayed else "count"
+        epoch = self.epoch(conn)
+
+        stored = dict(conn.execute(f"SELECT word, {column} FROM word_counts ORDER BY {column} DESC, word LIMIT ?", (k,)))
+        extra = Counter()
+        for timestamp, counts in pending:
+            w = self.weight(timestamp, epoch) if decayed else 1
+            for word, n in counts.items():
+                extra[word] += n * w
+
+        merged = Counter(stored)
+        merged.update(self.lookup(set(extra) - set(stored), decayed))
+        merged.update(extra)
+        top = sorted(merged.items(), key=lambda item: (-item[1], item[0]))[:k]  # Ties broken by word, as in SQL
+
+        if not decayed:
+            return Counter(dict(top))
+        scale = self.weight(epoch, time.time() if now is None else now)
+        return Counter({word: weight * scale for word, weight in top})
+
+    def lookup(self, words, decayed=False):
+        """
+        Returns the stored counts (or raw forward-decay weights) of the given words.
+
+        Returns:
+        - dict: Word -> stored value (missing words are omitted).
+        """
+        column = "decayed" if decayed else "count"
+        words = list(words)
+        result = {}
+        conn = self._connection()
+        for start in range(0, len(words), 500):  # Stay below SQLite's bound-parameter limit
+            batch = words[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            result.update(conn.execute(f"SELECT word, {column} FROM word_counts WHERE word IN ({placeholders})", batch))
+        return result
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM word_counts").fetchone()[0]
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    import tempfile
+
+    index = WordIndex(os.path.join(tempfile.mkdtemp(), WORD_INDEX_FILE), half_life_days=1)
+    day = 86400
+    now = time.time()
+
+    index.increment_many({"sales": 10, "charts": 4}, timestamp=now - 5 * day)  # Old reviews
+    index.increment_many({"forecast": 3, "charts": 2}, timestamp=now)  # Today's reviews
+
+    print("All-time:", index.top_k(3))
+    print("Decayed:", index.top_k(3, decayed=True, now=now))
@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from data_preproccesing.data_preprocessor import ANONYMOUS_CID, parse_datetimes
+from pipeline.analysis_graph import requires
+
+# Location label of the matrix over all locations (cohorts by first purchase anywhere)
+ALL_LOCATIONS = "All locations"
+
+# Heatmap cells are annotated with their retention rate up to this many cohorts and months
+ANNOTATE_MAX_CELLS = 24
+
+# Customers active in each month since their first purchase, per location and acquisition
+# month, computed inside the SQL store (months are numbered year * 12 + month - 1)
+COHORT_RETENTION_SQL = """
+WITH active AS (
+    SELECT DISTINCT Location, CID,
+           CAST(strftime('%Y', Date) AS INTEGER) * 12 + CAST(strftime('%m', Date) AS INTEGER) - 1 AS Month
+    FROM sales
+    WHERE CID IS NOT NULL AND CAST(CID AS TEXT) != ? AND Date IS NOT NULL
+),
+scoped AS (
+    SELECT Location, CID, Month FROM active
+    UNION
+    SELECT NULL, CID, Month FROM active
+),
+cohorts AS (
+    SELECT Location, CID, MIN(Month) AS Cohort FROM scoped GROUP BY Location, CID
+)
+SELECT s.Location, c.Cohort, s.Month - c.Cohort AS Age, COUNT(*) AS Customers
+FROM scoped AS s JOIN cohorts AS c ON c.CID = s.CID AND c.Location IS s.Location
+GROUP BY s.Location, c.Cohort, Age
+"""
+
+def _month_label(month):
+    return f"{month // 12}-{month % 12 + 1:02d}"
+
+def count_cohorts(customers, groups, months, n_groups):
+    """
+    Counts the active customers of each (group, acquisition month, months since acquisition)
+    in one pass over the sorted rows.
+
+    Each row becomes one integer key (customer, group, month); sorting and deduplicating
+    the keys leaves one entry per customer and active month, in order, so each customer's
+    first entry gives its cohort. A single bincount over the flat (group, cohort, age)
+    cell numbers then accumulates the matrix.
+
+    Parameters:
+    - customers (np.ndarray): Integer customer codes.
+    - groups (np.ndarray): Integer group (location) codes; a customer buying in two
+      groups joins a cohort in each.
+    - months (np.ndarray): Integer month numbers (year * 12 + month - 1).
+    - n_groups (int): Number of groups.
+
+    Returns:
+    - np.ndarray: Counts of shape (n_groups, cohorts, ages).
+    - int: Month number of the first cohort.
+    """
+    if len(customers) == 0:
+        return np.zeros((n_groups, 0, 0), dtype=np.int64), 0
+
+    first_month = int(months.min())
+    n_months = int(months.max()) - first_month + 1
+
+    # Sorted distinct (customer in group, month) keys
+    members = customers.astype(np.int64) * n_groups + groups
+    members, offsets = np.divmod(np.unique(members * n_months + (months - first_month)), n_months)
+
+    # Each member's first (earliest) entry holds its acquisition month
+    first = np.ones(len(members), dtype=bool)
+    first[1:] = members[1:] != members[:-1]
+    cohorts = offsets[np.maximum.accumulate(np.where(first, np.arange(len(members)), 0))]
+
+    cells = ((members % n_groups) * n_months + cohorts) * n_months + (offsets - cohorts)
+    counts = np.bincount(cells, minlength=n_groups * n_months * n_months)
+    return counts.reshape(n_groups, n_months, n_months), first_month
+
+def cohort_frame(counts, locations, first_month):
+    """
+    Labels a (location, cohort, age) count array.
+
+    Returns:
+    - pd.DataFrame: Indexed by ('Location', 'Cohort' as 'YYYY-MM'), one column per month since
+      the first purchase (0 holds the cohort size); ages after the latest sale are NaN, and
+      empty cohorts are dropped.
+    """
+    n_groups, n_cohorts, n_ages = counts.shape
+    frame = pd.DataFrame(
+        counts.reshape(n_groups * n_cohorts, n_ages).astype(float),
+        index=pd.MultiIndex.from_product(
+            [list(locations), [_month_label(first_month + cohort) for cohort in range(n_cohorts)]],
+            names=["Location", "Cohort"]
+        ),
+        columns=pd.RangeIndex(n_ages, name="Months Since First Purchase"),
+    )
+
+    # A cohort acquired c months in can only be observed for n_cohorts - c months
+    cohort_numbers = np.tile(np.arange(n_cohorts), n_groups)
+    frame = frame.mask(cohort_numbers[:, None] + np.arange(n_ages)[None, :] >= n_cohorts)
+    return frame[frame[0] > 0]
+
+@requires("sales")
+def aggregate_cohort_retention(sales_df):
+    """
+    Computes the acquisition-month x months-since-first-purchase matrix of active customers
+    per location (and over all locations) with NumPy.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'CID', 'Date', and 'Location' (anonymous sales are ignored).
+
+    Returns:
+    - pd.DataFrame: Customer counts (see cohort_frame), ALL_LOCATIONS first.
+    """
+    dates = parse_datetimes(sales_df["Date"])
+    customer_codes, customer_ids = pd.factorize(sales_df["CID"])
+    location_codes, locations = pd.factorize(sales_df["Location"], sort=True)
+
+    # Anonymous sales are not one customer; rows without a date, customer or location are skipped
+    anonymous = np.flatnonzero(pd.Index(customer_ids).astype(str) == ANONYMOUS_CID)
+    valid = dates.notna().to_numpy() & (customer_codes >= 0) & (location_codes >= 0) & ~np.isin(customer_codes, anonymous)
+    dates, customer_codes, location_codes = dates[valid], customer_codes[valid], location_codes[valid]
+    months = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+
+    # Cohorts by first purchase anywhere, then by first purchase in each location
+    overall, first_month = count_cohorts(customer_codes, np.zeros_like(customer_codes), months, 1)
+    per_location, _ = count_cohorts(customer_codes, location_codes, months, len(locations))
+    counts = np.concatenate([overall, per_location]) if len(months) else np.zeros((1 + len(locations), 0, 0), dtype=np.int64)
+    return cohort_frame(counts, [ALL_LOCATIONS, *locations], first_month)
+
+@requires("sales")
+def query_cohort_retention(store):
+    """
+    Same matrix as aggregate_cohort_retention, pushed down to the SQL store.
+
+    Parameters:
+    - store (data_storage.sql_store.SalesStore): Store holding the 'sales' table.
+
+    Returns:
+    - pd.DataFrame: Customer counts (see cohort_frame), ALL_LOCATIONS first.
+    """
+    cells = store.query(COHORT_RETENTION_SQL, (ANONYMOUS_CID,))
+    cells["Location"] = cells["Location"].fillna(ALL_LOCATIONS)
+    locations = [ALL_LOCATIONS, *sorted(set(cells["Location"]) - {ALL_LOCATIONS})]
+    if cells.empty:
+        return cohort_frame(np.zeros((1, 0, 0), dtype=np.int64), locations, 0)
+
+    first_month = int(cells["Cohort"].min())
+    n_cohorts = int((cells["Cohort"] + cells["Age"]).max()) - first_month + 1  # Up to the latest active month
+    counts = np.zeros((len(locations), n_cohorts, n_cohorts), dtype=np.int64)
+    location_codes = cells["Location"].map({location: code for code, location in enumerate(locations)}).to_numpy()
+    counts[location_codes, cells["Cohort"].to_numpy() - first_month, cells["Age"].to_numpy()] = cells["Customers"].to_numpy()
+    return cohort_frame(counts, locations, first_month)
+
+def plot_cohort_retention(cohort_counts, location=ALL_LOCATIONS):
+    """
+    Draws one location's retention matrix as a heatmap.
+
+    Parameters:
+    - cohort_counts (pd.DataFrame): From aggregate_cohort_retention or query_cohort_retention.
+    - location (str): Location to draw (ALL_LOCATIONS for the overall matrix).
+
+    Returns:
+    - fig (matplotlib.figure.Figure): Share of each cohort active N months after its first purchase.
+    """
+    counts = cohort_counts.loc[location].dropna(axis=1, how="all")
+    retention = counts.div(counts[0], axis=0)
+    n_cohorts, n_ages = retention.shape
+
+    fig, ax = plt.subplots(figsize=(max(6, 0.6 * n_ages + 3), max(4, 0.4 * n_cohorts + 2)))
+    image = ax.imshow(retention.to_numpy(), cmap="Blues", vmin=0, vmax=1, aspect="auto")
+    fig.colorbar(image, ax=ax, label="Retention")
+
+    if n_cohorts <= ANNOTATE_MAX_CELLS and n_ages <= ANNOTATE_MAX_CELLS:
+        for row in range(n_cohorts):
+            for col in range(n_ages):
+                rate = retention.iat[row, col]
+                if not np.isnan(rate):
+                    ax.text(col, row, f"{rate:.0%}", ha="center", va="center", fontsize=8,
+                            color="white" if rate > 0.6 else "black")
+
+    ax.set_xticks(range(n_ages))
+    ax.set_yticks(range(n_cohorts))
+    ax.set_yticklabels([f"{cohort} ({int(size):,})" for cohort, size in counts[0].items()])
+    ax.set_xlabel("Months Since First Purchase")
+    ax.set_ylabel("Acquisition Month (Customers)")
+    ax.set_title(f"Customer Retention by Cohort - {location}")
+
+    return fig
+
+def analyze_cohort_retention(sales_df, location=ALL_LOCATIONS, store=None):
+    """
+    Analyzes how many customers acquired each month keep buying in the following months.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'CID', 'Date', and 'Location'.
+    - location (str): Location whose matrix is drawn.
+    - store (SalesStore, optional): Aggregate in the SQL store instead of in pandas.
+
+    Returns:
+    - cohort_counts (pd.DataFrame): Active customers per location, cohort and month since acquisition.
+    - fig (matplotlib.figure.Figure): Retention heatmap of the location.
+    """
+    if store is not None:
+        cohort_counts = query_cohort_retention(store)
+    else:
+        cohort_counts = aggregate_cohort_retention(sales_df)
+    return cohort_counts, plot_cohort_retention(cohort_counts, location)
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    # Load test data
+    sales_df = pd.read_csv("tests/s3.csv")
+
+    # Run analysis
+    cohort_counts, fig = analyze_cohort_retention(sales_df)
+
+    # Display results
+    print(cohort_counts.loc[ALL_LOCATIONS])
+    plt.show()
@@ -1,31 +1,73 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-
-def analyze_category_and_profit(sales_df, products_df):
+from pipeline.analysis_graph import requires
+
+# Sales per (Location, Category) and profit per Location, computed inside the SQL store
+CATEGORY_COUNTS_SQL = """
+SELECT s.Location, p.Category, COUNT(s.PID) AS Sales
+FROM sales AS s JOIN products AS p ON p.PID = s.PID
+WHERE s.Location IS NOT NULL AND p.Category IS NOT NULL
+GROUP BY s.Location, p.Category
+"""
+
+LOCATION_PROFIT_SQL = """
+SELECT s.Location, TOTAL(s.Sales_Price - p."Manufacturing Cost") AS Profit
+FROM sales AS s LEFT JOIN products AS p ON p.PID = s.PID
+WHERE s.Location IS NOT NULL
+GROUP BY s.Location
+ORDER BY s.Location
+"""
+
+@requires("sales", "products")
+def aggregate_category_and_profit(sales_df, products_df):
     """
-    Analyzes sales data to:
-    1. Display the most popular product categories by location.
-    2. Show profit per location using a Matplotlib heatmap.
+    Computes sales counts per location and category, and profit per location, in pandas.
 
     Parameters:
     - sales_df (pd.DataFrame): Contains 'Location', 'PID', 'Sales_Price'.
-    - products_df (pd.DataFrame): Contains 'PID', 'Product_Name', 'P_Description', 'Manufacturing Cost', 'Category'.
+    - products_df (pd.DataFrame): Contains 'PID', 'Manufacturing Cost', 'Category'.
 
     Returns:
-    - matplotlib.figure.Figure: A figure containing two subplots.
+    - category_counts (pd.DataFrame): Number of sales per location (rows) and category (columns).
+    - location_profit (pd.DataFrame): 'Location' and total 'Profit'.
     """
 
     # === Step 1: Merge Sales Data with Product Data ===
     sales_with_products = sales_df.merge(products_df, on="PID", how="left")
 
     # === Step 2: Most Popular Categories by Location ===
-    category_counts = sales_with_products.groupby(["Location", "Category"])["PID"].count().unstack().fillna(0)
+    category_counts = sales_with_products.groupby(["Location", "Category"], observed=True)["PID"].count().unstack().fillna(0)
 
     # === Step 3: Profit Calculation ===
     sales_with_products["Profit"] = sales_with_products["Sales_Price"] - sales_with_products["Manufacturing Cost"]
-    location_profit = sales_with_products.groupby("Location")["Profit"].sum().reset_index()
+    location_profit = sales_with_products.groupby("Location", observed=True)["Profit"].sum().reset_index()
+
+    return category_counts, location_profit
+
+@requires("sales", "products")
+def query_category_and_profit(store):
+    """
+    Same aggregates as aggregate_category_and_profit, pushed down to the SQL store.
+
+    Parameters:
+    - store (data_storage.sql_store.SalesStore): Store holding the 'sales' and 'products' tables.
+
+    Returns:
+    - category_counts (pd.DataFrame), location_profit (pd.DataFrame)
+    """
+    counts = store.query(CATEGORY_COUNTS_SQL)
+    category_counts = counts.pivot(index="Location", columns="Category", values="Sales").fillna(0).sort_index()
+    location_profit = store.query(LOCATION_PROFIT_SQL)
+    return category_counts, location_profit
+
+def plot_category_and_profit(category_counts, location_profit):
+    """
+    Draws the category counts per location and the profit heatmap.
+
+    Returns:
+    - matplotlib.figure.Figure: A figure containing two subplots.
+    """
 
-    # === Step 4: Plotting ===
     fig, axes = plt.subplots(1, 2, figsize=(16, 6))
     plt.subplots_adjust(wspace=0.5)  # Increase spacing between subplots
 
@@ -63,6 +105,27 @@ def analyze_category_and_profit(sales_df, products_df):
     plt.tight_layout()
     return fig
 
+def analyze_category_and_profit(sales_df, products_df, store=None):
+    """
+    Analyzes sales data to:
+    1. Display the most popular product categories by location.
+    2. Show profit per location using a Matplotlib heatmap.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'Location', 'PID', 'Sales_Price'.
+    - products_df (pd.DataFrame): Contains 'PID', 'Product_Name', 'P_Description', 'Manufacturing Cost', 'Category'.
+    - store (SalesStore, optional): Aggregate in the SQL store instead of in pandas.
+
+    Returns:
+    - matplotlib.figure.Figure: A figure containing two subplots.
+    """
+    if store is not None:
+        category_counts, location_profit = query_category_and_profit(store)
+    else:
+        category_counts, location_profit = aggregate_category_and_profit(sales_df, products_df)
+    return plot_category_and_profit(category_counts, location_profit)
+
+
 # === Example Usage ===
 if __name__ == "__main__":
     # Load Test Data from 'tests' Folder
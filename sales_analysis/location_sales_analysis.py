@@ -1,36 +1,100 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-
-def analyze_sales_by_location(sales_df, customers_df):
+from pipeline.analysis_graph import requires
+
+# Per-location aggregates computed inside the SQL store
+LOCATION_SALES_SQL = """
+SELECT Location, TOTAL(Sales_Price) AS Sales_Price, COUNT(DISTINCT CID) AS Unique_Customers
+FROM sales
+WHERE Location IS NOT NULL
+GROUP BY Location
+"""
+
+GENDER_COUNTS_SQL = """
+SELECT s.Location, c.Gender, COUNT(s.CID) AS Customers
+FROM sales AS s JOIN customers AS c ON c.CID = s.CID
+WHERE s.Location IS NOT NULL AND c.Gender IS NOT NULL
+GROUP BY s.Location, c.Gender
+"""
+
+# Median over the sales rows of each location (SQLite has no MEDIAN aggregate):
+# the one or two middle rows of each location's ages are averaged
+MEDIAN_AGE_SQL = """
+WITH ranked AS (
+    SELECT s.Location, c.Age,
+           ROW_NUMBER() OVER (PARTITION BY s.Location ORDER BY c.Age) AS position,
+           COUNT(*) OVER (PARTITION BY s.Location) AS n
+    FROM sales AS s JOIN customers AS c ON c.CID = s.CID
+    WHERE s.Location IS NOT NULL AND c.Age IS NOT NULL
+)
+SELECT Location, AVG(Age) AS Age
+FROM ranked
+WHERE position IN ((n + 1) / 2, (n + 2) / 2)
+GROUP BY Location
+ORDER BY Location
+"""
+
+@requires("sales", "customers")
+def aggregate_sales_by_location(sales_df, customers_df):
     """
-    Analyzes sales performance across locations by considering:
-    1. Total Sales per Location
-    2. Total Unique Customers per Location
-    3. Gender Distribution & Median Age per Location
+    Computes the per-location aggregates in pandas.
 
     Parameters:
     - sales_df (pd.DataFrame): DataFrame containing 'Location', 'CID', and 'Sales_Price' columns.
     - customers_df (pd.DataFrame): DataFrame containing 'CID', 'Age', and 'Gender' columns.
 
     Returns:
-    - matplotlib.figure.Figure: A figure containing three analysis plots.
+    - location_sales (pd.Series): Total sales per location, largest first.
+    - unique_customers_per_location (pd.Series): Distinct customers per location.
+    - gender_counts (pd.DataFrame): Sales per location (rows) and customer gender (columns).
+    - median_age (pd.Series): Median customer age over each location's sales.
     """
 
     # === Step 1: Merge Sales Data with Customer Data ===
     sales_with_customers = sales_df.merge(customers_df, on="CID", how="left")
 
     # === Step 2: Aggregate Sales by Location ===
-    location_sales = sales_with_customers.groupby("Location")["Sales_Price"].sum().sort_values(ascending=False)
+    location_sales = sales_with_customers.groupby("Location", observed=True)["Sales_Price"].sum().sort_values(ascending=False)
 
     # === Step 3: Count Unique Customers Per Location ===
-    unique_customers_per_location = sales_with_customers.groupby("Location")["CID"].nunique()
+    unique_customers_per_location = sales_with_customers.groupby("Location", observed=True)["CID"].nunique()
 
     # === Step 4: Gender & Age Analysis Per Location ===
-    gender_counts = sales_with_customers.pivot_table(index="Location", columns="Gender", values="CID", aggfunc="count", fill_value=0)
-    median_age = sales_with_customers.groupby("Location")["Age"].median()
+    gender_counts = sales_with_customers.pivot_table(index="Location", columns="Gender", values="CID", aggfunc="count", fill_value=0, observed=True)
+    median_age = sales_with_customers.groupby("Location", observed=True)["Age"].median()
+
+    return location_sales, unique_customers_per_location, gender_counts, median_age
+
+@requires("sales", "customers")
+def query_sales_by_location(store):
+    """
+    Same aggregates as aggregate_sales_by_location, pushed down to the SQL store.
+
+    Parameters:
+    - store (data_storage.sql_store.SalesStore): Store holding the 'sales' and 'customers' tables.
+
+    Returns:
+    - location_sales, unique_customers_per_location, gender_counts, median_age
+    """
+    totals = store.query(LOCATION_SALES_SQL, index_col="Location").sort_index()
+    location_sales = totals["Sales_Price"].sort_values(ascending=False)
+    unique_customers_per_location = totals["Unique_Customers"].rename("CID")
+
+    genders = store.query(GENDER_COUNTS_SQL)
+    gender_counts = genders.pivot(index="Location", columns="Gender", values="Customers").fillna(0).astype(int).sort_index()
+    median_age = store.query(MEDIAN_AGE_SQL, index_col="Location")["Age"]
+
+    return location_sales, unique_customers_per_location, gender_counts, median_age
+
+def plot_sales_by_location(location_sales, unique_customers_per_location, gender_counts, median_age):
+    """
+    Draws total sales, unique customers, and gender split with median age per location.
+
+    Returns:
+    - matplotlib.figure.Figure: A figure containing three analysis plots.
+    """
 
-    # === Step 5: Plotting ===
     fig, axes = plt.subplots(3, 1, figsize=(48, 72))
     plt.subplots_adjust(hspace=0.5)  # Better spacing between subplots
 
@@ -86,6 +150,28 @@ def analyze_sales_by_location(sales_df, customers_df):
     plt.tight_layout()
     return fig
 
+def analyze_sales_by_location(sales_df, customers_df, store=None):
+    """
+    Analyzes sales performance across locations by considering:
+    1. Total Sales per Location
+    2. Total Unique Customers per Location
+    3. Gender Distribution & Median Age per Location
+
+    Parameters:
+    - sales_df (pd.DataFrame): DataFrame containing 'Location', 'CID', and 'Sales_Price' columns.
+    - customers_df (pd.DataFrame): DataFrame containing 'CID', 'Age', and 'Gender' columns.
+    - store (SalesStore, optional): Aggregate in the SQL store instead of in pandas.
+
+    Returns:
+    - matplotlib.figure.Figure: A figure containing three analysis plots.
+    """
+    if store is not None:
+        aggregates = query_sales_by_location(store)
+    else:
+        aggregates = aggregate_sales_by_location(sales_df, customers_df)
+    return plot_sales_by_location(*aggregates)
+
+
 # === Example Usage ===
 if __name__ == "__main__":
     # Sample Data (Replace this with actual DataFrames)
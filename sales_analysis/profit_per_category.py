@@ -1,28 +1,62 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-
-def analyze_profit_per_category(sales_df, products_df):
+from pipeline.analysis_graph import requires
+
+# Average manufacturing cost and sales price per category, computed inside the SQL store
+CATEGORY_STATS_SQL = """
+SELECT p.Category,
+       AVG(p."Manufacturing Cost") AS Avg_Manufacturing_Cost,
+       AVG(s.Sales_Price) AS Avg_Sales_Price
+FROM sales AS s JOIN products AS p ON p.PID = s.PID
+WHERE p.Category IS NOT NULL
+GROUP BY p.Category
+ORDER BY p.Category
+"""
+
+@requires("sales", "products")
+def aggregate_profit_per_category(sales_df, products_df):
     """
-    Analyzes average manufacturing cost and sales price per product category.
+    Computes average manufacturing cost and sales price per product category in pandas.
 
     Parameters:
     - sales_df (pd.DataFrame): Contains 'PID', 'Sales_Price'.
     - products_df (pd.DataFrame): Contains 'PID', 'Manufacturing Cost', 'Category'.
 
     Returns:
-    - fig (matplotlib.figure.Figure): A bar chart comparing average manufacturing cost and sales price per category.
+    - pd.DataFrame: 'Avg_Manufacturing_Cost' and 'Avg_Sales_Price' indexed by 'Category'.
     """
 
     # Merge sales data with product details
     merged_df = sales_df.merge(products_df, on="PID", how="left")
 
     # Calculate average values per category
-    category_stats = merged_df.groupby("Category").agg(
+    return merged_df.groupby("Category", observed=True).agg(
         Avg_Manufacturing_Cost=("Manufacturing Cost", "mean"),
         Avg_Sales_Price=("Sales_Price", "mean")
     )
 
+@requires("sales", "products")
+def query_profit_per_category(store):
+    """
+    Same aggregates as aggregate_profit_per_category, pushed down to the SQL store.
+
+    Parameters:
+    - store (data_storage.sql_store.SalesStore): Store holding the 'sales' and 'products' tables.
+
+    Returns:
+    - pd.DataFrame: 'Avg_Manufacturing_Cost' and 'Avg_Sales_Price' indexed by 'Category'.
+    """
+    return store.query(CATEGORY_STATS_SQL, index_col="Category")
+
+def plot_profit_per_category(category_stats):
+    """
+    Draws average manufacturing cost next to average sales price for each category.
+
+    Returns:
+    - fig (matplotlib.figure.Figure): The bar chart.
+    """
+
     # Define bar positions with spacing between categories
     categories = category_stats.index
     num_categories = len(categories)
@@ -64,6 +98,25 @@ def analyze_profit_per_category(sales_df, products_df):
     return fig
 
 
+def analyze_profit_per_category(sales_df, products_df, store=None):
+    """
+    Analyzes average manufacturing cost and sales price per product category.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'PID', 'Sales_Price'.
+    - products_df (pd.DataFrame): Contains 'PID', 'Manufacturing Cost', 'Category'.
+    - store (SalesStore, optional): Aggregate in the SQL store instead of in pandas.
+
+    Returns:
+    - fig (matplotlib.figure.Figure): A bar chart comparing average manufacturing cost and sales price per category.
+    """
+    if store is not None:
+        category_stats = query_profit_per_category(store)
+    else:
+        category_stats = aggregate_profit_per_category(sales_df, products_df)
+    return plot_profit_per_category(category_stats)
+
+
 # === Example Usage ===
 if __name__ == "__main__":
     # Load test data
@@ -1,30 +1,57 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+from data_preproccesing.data_preprocessor import parse_datetimes
+from pipeline.analysis_graph import requires
 
-def analyze_repeat_customers(sales_df):
+# Look-back windows (in days before the latest sale) for counting repeat customers
+TIME_WINDOWS_DAYS = {
+    "Last 7 Days": 7,
+    "Last 4 Weeks": 28,
+    "Last 3 Months": 90,
+}
+
+# Customers with more than one purchase since a start date, relative to the latest sale
+REPEAT_CUSTOMERS_SQL = """
+SELECT COUNT(*) AS Repeat_Customers FROM (
+    SELECT CID
+    FROM sales
+    WHERE CID IS NOT NULL AND Date >= (SELECT date(MAX(Date), ?) FROM sales)
+    GROUP BY CID
+    HAVING COUNT(*) > 1
+)
+"""
+
+# Average gap between a customer's consecutive purchases (in upload order) per location
+AVG_REPEAT_DAYS_SQL = """
+WITH gaps AS (
+    SELECT Location,
+           CAST(julianday(Date) - julianday(LAG(Date) OVER (PARTITION BY CID ORDER BY rowid)) AS INTEGER) AS Days
+    FROM sales
+    WHERE CID IS NOT NULL
+)
+SELECT Location, AVG(Days) AS Days_Since_Last_Purchase
+FROM gaps
+WHERE Days IS NOT NULL
+GROUP BY Location
+ORDER BY Location
+"""
+
+def count_repeat_customers(sales_df, end_date):
     """
-    Analyzes repeat customers within different time windows.
+    Counts customers with more than one purchase in each look-back window.
 
     Parameters:
-    - sales_df (pd.DataFrame): Contains 'CID', 'Date', and 'Location'.
+    - sales_df (pd.DataFrame): Contains 'CID' and a datetime 'Date' (rows older than the
+      longest window are ignored, so a pre-filtered window is enough).
+    - end_date (pd.Timestamp): Date the windows end at (the latest sale).
 
     Returns:
-    - repeat_customer_df (pd.DataFrame): Number of repeat customers in 7 days, 4 weeks, and 3 months.
-    - fig (matplotlib.figure.Figure): Bar chart of average repeat duration per location.
+    - pd.DataFrame: 'Time Period' and 'Repeat Customers'.
     """
 
-    # Ensure 'Date' is in datetime format
-    sales_df["Date"] = pd.to_datetime(sales_df["Date"], errors="coerce")
-
     # Define time windows
-    end_date = sales_df["Date"].max()
-    time_windows = {
-        "Last 7 Days": end_date - pd.Timedelta(days=7),
-        "Last 4 Weeks": end_date - pd.Timedelta(weeks=4),
-        "Last 3 Months": end_date - pd.Timedelta(days=90),
-    }
+    time_windows = {period: end_date - pd.Timedelta(days=days) for period, days in TIME_WINDOWS_DAYS.items()}
 
-    # Count repeat customers in each window
     repeat_counts = {}
     for period, start_date in time_windows.items():
         recent_sales = sales_df[sales_df["Date"] >= start_date]
@@ -32,13 +59,127 @@ def analyze_repeat_customers(sales_df):
         repeat_counts[period] = repeat_customers
 
     # Create a DataFrame for repeat customer counts
-    repeat_customer_df = pd.DataFrame(
+    return pd.DataFrame(
         list(repeat_counts.items()), columns=["Time Period", "Repeat Customers"]
     )
 
+@requires("sales")
+def load_repeat_customer_counts(warehouse):
+    """
+    Counts repeat customers reading only the partitions and columns of the longest window.
+
+    Parameters:
+    - warehouse (data_storage.sales_warehouse.SalesWarehouse): Partitioned sales history.
+
+    Returns:
+    - pd.DataFrame: 'Time Period' and 'Repeat Customers'.
+    """
+    end_date, window = warehouse.read_last_days(max(TIME_WINDOWS_DAYS.values()), columns=["CID", "Date"])
+    if end_date is None:
+        return pd.DataFrame({"Time Period": list(TIME_WINDOWS_DAYS), "Repeat Customers": 0})
+    return count_repeat_customers(window, end_date)
+
+@requires("sales")
+def aggregate_repeat_customer_counts(sales_df):
+    """
+    Counts repeat customers in each look-back window in pandas.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'CID' and 'Date'.
+
+    Returns:
+    - pd.DataFrame: 'Time Period' and 'Repeat Customers'.
+    """
+    sales = pd.DataFrame({"CID": sales_df["CID"], "Date": parse_datetimes(sales_df["Date"])})
+    return count_repeat_customers(sales, sales["Date"].max())
+
+@requires("sales")
+def aggregate_repeat_purchase_days(sales_df):
+    """
+    Computes the average days between a customer's consecutive purchases per location in pandas.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'CID', 'Date', and 'Location'.
+
+    Returns:
+    - pd.Series: Average days between repeat purchases per location.
+    """
+
+    # Work on the needed columns only, so the caller's frame is left untouched
+    # (typed dates from process_sales_file are reused as they are)
+    sales = pd.DataFrame({
+        "CID": sales_df["CID"],
+        "Date": parse_datetimes(sales_df["Date"]),
+        "Location": sales_df["Location"],
+    })
+
     # Calculate average repeat duration per location
-    sales_df["Days_Since_Last_Purchase"] = sales_df.groupby("CID")["Date"].diff().dt.days
-    avg_repeat_per_location = sales_df.groupby("Location")["Days_Since_Last_Purchase"].mean().dropna()
+    sales["Days_Since_Last_Purchase"] = sales.groupby("CID")["Date"].diff().dt.days
+    return sales.groupby("Location", observed=True)["Days_Since_Last_Purchase"].mean().dropna()
+
+@requires("sales")
+def aggregate_repeat_customers(sales_df):
+    """
+    Computes repeat-customer counts and average repeat duration per location in pandas.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'CID', 'Date', and 'Location'.
+
+    Returns:
+    - repeat_customer_df (pd.DataFrame): Number of repeat customers in 7 days, 4 weeks, and 3 months.
+    - avg_repeat_per_location (pd.Series): Average days between repeat purchases per location.
+    """
+    return aggregate_repeat_customer_counts(sales_df), aggregate_repeat_purchase_days(sales_df)
+
+@requires("sales")
+def query_repeat_customer_counts(store):
+    """
+    Same counts as aggregate_repeat_customer_counts, pushed down to the SQL store.
+
+    Parameters:
+    - store (data_storage.sql_store.SalesStore): Store holding the 'sales' table.
+
+    Returns:
+    - pd.DataFrame: 'Time Period' and 'Repeat Customers'.
+    """
+    repeat_counts = {
+        period: int(store.query(REPEAT_CUSTOMERS_SQL, (f"-{days} days",))["Repeat_Customers"].iloc[0])
+        for period, days in TIME_WINDOWS_DAYS.items()
+    }
+    return pd.DataFrame(
+        list(repeat_counts.items()), columns=["Time Period", "Repeat Customers"]
+    )
+
+@requires("sales")
+def query_repeat_purchase_days(store):
+    """
+    Same averages as aggregate_repeat_purchase_days, pushed down to the SQL store.
+
+    Returns:
+    - pd.Series: Average days between repeat purchases per location.
+    """
+    return store.query(AVG_REPEAT_DAYS_SQL, index_col="Location")["Days_Since_Last_Purchase"]
+
+@requires("sales")
+def query_repeat_customers(store):
+    """
+    Same aggregates as aggregate_repeat_customers, pushed down to the SQL store.
+
+    Parameters:
+    - store (data_storage.sql_store.SalesStore): Store holding the 'sales' table.
+
+    Returns:
+    - repeat_customer_df (pd.DataFrame), avg_repeat_per_location (pd.Series)
+    """
+    return query_repeat_customer_counts(store), query_repeat_purchase_days(store)
+
+def plot_repeat_customers(avg_repeat_per_location):
+    """
+    Draws the average repeat purchase duration per location.
+
+    Returns:
+    - fig (matplotlib.figure.Figure): Bar chart of average repeat duration per location.
+    """
 
     # Plot bar chart of average repeat duration per location
     fig, ax = plt.subplots(figsize=(8, 5))
@@ -49,7 +190,34 @@ def analyze_repeat_customers(sales_df):
     ax.set_title("Average Repeat Purchase Duration per Location")
     ax.grid(axis="y", linestyle="--", alpha=0.7)
 
-    return repeat_customer_df, fig
+    return fig
+
+def analyze_repeat_customers(sales_df, store=None, warehouse=None):
+    """
+    Analyzes repeat customers within different time windows.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'CID', 'Date', and 'Location'.
+    - store (SalesStore, optional): Aggregate in the SQL store instead of in pandas.
+    - warehouse (SalesWarehouse, optional): Count the windowed repeat customers from the
+      date-partitioned history, reading only the last months.
+
+    Returns:
+    - repeat_customer_df (pd.DataFrame): Number of repeat customers in 7 days, 4 weeks, and 3 months.
+    - fig (matplotlib.figure.Figure): Bar chart of average repeat duration per location.
+    """
+    # The windowed counts are computed once: from the warehouse's last partitions when there is one
+    if warehouse is not None:
+        repeat_customer_df = load_repeat_customer_counts(warehouse)
+    elif store is not None:
+        repeat_customer_df = query_repeat_customer_counts(store)
+    else:
+        repeat_customer_df = aggregate_repeat_customer_counts(sales_df)
+    if store is not None:
+        avg_repeat_per_location = query_repeat_purchase_days(store)
+    else:
+        avg_repeat_per_location = aggregate_repeat_purchase_days(sales_df)
+    return repeat_customer_df, plot_repeat_customers(avg_repeat_per_location)
 
 
 # === Example Usage ===
@@ -0,0 +1,363 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from data_preproccesing.data_preprocessor import parse_datetimes
+from pipeline.analysis_graph import requires
+
+# Days for the rolling statistics to halve the weight of a past day
+ANOMALY_HALF_LIFE_DAYS = 14
+
+# Weeks for the weekday factors to halve the weight of a past week
+WEEKDAY_HALF_LIFE_WEEKS = 8
+
+# Days a location must have been selling before its days are scored (a few of each weekday)
+ANOMALY_WARMUP_DAYS = 28
+
+# Robust z-score (deviation from the expected sales in units of the rolling absolute
+# deviation) beyond which a day is flagged
+ANOMALY_THRESHOLD = 4.0
+
+# Deviations are clipped to this many rolling absolute deviations before updating the
+# statistics, so a single anomalous day barely moves them (Huber-style robust updates)
+HUBER_CLIP = 2.0
+
+# Only locations with sales on at least this share of recent days are scored (a store
+# selling now and then has no "normal" day to deviate from)
+MIN_ACTIVE_SHARE = 0.5
+
+# Weekdays selling less than this fraction of an average day are treated as closing days
+# (not scored); one weekday's factor never exceeds the cap
+MIN_WEEKDAY_FACTOR = 0.2
+MAX_WEEKDAY_FACTOR = 3.0
+
+# The rolling deviation is never taken below this fraction of the expected sales
+# (a perfectly regular store would otherwise flag any change)
+SCALE_FLOOR = 0.05
+
+# Locations drawn by plot_location_anomalies (those with the most recent anomalies)
+ANOMALY_PANELS = 6
+
+# Daily totals per location computed inside the SQL store
+DAILY_LOCATION_SALES_SQL = """
+SELECT Date, Location, TOTAL(Sales_Price) AS Sales_Price
+FROM sales
+WHERE Date IS NOT NULL AND Location IS NOT NULL
+GROUP BY Date, Location
+ORDER BY Date
+"""
+
+def daily_matrix(daily):
+    """
+    Reindexes a Date x Location table of daily sales to every day of its range
+    (days without sales at a location count as zero sales).
+    """
+    if daily.empty:
+        return daily.astype(float)
+    days = pd.date_range(daily.index.min(), daily.index.max(), freq="D", name="Date")
+    return daily.reindex(days, fill_value=0.0).astype(float)
+
+@requires("sales")
+def aggregate_daily_location_sales(sales_df):
+    """
+    Sums sales per date and location in pandas.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'Date', 'Location' and 'Sales_Price'.
+
+    Returns:
+    - pd.DataFrame: Daily totals, one row per day and one column per location.
+    """
+    dates = parse_datetimes(sales_df["Date"]).rename("Date")
+    daily = sales_df["Sales_Price"].groupby([dates, sales_df["Location"]], sort=True, observed=True).sum()
+    return daily_matrix(daily.unstack("Location", fill_value=0.0))
+
+@requires("sales")
+def query_daily_location_sales(store):
+    """
+    Same totals as aggregate_daily_location_sales, pushed down to the SQL store.
+
+    Parameters:
+    - store (data_storage.sql_store.SalesStore): Store holding the 'sales' table.
+
+    Returns:
+    - pd.DataFrame: Daily totals, one row per day and one column per location.
+    """
+    daily = store.query(DAILY_LOCATION_SALES_SQL)
+    daily["Date"] = pd.to_datetime(daily["Date"])
+    return daily_matrix(daily.pivot(index="Date", columns="Location", values="Sales_Price").fillna(0.0))
+
+class SalesAnomalyDetector:
+    """
+    Flags days whose sales at a location deviate sharply from that location's recent days.
+
+    Each location keeps O(1) state: an exponentially weighted level (expected sales of an
+    average weekday), an exponentially weighted absolute deviation around it, one factor
+    per weekday (weekends usually sell more), the share of days with sales, and the number
+    of days seen. Deviations are clipped before updating the state, so one outlier day
+    cannot drag the expectation along with it. A day is scored against the state of the
+    days before it, and all locations are updated at once, one vectorized step per day.
+
+    The latest day stays open: sales arriving later for it are added before it is
+    committed, so update() can be fed delta sales without rescanning the history.
+    """
+
+    def __init__(self, half_life=ANOMALY_HALF_LIFE_DAYS, warmup=ANOMALY_WARMUP_DAYS, threshold=ANOMALY_THRESHOLD):
+        self.alpha = 1 - 0.5 ** (1 / half_life)
+        self.season_alpha = 1 - 0.5 ** (1 / WEEKDAY_HALF_LIFE_WEEKS)
+        self.warmup = warmup
+        self.threshold = threshold
+        self.locations = []
+        self.level = np.zeros(0)
+        self.scale = np.zeros(0)
+        self.weekday = np.ones((0, 7))
+        self.active = np.zeros(0)
+        self.seen = np.zeros(0, dtype=np.int64)
+        self.open_date = None  # Latest day, scored but not yet committed to the state
+        self.open_sales = np.zeros(0)
+
+    # === State ===
+
+    def to_dict(self):
+        """Returns the state as plain (JSON-serializable) values."""
+        return {
+            "alpha": self.alpha, "season_alpha": self.season_alpha, "warmup": self.warmup, "threshold": self.threshold,
+            "locations": list(self.locations), "level": self.level.tolist(), "scale": self.scale.tolist(),
+            "weekday": self.weekday.tolist(), "active": self.active.tolist(), "seen": self.seen.tolist(),
+            "open_date": self.open_date.strftime("%Y-%m-%d") if self.open_date is not None else None,
+            "open_sales": self.open_sales.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restores a detector saved with to_dict()."""
+        detector = cls(warmup=state["warmup"], threshold=state["threshold"])
+        detector.alpha, detector.season_alpha = state["alpha"], state["season_alpha"]
+        detector.locations = list(state["locations"])
+        detector.level = np.array(state["level"], dtype=float)
+        detector.scale = np.array(state["scale"], dtype=float)
+        detector.weekday = np.array(state["weekday"], dtype=float).reshape(-1, 7)
+        detector.active = np.array(state["active"], dtype=float)
+        detector.seen = np.array(state["seen"], dtype=np.int64)
+        detector.open_date = pd.Timestamp(state["open_date"]) if state["open_date"] else None
+        detector.open_sales = np.array(state["open_sales"], dtype=float)
+        return detector
+
+    def _add_locations(self, locations):
+        known = set(self.locations)
+        new = [location for location in locations if location not in known]
+        if new:
+            self.locations.extend(new)
+            self.level = np.concatenate([self.level, np.zeros(len(new))])
+            self.scale = np.concatenate([self.scale, np.zeros(len(new))])
+            self.weekday = np.concatenate([self.weekday, np.ones((len(new), 7))])
+            self.active = np.concatenate([self.active, np.zeros(len(new))])
+            self.seen = np.concatenate([self.seen, np.zeros(len(new), dtype=np.int64)])
+            self.open_sales = np.concatenate([self.open_sales, np.zeros(len(new))])
+
+    # === Scoring ===
+
+    def _expected(self, weekday):
+        """Expected sales and rolling absolute deviation of every location on a weekday."""
+        factor = self.weekday[:, weekday]
+        return self.level * factor, np.maximum(self.scale, SCALE_FLOOR * np.abs(self.level)) * factor
+
+    def _score(self, sales, weekday):
+        """Robust z-scores of one day's sales against the current state (NaN for unscored locations)."""
+        expected, deviation = self._expected(weekday)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = (sales - expected) / deviation
+        score[sales == expected] = 0.0  # Including a closed store that stays closed
+        unscored = (self.seen < self.warmup) | (self.active < MIN_ACTIVE_SHARE) | (self.weekday[:, weekday] < MIN_WEEKDAY_FACTOR)
+        score[unscored] = np.nan
+        return score, expected, deviation
+
+    def _commit(self, sales, weekday):
+        """Folds one day's sales into the state of every location."""
+        started = (self.seen > 0) | (sales != 0)  # Locations enter at their first sale
+        warming = self.seen < self.warmup
+        factor = self.weekday[:, weekday]
+        open_day = started & (factor >= MIN_WEEKDAY_FACTOR)  # Weekdays a store is usually closed only update their factor
+
+        # Plain running mean and mean absolute deviation while warming up, then clipped EW updates
+        # (of the sales divided by the weekday factor)
+        alpha = np.where(warming, 1 / (self.seen + 1), self.alpha)
+        alpha_scale = np.where(warming, np.where(self.seen > 0, 1 / np.maximum(self.seen, 1), 0.0), self.alpha)
+        deviation = sales / np.maximum(factor, MIN_WEEKDAY_FACTOR) - self.level
+        limit = HUBER_CLIP * np.maximum(self.scale, SCALE_FLOOR * np.abs(self.level))
+        deviation = np.where(warming, deviation, np.clip(deviation, -limit, limit))
+
+        # The weekday factor follows the day's sales relative to the level (capped, so a spike barely moves it)
+        ratio = np.minimum(np.divide(sales, self.level, out=factor.copy(), where=self.level > 0), MAX_WEEKDAY_FACTOR)
+        gamma = np.where(warming, 1 / (self.seen // 7 + 1), self.season_alpha)
+        self.weekday[:, weekday] = np.where(started & (self.seen > 0), factor + gamma * (ratio - factor), factor)
+        self.weekday /= np.maximum(self.weekday.mean(axis=1, keepdims=True), MIN_WEEKDAY_FACTOR)
+
+        self.level = np.where(open_day, self.level + alpha * deviation, self.level)
+        self.scale = np.where(open_day, self.scale + alpha_scale * (np.abs(deviation) - self.scale), self.scale)
+        self.active = np.where(started, self.active + alpha * ((sales != 0) - self.active), self.active)
+        self.seen = self.seen + started
+
+    def update(self, daily):
+        """
+        Scores new daily sales and folds them into the state.
+
+        Parameters:
+        - daily (pd.DataFrame): Daily totals per location (rows are dates, columns locations),
+          from the open day on (its sales are added to those already received for it).
+
+        Returns:
+        - pd.DataFrame: Indexed by ('Date', 'Location'), with 'Sales', 'Expected',
+          'Deviation' (rolling absolute deviation), 'Score' and 'Anomaly' ('drop', 'spike'
+          or ''), for the open day and the days after it, of the locations selling by then.
+
+        Raises:
+        - ValueError: If daily holds days before the open day (their state was committed).
+        """
+        columns = ["Sales", "Expected", "Deviation", "Score", "Anomaly"]
+        if daily.empty:
+            return pd.DataFrame(columns=columns, index=pd.MultiIndex.from_arrays([[], []], names=["Date", "Location"]))
+
+        daily = daily.sort_index()
+        if self.open_date is not None and daily.index[0] < self.open_date:
+            raise ValueError(f"Sales dated before {self.open_date:%Y-%m-%d} were already committed")
+
+        self._add_locations(daily.columns)
+        start = daily.index[0] if self.open_date is None else self.open_date
+        days = pd.date_range(start, daily.index[-1], freq="D", name="Date")
+        sales = daily.reindex(index=days, columns=self.locations, fill_value=0.0).to_numpy(dtype=float)
+        sales[0] += self.open_sales
+
+        expected = np.empty_like(sales)
+        deviation = np.empty_like(sales)
+        score = np.empty_like(sales)
+        started = np.empty(sales.shape, dtype=bool)
+        weekdays = days.dayofweek.to_numpy()
+        for day in range(len(days)):
+            if day > 0:  # The previous day is complete
+                self._commit(sales[day - 1], weekdays[day - 1])
+            started[day] = (self.seen > 0) | (sales[day] != 0)
+            score[day], expected[day], deviation[day] = self._score(sales[day], weekdays[day])
+
+        self.open_date, self.open_sales = days[-1], sales[-1]
+
+        flagged = np.abs(score) > self.threshold
+        anomaly = np.where(flagged & (score < 0), "drop", np.where(flagged, "spike", ""))
+        index = pd.MultiIndex.from_product([days, self.locations], names=["Date", "Location"])
+        scores = pd.DataFrame({
+            "Sales": sales.ravel(), "Expected": expected.ravel(), "Deviation": deviation.ravel(),
+            "Score": score.ravel(), "Anomaly": anomaly.ravel(),
+        }, index=index)
+        return scores[started.ravel()]
+
+    def update_sales(self, sales_df):
+        """
+        Scores a batch of new sales rows (e.g. today's), from the open day on.
+
+        Returns:
+        - pd.DataFrame: As update().
+        """
+        return self.update(aggregate_daily_location_sales(sales_df))
+
+def detect_sales_anomalies(daily_location_sales):
+    """
+    Scores every day of every location with a fresh SalesAnomalyDetector.
+
+    Parameters:
+    - daily_location_sales (pd.DataFrame): From aggregate_daily_location_sales or
+      query_daily_location_sales.
+
+    Returns:
+    - pd.DataFrame: Scores indexed by ('Date', 'Location') (see SalesAnomalyDetector.update).
+    """
+    return SalesAnomalyDetector().update(daily_location_sales)
+
+def flagged_anomalies(scores):
+    """
+    Returns:
+    - pd.DataFrame: The flagged days, latest first ('Date', 'Location', 'Anomaly', 'Sales', 'Expected', 'Score').
+    """
+    flagged = scores[scores["Anomaly"] != ""].reset_index()
+    flagged = flagged[["Date", "Location", "Anomaly", "Sales", "Expected", "Score"]]
+    return flagged.sort_values(["Date", "Score"], ascending=[False, True], ignore_index=True)
+
+def plot_location_anomalies(scores, max_locations=ANOMALY_PANELS):
+    """
+    Plots the daily sales of the locations with the most recent anomalies, with their
+    expected sales, the band outside which days are flagged, and the flagged days.
+
+    Parameters:
+    - scores (pd.DataFrame): From detect_sales_anomalies.
+    - max_locations (int): Number of locations to draw.
+
+    Returns:
+    - fig (matplotlib.figure.Figure): One panel per location.
+    """
+    flagged = flagged_anomalies(scores)
+    locations = list(flagged.drop_duplicates("Location")["Location"][:max_locations])
+
+    fig, axes = plt.subplots(max(len(locations), 1), 1, figsize=(14, 3.5 * max(len(locations), 1)), squeeze=False)
+    if not locations:
+        axes[0, 0].text(0.5, 0.5, "No anomalies detected", ha="center", va="center", fontsize=14)
+        axes[0, 0].set_axis_off()
+        return fig
+
+    threshold = ANOMALY_THRESHOLD
+    for ax, location in zip(axes[:, 0], locations):
+        series = scores.xs(location, level="Location")
+        ax.plot(series.index, series["Sales"], label="Daily Sales", color="#1f77b4", alpha=0.7)
+        ax.plot(series.index, series["Expected"], label="Expected", color="#d62728", linestyle="--")
+        ax.fill_between(series.index, (series["Expected"] - threshold * series["Deviation"]).clip(lower=0),
+                        series["Expected"] + threshold * series["Deviation"], color="#d62728", alpha=0.1, label="Normal Range")
+        for kind, marker, color in (("drop", "v", "#d62728"), ("spike", "^", "#ff7f0e")):
+            days = series[series["Anomaly"] == kind]
+            if len(days):
+                ax.scatter(days.index, days["Sales"], marker=marker, color=color, s=80, zorder=3, label=kind.capitalize())
+        ax.set_title(f"{location}", fontsize=14, fontweight="bold")
+        ax.set_ylabel("Total Sales")
+        ax.legend(loc="upper left", fontsize=9)
+        ax.grid(True, linestyle="--", alpha=0.6)
+
+    fig.tight_layout()
+    return fig
+
+def analyze_sales_anomalies(sales_df, store=None):
+    """
+    Detects sudden drops and spikes in the daily sales of each location.
+
+    Parameters:
+    - sales_df (pd.DataFrame): Contains 'Date', 'Location' and 'Sales_Price'.
+    - store (SalesStore, optional): Aggregate the daily totals in the SQL store instead of in pandas.
+
+    Returns:
+    - anomalies (pd.DataFrame): The flagged days, latest first.
+    - fig (matplotlib.figure.Figure): Daily sales of the locations with the most recent anomalies.
+    """
+    daily = query_daily_location_sales(store) if store is not None else aggregate_daily_location_sales(sales_df)
+    scores = detect_sales_anomalies(daily)
+    return flagged_anomalies(scores), plot_location_anomalies(scores)
+
+
+# === Example Usage ===
+if __name__ == "__main__":
+    # Two stores with a weekly pattern; the second one loses most of its sales for three days
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-01-01", periods=120, freq="D")
+    sales_df = pd.concat([
+        pd.DataFrame({"Date": dates, "Location": location,
+                      "Sales_Price": rng.normal(1000, 60, len(dates)) * (1 + 0.1 * (dates.dayofweek >= 5))})
+        for location in ("Surat", "Vadodara")
+    ], ignore_index=True)
+    sales_df.loc[(sales_df["Location"] == "Vadodara") & sales_df["Date"].between("2024-04-10", "2024-04-12"), "Sales_Price"] *= 0.2
+
+    anomalies, fig = analyze_sales_anomalies(sales_df)
+    print(anomalies)
+
+    # Feeding the sales in two batches gives the same scores, without rescanning the first batch
+    # (the second batch rescores the first batch's open day)
+    detector = SalesAnomalyDetector()
+    first = detector.update_sales(sales_df[sales_df["Date"] < "2024-04-01"])
+    second = SalesAnomalyDetector.from_dict(detector.to_dict()).update_sales(sales_df[sales_df["Date"] >= "2024-04-01"])
+    batched = pd.concat([first.drop(index=second.index, errors="ignore"), second])
+    full = detect_sales_anomalies(aggregate_daily_location_sales(sales_df))
+    print("Batched scores match:", batched.equals(full))
+    plt.show()
@@ -1,7 +1,62 @@
 import matplotlib.pyplot as plt
 import pandas as pd
+from data_preproccesing.data_preprocessor import parse_datetimes
+from pipeline.analysis_graph import requires
+from prediction.forecasting import forecast_sales_series
+from sales_analysis.sales_anomalies import (
+    aggregate_daily_location_sales, query_daily_location_sales, detect_sales_anomalies, flagged_anomalies
+)
+
+# Flagged location days labelled on the daily plot (the most recent ones)
+ANOMALY_LABELS = 10
+
+# Number of future periods forecast on the weekly and monthly plots
+WEEKLY_FORECAST_HORIZON = 8
+MONTHLY_FORECAST_HORIZON = 3
+
+# Daily totals computed inside the SQL store (weekly and monthly totals are resampled from them)
+DAILY_SALES_SQL = """
+SELECT Date, TOTAL(Sales_Price) AS Sales_Price
+FROM sales
+WHERE Date IS NOT NULL
+GROUP BY Date
+ORDER BY Date
+"""
+
+@requires("sales")
+def aggregate_daily_sales(sales_df):
+    """
+    Sums sales per date in pandas.
+
+    Parameters:
+        sales_df (pd.DataFrame): DataFrame containing 'Date' and 'Sales_Price' columns.
+
+    Returns:
+        pd.Series: Total sales indexed by date.
+    """
+
+    # Typed dates from process_sales_file are reused; raw strings are parsed without touching the caller's frame
+    dates = parse_datetimes(sales_df["Date"]).rename("Date")
+
+    # Group sales by **each day**, summing up the sales price (rows whose date failed to parse are dropped)
+    return sales_df["Sales_Price"].groupby(dates).sum()
+
+@requires("sales")
+def query_daily_sales(store):
+    """
+    Same totals as aggregate_daily_sales, pushed down to the SQL store.
+
+    Parameters:
+        store (data_storage.sql_store.SalesStore): Store holding the 'sales' table.
+
+    Returns:
+        pd.Series: Total sales indexed by date.
+    """
+    daily_sales = store.query(DAILY_SALES_SQL, index_col="Date")["Sales_Price"]
+    daily_sales.index = pd.to_datetime(daily_sales.index)
+    return daily_sales
 
-def plot_sales_trends(sales_df):    
+def plot_sales_trends(sales_df, forecast=True, store=None):
     """
     Analyzes and visualizes sales trends over time.
 
@@ -11,30 +66,46 @@ def plot_sales_trends(sales_df):
     2. Weekly Sales with a 4-week moving average
     3. Monthly Sales with a 3-month moving average
 
+    Weekly and monthly plots also show a Holt-Winters forecast of the next periods, and the
+    daily plot marks the days on which some location's sales dropped or spiked.
+
     Parameters:
         sales_df (pd.DataFrame): DataFrame containing 'Date' and 'Sales_Price' columns.
+        forecast (bool): Whether to overlay forecasts on the weekly and monthly plots.
+        store (SalesStore, optional): Aggregate the daily totals in the SQL store instead of in pandas.
 
     Returns:
         matplotlib.figure.Figure: A figure containing the three sales trend plots.
     """
 
-    # Ensure 'Date' column is in datetime format (to avoid incorrect sorting and calculations)
-    sales_df["Date"] = pd.to_datetime(sales_df["Date"], errors="coerce")
+    # Group sales by **each day**, summing up the sales price
+    daily_sales = query_daily_sales(store) if store is not None else aggregate_daily_sales(sales_df)
+    daily_location_sales = query_daily_location_sales(store) if store is not None else aggregate_daily_location_sales(sales_df)
+    plot_daily_sales_trends(daily_sales, forecast, flagged_anomalies(detect_sales_anomalies(daily_location_sales)))
+    return plt
+
+def plot_daily_sales_trends(daily_sales, forecast=True, anomalies=None):
+    """
+    Plots the daily, weekly and monthly trends from daily sales totals.
 
-    # Remove rows where 'Date' conversion failed (i.e., null values)
-    sales_df = sales_df.dropna(subset=["Date"])
+    Parameters:
+        daily_sales (pd.Series): Total sales indexed by date (see aggregate_daily_sales).
+        forecast (bool): Whether to overlay forecasts on the weekly and monthly plots.
+        anomalies (pd.DataFrame, optional): Flagged location days ('Date', 'Location' and
+            'Anomaly', see sales_anomalies.flagged_anomalies), marked on the daily plot.
+
+    Returns:
+        matplotlib.figure.Figure: A figure containing the three sales trend plots.
+    """
 
     # === Resampling and Grouping Data ===
     # Resampling means aggregating data at different time intervals.
 
-    # Group sales by **each day**, summing up the sales price
-    daily_sales = sales_df.groupby("Date")["Sales_Price"].sum()
-
-    # Group sales by **week**, summing sales for each week
-    weekly_sales = sales_df.resample("W", on="Date")["Sales_Price"].sum()
+    # Group sales by **week**, summing sales for each week (sums of daily totals equal sums of sales)
+    weekly_sales = daily_sales.resample("W").sum()
 
     # Group sales by **month**, summing sales for each month
-    monthly_sales = sales_df.resample("M", on="Date")["Sales_Price"].sum()
+    monthly_sales = daily_sales.resample("M").sum()
 
     # === Moving Averages (MA) ===
     # A moving average smooths out short-term fluctuations and highlights trends over time.
@@ -49,16 +120,34 @@ def plot_sales_trends(sales_df):
     # 3-month moving average for monthly sales
     monthly_sales_ma = monthly_sales.rolling(window=3).mean()
 
+    # === Forecasts ===
+    # Holt-Winters exponential smoothing extrapolates the weekly and monthly totals.
+    if forecast:
+        weekly_forecast = forecast_sales_series(weekly_sales, WEEKLY_FORECAST_HORIZON, freq="W")
+        monthly_forecast = forecast_sales_series(monthly_sales, MONTHLY_FORECAST_HORIZON, freq="M")
+
     # === Plotting ===
     # Create a figure with 3 vertically stacked subplots
     fig, axes = plt.subplots(3, 1, figsize=(30, 50))
 
     # Define a color scheme for better visualization
-    colors = {"sales": "#1f77b4", "ma": "#d62728"}  # Blue for sales, Red for moving avg
+    colors = {"sales": "#1f77b4", "ma": "#d62728", "forecast": "#2ca02c"}  # Blue for sales, Red for moving avg, Green for forecast
 
     # --- Daily Sales Plot ---
     axes[0].plot(daily_sales.index, daily_sales, label="Daily Sales", color=colors["sales"], alpha=0.7)
     axes[0].plot(daily_sales_ma.index, daily_sales_ma, label="7-Day Moving Avg", color=colors["ma"], linestyle="--", linewidth=2)
+    if anomalies is not None and len(anomalies):
+        # Days on which some location dropped or spiked, marked on the company total
+        for kind, marker, color in (("drop", "v", colors["ma"]), ("spike", "^", "#ff7f0e")):
+            days = anomalies[anomalies["Anomaly"] == kind]
+            if len(days):
+                totals = daily_sales.reindex(days["Date"].drop_duplicates())
+                axes[0].scatter(totals.index, totals, marker=marker, color=color, s=250, zorder=3,
+                                label=f"Location {kind}s ({len(days)})")
+        labels = anomalies.head(ANOMALY_LABELS).groupby(["Date", "Anomaly"], observed=True)["Location"].agg(", ".join)
+        for (date, kind), locations in labels.items():
+            axes[0].annotate(locations, (date, daily_sales.get(date, 0)), textcoords="offset points",
+                             xytext=(0, -40 if kind == "drop" else 25), ha="center", fontsize=14)
     axes[0].set_title("Daily Sales Trend", fontsize=30, fontweight="bold")
     axes[0].set_ylabel("Total Sales", fontsize=20)
     axes[0].tick_params(axis='both', labelsize=18)  # Increase tick label size
@@ -68,6 +157,8 @@ def plot_sales_trends(sales_df):
     # --- Weekly Sales Plot ---
     axes[1].plot(weekly_sales.index, weekly_sales, label="Weekly Sales", color=colors["sales"], alpha=0.7)
     axes[1].plot(weekly_sales_ma.index, weekly_sales_ma, label="4-Week Moving Avg", color=colors["ma"], linestyle="--", linewidth=2)
+    if forecast:
+        axes[1].plot(weekly_forecast.index, weekly_forecast, label=f"{WEEKLY_FORECAST_HORIZON}-Week Forecast", color=colors["forecast"], linestyle=":", marker="o", linewidth=2)
     axes[1].set_title("Weekly Sales Trend", fontsize=30, fontweight="bold")
     axes[1].set_ylabel("Total Sales", fontsize=20)
     axes[1].tick_params(axis='both', labelsize=18)  # Increase tick label size
@@ -77,6 +168,8 @@ def plot_sales_trends(sales_df):
     # --- Monthly Sales Plot ---
     axes[2].plot(monthly_sales.index, monthly_sales, label="Monthly Sales", color=colors["sales"], alpha=0.7)
     axes[2].plot(monthly_sales_ma.index, monthly_sales_ma, label="3-Month Moving Avg", color=colors["ma"], linestyle="--", linewidth=2)
+    if forecast:
+        axes[2].plot(monthly_forecast.index, monthly_forecast, label=f"{MONTHLY_FORECAST_HORIZON}-Month Forecast", color=colors["forecast"], linestyle=":", marker="o", linewidth=2)
     axes[2].set_title("Monthly Sales Trend", fontsize=30, fontweight="bold")
     axes[2].set_ylabel("Total Sales", fontsize=20)
     axes[2].tick_params(axis='both', labelsize=18)  # Increase tick label size
@@ -85,8 +178,8 @@ def plot_sales_trends(sales_df):
 
 
     # Adjust layout and show plots
-    plt.tight_layout()
-    return plt
+    fig.tight_layout()
+    return fig
 
 # Example usage
 if __name__ == "__main__":